@@ -2,6 +2,7 @@ import logging
 import pandas as pd
 # import pandas_ta as ta  # Removido - usando cálculos manuais
 import asyncio
+from tools.roteador_modelos import estrategia_por_simbolo
 
 logger = logging.getLogger('analista')
 
@@ -133,31 +134,8 @@ class AnalistaBot:
                 if btc_panic:
                     return {"decisao": "VETADO", "motivo": "BTC_PANIC", "confianca": 0}
             
-            # 1. Definição de Estratégia por Perfil de Moeda (5 Estratégias Otimizadas)
-            
-            # 🔷 BLUE CHIPS - Scalping conservador em grandes caps
-            if any(x in symbol for x in ['BTC', 'ETH', 'BNB']):
-                est_nome = 'scalping_v6'
-            
-            # 🎭 MEME SNIPER - Agressivo para memes de alta volatilidade
-            elif any(x in symbol for x in ['PEPE', 'WIF', 'DOGE']):
-                est_nome = 'meme_sniper'
-            
-            # 🚀 MOMENTUM BOOST - Layer 1 + AI com força de momentum
-            elif any(x in symbol for x in ['SOL', 'AVAX', 'NEAR', 'FET', 'RENDER', 'ATOM']):
-                est_nome = 'momentum_boost'
-            
-            # 🌐 LAYER2 DEFI - Layer 2 e DeFi com volatilidade média
-            elif any(x in symbol for x in ['ARB', 'POL', 'JUP']):
-                est_nome = 'layer2_defi'
-            
-            # 🎮 GAMING - Gaming/Metaverse com alta volatilidade
-            elif any(x in symbol for x in ['MAGIC', 'AXS', 'GALA', 'SAND', 'MANA']):
-                est_nome = 'gaming'
-            
-            # 📊 SWING RWA - Old School Alts para swing trading
-            else:  # ADA, XRP, DOT, LINK, LTC, ZEC
-                est_nome = 'swing_rwa'
+            # 1. Definição de Estratégia por Perfil de Moeda (mesmo mapa que roteia o modelo da IA)
+            est_nome = estrategia_por_simbolo(symbol)
 
             # 2. Contexto de Dados
             if symbol not in self.historico_df:
@@ -181,7 +159,8 @@ class AnalistaBot:
                 'price_above_ema': 1 if preco_atual > ema20 else 0
             }
             
-            res_ia = self.ia.predict(feat, symbol=symbol)
+            # 📦 Em lote com as outras moedas que pediram predição no mesmo instante
+            res_ia = await self.ia.prever(feat, symbol=symbol, estrategia=est_nome)
             confianca_ia = res_ia.get('confianca', 0)
             sinal_ia = res_ia.get('sinal', 'HOLD')
 
@@ -208,9 +187,16 @@ class AnalistaBot:
                     lucro_hoje = dia_atual.get('lucro_do_dia', 0.0)
                 
                 # Ajuste de limite conforme performance do dia - MAIS AGRESSIVO
-                # Limite base reduzido: 50% para comprar, 60% se lucro > $15
-                base_limit = 0.55 if est_nome == 'meme_sniper' else 0.50  # Reduzido de 65%/60%
-                limite_gatilho = 0.60 if lucro_hoje > 15.0 else self.config.get('confianca_minima', base_limit)
+                # Limite base reduzido: 50% para comprar, 60% se lucro > $15.
+                # Se o walk-forward já escolheu limiares (data/limiares_ia.json), usa os dele; se o
+                # modelo da estratégia trouxe limiares próprios (treino por estratégia), usa esses.
+                limiares = self.ia.limiares_para(est_nome)
+                proprios = limiares.get('estrategia') == est_nome
+                limite_base = limiares.get('limiar_compra', 0.50)
+                limite_lucro = limiares.get('limiar_conservador', 0.60)
+                # Margem extra dos memes só quando o limiar não veio do modelo deles
+                base_limit = limite_base + 0.05 if est_nome == 'meme_sniper' and not proprios else limite_base  # Reduzido de 65%/60%
+                limite_gatilho = limite_lucro if lucro_hoje > 15.0 else self.config.get('confianca_minima', base_limit)
                 logger.debug(f"🎯 [LIMITE ADAPTATIVO] Data: {hoje_str} | Lucro Hoje: ${lucro_hoje:.2f} | Limite: {limite_gatilho:.0%} | Est: {est_nome}")
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao calcular limite adaptativo: {e}")
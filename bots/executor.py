@@ -6,7 +6,6 @@ from binance import AsyncClient
 from binance.exceptions import BinanceAPIException
 import json
 import sys
-import requests
 from datetime import datetime
 from bots.stop_loss_engine import StopLossEngine
 from bots.venda_inteligente import VendaInteligente
@@ -33,25 +32,42 @@ except ImportError:
         raise
 
 from bots.asset_classifier import AssetClassifier, ScaledExit
+from tools.features_incrementais import FeaturesIncrementais
 from bots.symbol_mapper import SymbolMapper
+from tools.regras_simbolos import get_regras
+from tools.binance_gateway import BinanceGateway
+from tools.ledger_custos import LedgerCustos, ativo_base
+from tools.execucao_ordem import resumir_execucao
+from bots.user_stream import UserDataStream, stream_ativo
+from bots.order_intents import LivroIntencoes
+from bots.saidas_oco import SaidasOCO
+from bots.retry_saidas import AgendadorSaidas, PARCIAL, TOTAL
+from bots.posicoes import LivroPosicoes
+from utils.notify import get_notifier
 
 logger = logging.getLogger('executor')
 
 class ExecutorBot:
-    def __init__(self, config=None, monitor=None):
+    def __init__(self, config=None, monitor=None, client=None):
         self.config = config or {}
         self.monitor = monitor  
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_SECRET_KEY')
-        self.client = None 
-        self.active_trades = {}
+        self.client = client  # 🚦 BinanceGateway compartilhado (injetado pelo main.py)
+        self._regras_carregadas = False
+        # 📦 Posições em Posicao (__slots__) com snapshot em disco: restart mantém entry_time e trailing
+        self.active_trades = LivroPosicoes()
+        self.active_trades.carregar()
         self.callback_pnl = None
         self.taxa_binance = 0.001 
-        self.precisoes = {} # Cache para Lot Size
+        self.regras = get_regras()  # 📐 Filtros da Binance por símbolo (LOT_SIZE, NOTIONAL...)
+        self.ultimos_precos = {}  # Último preço visto por par (checagem local de notional)
         self.analista = None  # Será injetado via main.py para saída inteligente
         self.ia = IAEngine() # Engine com os 13.760 padrões
         self.telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        # 📱 Fila assíncrona do Telegram (o envio roda em background, iniciado no main.py)
+        self.notificador = get_notifier()
         
         # 🎯 Sistema de Venda Dinâmica
         self.asset_classifier = AssetClassifier()
@@ -74,25 +90,42 @@ class ExecutorBot:
         else:
             self.cerebro_stop_loss = None
         
+        # 📐 Features incrementais do cérebro (velas fechadas do kline stream do SniperMonitor)
+        # e teto de tempo da decisão: estourou, vende (mesmo default seguro de erro)
+        self.features_cerebro = FeaturesIncrementais() if self.cerebro_stop_loss else None
+        self.timeout_cerebro = float(os.getenv('R7_CEREBRO_TIMEOUT_S', '2.0'))
+        
         # 🎯 Sistema de Venda Inteligente V2 (baseado em previsões)
         self.venda_inteligente = VendaInteligente()
         
-        # 🛡️ Controle de tentativas de venda (evita loop infinito)
-        self._sell_attempts = {}  # {symbol: {'last_attempt': timestamp, 'error_count': int}}
-        self._sell_cooldown = 10  # segundos entre tentativas após erro
+        # ⏳ Vendas que falharam: repetidas por tempo (backoff + jitter), não a cada tick
+        self.retry = AgendadorSaidas(self)
+        
+        # 📡 User data stream: saldos e execuções por push (R7_USER_STREAM=false = polling de 60s)
+        self.saldos = {}  # {asset: {'free': float, 'locked': float}}
+        
+        # 📒 Ledger de custo médio/FIFO a partir do histórico completo de execuções
+        self.ledger = LedgerCustos()
+        self.precos_taxa = {}  # Cotações para converter taxas pagas em BNB
+        # Adoções que falharam (sem histórico de compra / poeira) → saldo na época: só tenta de
+        # novo quando o saldo mudar, sem repetir get_my_trades + ticker a cada varredura
+        self.adocao_recusada = {}
+        self.user_stream = UserDataStream(self) if stream_ativo() else None
+        
+        # 🧷 Intenções de ordem: trava por símbolo + client order id + estado (sem compra/venda duplicada)
+        self.intencoes = LivroIntencoes()
+        
+        # 🛡️ R7_EXIT_MODE=oco: TP/SL ficam na Binance como OCO (trailing = cancel-replace)
+        self.oco = SaidasOCO(self)
         
         # 📊 Contador de verificações de trailing stop
         self._trailing_checks = {}  # {symbol: count}
     
     def enviar_telegram(self, mensagem):
-        """Envia mensagem para o Telegram."""
+        """Enfileira mensagem para o Telegram (O(1): a ordem nunca espera a API do Telegram)."""
         if not self.telegram_token or not self.telegram_chat_id:
             return
-        try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-            requests.post(url, json={'chat_id': self.telegram_chat_id, 'text': mensagem, 'parse_mode': 'HTML'}, timeout=5)
-        except Exception as e:
-            logger.debug(f"Erro ao enviar Telegram: {e}")
+        self.notificador.send(mensagem, chat_id=self.telegram_chat_id)
 
     def contar_posicoes_abertas(self, preco_atual_dict=None):
         """
@@ -173,9 +206,11 @@ class ExecutorBot:
         }
 
     async def _get_client(self):
-        """Inicializa o cliente assíncrono (Singleton)."""
+        """Inicializa o cliente assíncrono (Singleton) atrás do gateway de rate limit."""
         if self.client is None:
-            self.client = await AsyncClient.create(self.api_key, self.api_secret)
+            self.client = BinanceGateway(await AsyncClient.create(self.api_key, self.api_secret))
+        if not self._regras_carregadas:
+            self._regras_carregadas = True
             await self.carregar_precisoes()
         return self.client
     
@@ -245,175 +280,254 @@ class ExecutorBot:
         return "⚪ (ALT)"
 
     async def carregar_precisoes(self):
-        """Busca as regras de arredondamento da Binance."""
+        """Carrega as regras de negociação (cache em disco; exchangeInfo só se não houver cache)."""
         try:
             client = self.client  # Usa cliente já criado
             if not client:
                 logger.warning("⚠️ Cliente não disponível para carregar precisões")
                 return
             
-            # 🗺️ Inicializa o mapeador de símbolos
+            # 🗺️ Inicializa o mapeador de símbolos (lê do mesmo cache de regras)
             await SymbolMapper.initialize(client)
             
-            info = await asyncio.wait_for(client.get_exchange_info(), timeout=10.0)
-            for s in info['symbols']:
-                for f in s['filters']:
-                    if f['filterType'] == 'LOT_SIZE':
-                        step_size = f['stepSize'].rstrip('0').rstrip('.')
-                        self.precisoes[s['symbol']] = len(step_size.split('.')[1]) if '.' in step_size else 0
-            logger.info("✅ Filtros de precisão carregados para todas as moedas.")
+            if await self.regras.garantir(client):
+                logger.info(f"✅ Filtros de {len(self.regras)} moedas carregados (LOT_SIZE, PRICE_FILTER, NOTIONAL).")
         except asyncio.TimeoutError:
             logger.error("⏱️ Timeout ao carregar precisões da Binance")
         except Exception as e:
             logger.error(f"❌ Erro ao carregar precisões: {e}")
 
-    async def assumir_e_gerenciar_carteira(self):
+    def ajustar_quantidade(self, pair, quantidade, preco):
         """
-        Analisa ativos na carteira e ADICIONA ao active_trades para monitoramento contínuo.
-        🔄 RODA EM LOOP: Re-scanneia a carteira a cada 60 segundos para detectar novas posições.
+        📐 Arredonda para baixo no step do LOT_SIZE e valida minQty/maxQty/NOTIONAL localmente.
+        Retorna (quantidade, filtro) - filtro é None ou o filtro que a Binance rejeitaria.
         """
-        logger.info("🛡️ Assumindo controle de posições abertas e iniciando monitoramento CONTÍNUO...")
+        regra = self.regras.regra(pair)
+        if regra is None:
+            return math.floor(quantidade * 10**4) / 10**4, None  # Sem regra: 4 casas (comportamento antigo)
+        qty = regra.arredondar_qty(quantidade)
+        return qty, regra.validar(qty, preco)
+
+    def qty_para_api(self, pair, quantidade):
+        """Quantidade como texto com as casas do símbolo (str(float) vira '8e-05' e a Binance rejeita)."""
+        regra = self.regras.regra(pair)
+        return regra.formatar_qty(quantidade) if regra is not None else quantidade
+
+    async def reconciliar_carteira(self):
+        """
+        Varredura completa da carteira: ADICIONA ao active_trades os ativos com saldo que
+        ainda não estão sob monitoramento. Roda no startup, após cada reconexão do user
+        data stream e, sem stream, a cada 60 segundos.
+        """
+        logger.debug("📡 Obtendo cliente Binance...")
+        client = await self._get_client()
+        
+        # 🧷 Ordens do bot que ficaram sem confirmação (timeout): consulta pelo client order id
+        for intencao, ordem in await self.intencoes.resolver_pendentes(client):
+            if ordem is not None:
+                self._aplicar_ordem_resolvida(intencao, ordem)
+        
+        # 🛡️ OCOs que executaram enquanto o stream estava fora (ou sem stream)
+        await self.oco.verificar(client)
         
-        while True:  # Loop infinito para monitoramento contínuo
+        logger.debug("📊 Re-scanneando carteira Binance...")
+        account_info = await asyncio.wait_for(client.get_account(), timeout=10.0)
+        for b in account_info['balances']:
+            self.atualizar_saldo(b['asset'], float(b['free']), float(b['locked']))
+        self._conferir_restauradas()
+        balances = [b for b in account_info['balances'] if float(b['free']) > 0]
+        logger.info(f"💰 Encontrados {len(balances)} ativos com saldo > 0")
+        
+        # Cotação do BNB para converter taxas pagas em BNB no ledger de custos
+        try:
+            ticker_bnb = await asyncio.wait_for(client.get_symbol_ticker(symbol='BNBUSDT'), timeout=3.0)
+            self.precos_taxa['BNBUSDT'] = float(ticker_bnb['price'])
+        except Exception as e:
+            logger.debug(f"Cotação BNB indisponível para taxas: {e}")
+
+        vistos = set()
+        for asset_info in balances:
+            asset = asset_info['asset']
+            quantidade = float(asset_info['free'])
+
+            # Proteção APENAS para USDT e ativos bloqueados em Launchpool/Staking
+            # NUNCA ignorar ativos que representam dinheiro real!
+            ignored_assets = [
+                'USDT',          # Moeda base (não precisa monitorar)
+                'LDUSDT',        # USDT em Earn/Staking (não é tradável)
+                'LDBNB', 'LDBTC', 'LDETH', 'LDSOL', 'LDMATIC',  # Ativos em Launchpool (prefixo LD = Locked/Launchpool)
+            ]
+            
+            if asset in ignored_assets or quantidade <= 0:
+                logger.debug(f"⏭️ {asset}: Ignorado (staking/launchpool ou saldo zero)")
+                continue
+            
+            # 🗺️ USA O MAPEADOR DE SÍMBOLOS (resolve MATIC, etc)
+            # Primeiro tenta corrigir erros comuns
+            if asset.endswith('USDTT'):
+                symbol = SymbolMapper.fix_symbol_errors(asset)
+                logger.info(f"🔧 Corrigido: {asset} → {symbol}")
+            else:
+                symbol = SymbolMapper.map_asset_to_symbol(asset)
+            
+            if not symbol:
+                # 💰 ATENÇÃO: Asset na carteira mas não conseguimos mapear!
+                valor_estimado = quantidade * 0.01  # Estimativa mínima
+                logger.error(f"💰 {asset}: {quantidade:.4f} unidades (≈${valor_estimado:.2f}) - Não foi possível mapear para símbolo válido!")
+                logger.error(f"   ⚠️ TOKEN PODE ESTAR DESCONTINUADO OU RENOMEADO - Verifique manualmente!")
+                continue
+            
+            # Valida se símbolo existe
+            if not SymbolMapper.is_valid_symbol(symbol):
+                valor_estimado = quantidade * 0.01
+                logger.error(f"💰 {asset} → {symbol}: {quantidade:.4f} unidades (≈${valor_estimado:.2f})")
+                logger.error(f"   ⚠️ SÍMBOLO NÃO EXISTE NA BINANCE - Token possivelmente descontinuado/renomeado!")
+                logger.error(f"   📋 Ação necessária: Verificar na Binance se há migração/swap disponível")
+                continue
+            
+            if symbol in self.active_trades:
+                logger.debug(f"⏭️ {asset}: Já está sendo monitorado")
+                continue
+            if self.intencoes.ocupado(symbol):
+                logger.debug(f"⏭️ {asset}: Ordem do bot em andamento - fica para a próxima varredura")
+                continue
+            
+            logger.debug(f"🔍 Processando {asset} → {symbol}...")
+            vistos.add(symbol)
+
             try:
-                logger.debug("📡 Obtendo cliente Binance...")
-                client = await self._get_client()
-                
-                logger.debug("📊 Re-scanneando carteira Binance...")
-                account_info = await asyncio.wait_for(client.get_account(), timeout=10.0)
-                balances = [b for b in account_info['balances'] if float(b['free']) > 0]
-                logger.info(f"💰 Encontrados {len(balances)} ativos com saldo > 0")
-
-                for asset_info in balances:
-                    asset = asset_info['asset']
-                    quantidade = float(asset_info['free'])
-
-                    # Proteção APENAS para USDT e ativos bloqueados em Launchpool/Staking
-                    # NUNCA ignorar ativos que representam dinheiro real!
-                    ignored_assets = [
-                        'USDT',          # Moeda base (não precisa monitorar)
-                        'LDUSDT',        # USDT em Earn/Staking (não é tradável)
-                        'LDBNB', 'LDBTC', 'LDETH', 'LDSOL', 'LDMATIC',  # Ativos em Launchpool (prefixo LD = Locked/Launchpool)
-                    ]
-                    
-                    if asset in ignored_assets or quantidade <= 0:
-                        logger.debug(f"⏭️ {asset}: Ignorado (staking/launchpool ou saldo zero)")
-                        continue
-                    
-                    # 🗺️ USA O MAPEADOR DE SÍMBOLOS (resolve MATIC, etc)
-                    # Primeiro tenta corrigir erros comuns
-                    if asset.endswith('USDTT'):
-                        symbol = SymbolMapper.fix_symbol_errors(asset)
-                        logger.info(f"🔧 Corrigido: {asset} → {symbol}")
-                    else:
-                        symbol = SymbolMapper.map_asset_to_symbol(asset)
-                    
-                    if not symbol:
-                        # 💰 ATENÇÃO: Asset na carteira mas não conseguimos mapear!
-                        valor_estimado = quantidade * 0.01  # Estimativa mínima
-                        logger.error(f"💰 {asset}: {quantidade:.4f} unidades (≈${valor_estimado:.2f}) - Não foi possível mapear para símbolo válido!")
-                        logger.error(f"   ⚠️ TOKEN PODE ESTAR DESCONTINUADO OU RENOMEADO - Verifique manualmente!")
-                        continue
-                    
-                    # Valida se símbolo existe
-                    if not SymbolMapper.is_valid_symbol(symbol):
-                        valor_estimado = quantidade * 0.01
-                        logger.error(f"💰 {asset} → {symbol}: {quantidade:.4f} unidades (≈${valor_estimado:.2f})")
-                        logger.error(f"   ⚠️ SÍMBOLO NÃO EXISTE NA BINANCE - Token possivelmente descontinuado/renomeado!")
-                        logger.error(f"   📋 Ação necessária: Verificar na Binance se há migração/swap disponível")
-                        continue
-                    
-                    logger.debug(f"🔍 Processando {asset} → {symbol}...")
+                precos_manuais = self.config.get('precos_custo', {})
+                preco_compra = precos_manuais.get(symbol)
 
+                if (not preco_compra or preco_compra == 0) and self.adocao_recusada.get(symbol) == quantidade:
+                    logger.debug(f"⏭️ {asset}: Adoção já recusada com este saldo - aguardando mudança")
+                    continue
+
+                if not preco_compra or preco_compra == 0:
+                    # 📒 Custo médio ponderado do histórico COMPLETO (ledger local; só baixa execuções novas).
+                    # Com o user data stream conectado, símbolo já sincronizado segue em dia pelos eventos.
                     try:
-                        precos_manuais = self.config.get('precos_custo', {})
-                        preco_compra = precos_manuais.get(symbol)
-
-                        if not preco_compra or preco_compra == 0:
-                            logger.debug(f"   Buscando histórico de trades para {symbol}...")
-                            try:
-                                trades = await asyncio.wait_for(
-                                    client.get_my_trades(symbol=symbol, limit=1),
-                                    timeout=3.0
-                                )
-                                if trades:
-                                    preco_compra = float(trades[0]['price'])
-                                    logger.debug(f"   ✓ Preço de compra encontrado: ${preco_compra:.4f}")
-                                else:
-                                    # � CRÍTICO: Sem histórico = NÃO MONITORAR
-                                    # Usar preço atual como entrada é ERRO FATAL que causa perdas!
-                                    ticker = await asyncio.wait_for(
-                                        client.get_symbol_ticker(symbol=symbol),
-                                        timeout=3.0
-                                    )
-                                    preco_atual_market = float(ticker['price'])
-                                    valor_usdt = quantidade * preco_atual_market
-                                    logger.error(f"🚨 {asset}: SEM HISTÓRICO DE COMPRA - NÃO SERÁ MONITORADO!")
-                                    logger.error(f"   💰 Saldo: {quantidade:.4f} {asset} ≈ ${valor_usdt:.2f} USDT")
-                                    logger.error(f"   ⚠️ SISTEMA NÃO SABE O PREÇO DE COMPRA REAL!")
-                                    logger.error(f"   📋 AÇÃO NECESSÁRIA: Adicione manualmente em config/precos_custo.json:")
-                                    logger.error(f"       \"{symbol}\": PRECO_QUE_VOCE_COMPROU")
-                                    continue  # NÃO monitora sem preço real
-                            except asyncio.TimeoutError:
-                                logger.error(f"⏱️ {asset}: Timeout ao buscar informações - Verifique conexão")
-                                continue
-                            except Exception as e:
-                                logger.error(f"❌ {asset}: Erro ao buscar dados: {e}")
-                                logger.error(f"   💰 Saldo: {quantidade:.4f} {asset} - IMPOSSÍVEL MONITORAR")
-                                continue
-
-                        if not preco_compra:
-                            logger.error(f"❌ {asset}: Sem dados válidos - NÃO SERÁ MONITORADO!")
-                            logger.error(f"   💰 Você tem {quantidade:.4f} {asset} não monitorados!")
-                            continue
-                        
-                        logger.debug(f"   Buscando preço atual para {symbol}...")
-                        try:
+                        stream_em_dia = self.user_stream is not None and self.user_stream.conectado
+                        if not (stream_em_dia and symbol in self.ledger.sincronizados):
+                            logger.debug(f"   Sincronizando ledger de custos de {symbol}...")
+                            await asyncio.wait_for(
+                                self.ledger.sincronizar_async(client, [symbol], self.precos_taxa),
+                                timeout=15.0
+                            )
+                        custo = self.ledger.custo(symbol)
+                        if custo and custo['qty'] > 0 and custo['preco_medio'] > 0:
+                            preco_compra = custo['preco_medio']
+                            logger.debug(f"   ✓ Custo médio: ${preco_compra:.4f} (FIFO ${custo['preco_fifo']:.4f}, "
+                                         f"{custo['n_execucoes']} execuções)")
+                        else:
+                            # � CRÍTICO: Sem histórico = NÃO MONITORAR
+                            # Usar preço atual como entrada é ERRO FATAL que causa perdas!
                             ticker = await asyncio.wait_for(
                                 client.get_symbol_ticker(symbol=symbol),
                                 timeout=3.0
                             )
-                            preco_atual = float(ticker['price'])
-                            logger.debug(f"   ✓ Preço atual: ${preco_atual:.4f}")
-                        except asyncio.TimeoutError:
-                            logger.warning(f"⏱️ Timeout ao buscar preço de {asset}")
-                            continue
-                        except Exception as e:
-                            logger.warning(f"⚠️ Erro ao buscar preço de {asset}: {e}")
-                            continue
-                        
-                        valor_total_posicao = quantidade * preco_atual
-                        
-                        # 🚫 NOVA REGRA: Ignora ativos com valor total abaixo de $1
-                        if valor_total_posicao < 1.0:
-                            logger.debug(f"⏭️ {asset}: Ignorado - Valor total ${valor_total_posicao:.4f} < $1.00")
-                            continue
-                        
-                        lucro_atual_pct = ((preco_atual - preco_compra) / preco_compra) * 100
-                        
-                        # 🔄 ADICIONA ao active_trades para monitoramento contínuo
-                        # IMPORTANTE: Marca como 'legacy' para não bloquear novas compras
-                        if symbol not in self.active_trades:
-                            alvos = self.calcular_alvos(preco_compra, "scalping_v6", symbol)
-                            self.active_trades[symbol] = {
-                                'qty': quantidade,
-                                'entry_price': preco_compra,
-                                'tp': alvos['tp'],
-                                'sl': alvos['sl'],
-                                'estrategia': 'manual_existing',
-                                'confianca': 0.0,
-                                'legacy': True,  # Marca como posição antiga
-                                'entry_time': datetime.now()  # Estima tempo de entrada como agora
-                            }
-                            logger.info(f"✅ {asset}: Adicionado ao monitoramento | Lucro: {lucro_atual_pct:+.2f}%")
-                        else:
-                            logger.debug(f"⏭️ {asset}: Já está sendo monitorado")
-
-                    except Exception as ex:
-                        logger.warning(f"⚠️ Erro ao processar {asset}: {ex}")
+                            preco_atual_market = float(ticker['price'])
+                            valor_usdt = quantidade * preco_atual_market
+                            logger.error(f"🚨 {asset}: SEM HISTÓRICO DE COMPRA - NÃO SERÁ MONITORADO!")
+                            logger.error(f"   💰 Saldo: {quantidade:.4f} {asset} ≈ ${valor_usdt:.2f} USDT")
+                            logger.error(f"   ⚠️ SISTEMA NÃO SABE O PREÇO DE COMPRA REAL!")
+                            logger.error(f"   📋 AÇÃO NECESSÁRIA: Adicione manualmente em config/precos_custo.json:")
+                            logger.error(f"       \"{symbol}\": PRECO_QUE_VOCE_COMPROU")
+                            self.adocao_recusada[symbol] = quantidade
+                            continue  # NÃO monitora sem preço real
+                    except asyncio.TimeoutError:
+                        logger.error(f"⏱️ {asset}: Timeout ao buscar informações - Verifique conexão")
                         continue
+                    except Exception as e:
+                        logger.error(f"❌ {asset}: Erro ao buscar dados: {e}")
+                        logger.error(f"   💰 Saldo: {quantidade:.4f} {asset} - IMPOSSÍVEL MONITORAR")
+                        continue
+
+                if not preco_compra:
+                    logger.error(f"❌ {asset}: Sem dados válidos - NÃO SERÁ MONITORADO!")
+                    logger.error(f"   💰 Você tem {quantidade:.4f} {asset} não monitorados!")
+                    continue
                 
-                logger.info(f"✅ Total de {len(self.active_trades)} posições sob monitoramento contínuo")
+                logger.debug(f"   Buscando preço atual para {symbol}...")
+                try:
+                    ticker = await asyncio.wait_for(
+                        client.get_symbol_ticker(symbol=symbol),
+                        timeout=3.0
+                    )
+                    preco_atual = float(ticker['price'])
+                    logger.debug(f"   ✓ Preço atual: ${preco_atual:.4f}")
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏱️ Timeout ao buscar preço de {asset}")
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro ao buscar preço de {asset}: {e}")
+                    continue
+                
+                valor_total_posicao = quantidade * preco_atual
+                
+                # 🚫 NOVA REGRA: Ignora ativos com valor total abaixo de $1
+                if valor_total_posicao < 1.0:
+                    logger.debug(f"⏭️ {asset}: Ignorado - Valor total ${valor_total_posicao:.4f} < $1.00")
+                    self.adocao_recusada[symbol] = quantidade
+                    continue
+                
+                lucro_atual_pct = ((preco_atual - preco_compra) / preco_compra) * 100
+                
+                # 🔄 ADICIONA ao active_trades para monitoramento contínuo
+                # IMPORTANTE: Marca como 'legacy' para não bloquear novas compras
+                if symbol not in self.active_trades and not self.intencoes.ocupado(symbol):
+                    alvos = self.calcular_alvos(preco_compra, "scalping_v6", symbol)
+                    self.active_trades[symbol] = {
+                        'qty': quantidade,
+                        'entry_price': preco_compra,
+                        'tp': alvos['tp'],
+                        'sl': alvos['sl'],
+                        'estrategia': 'manual_existing',
+                        'confianca': 0.0,
+                        'legacy': True,  # Marca como posição antiga
+                        'entry_time': datetime.now()  # Estima tempo de entrada como agora
+                    }
+                    self.adocao_recusada.pop(symbol, None)
+                    logger.info(f"✅ {asset}: Adicionado ao monitoramento | Lucro: {lucro_atual_pct:+.2f}%")
+
+            except Exception as ex:
+                logger.warning(f"⚠️ Erro ao processar {asset}: {ex}")
+                continue
+        
+        # Saldo zerado (vendido/transferido) = próxima aparição do ativo é uma adoção nova
+        self.adocao_recusada = {s: q for s, q in self.adocao_recusada.items() if s in vistos}
+        logger.info(f"✅ Total de {len(self.active_trades)} posições sob monitoramento contínuo")
+
+    def _conferir_restauradas(self):
+        """📦 Posições vindas do snapshot x saldo real: vendidas com o bot fora do ar saem do livro."""
+        for symbol in list(self.active_trades.restauradas):
+            self.active_trades.restauradas.discard(symbol)
+            trade = self.active_trades.get(symbol)
+            if trade is None:
+                continue
+            saldo = self.saldos.get(ativo_base(symbol), {'free': 0.0, 'locked': 0.0})
+            total = saldo['free'] + saldo['locked']  # OCO na Binance deixa o saldo bloqueado
+            if total * trade['entry_price'] < 1.0:
+                logger.info(f"📦 {symbol}: posição do snapshot não está mais na carteira - removida")
+                self.active_trades.pop(symbol, None)
+            elif total < trade['qty']:
+                logger.info(f"📦 {symbol}: snapshot com qty={trade['qty']} - carteira tem {total}")
+                trade['qty'] = total
+
+    async def assumir_e_gerenciar_carteira(self):
+        """
+        Assume as posições da carteira e as mantém sincronizadas.
+        📡 Com user data stream: reconcilia ao conectar/reconectar e depois só aplica eventos push.
+        🔄 Sem stream (R7_USER_STREAM=false ou stream indisponível): re-scanneia a cada 60 segundos.
+        """
+        logger.info("🛡️ Assumindo controle de posições abertas e iniciando monitoramento CONTÍNUO...")
+        
+        if self.user_stream is not None:
+            await self.user_stream.executar()  # Só retorna se o stream desistir
+        
+        while True:  # Fallback: polling contínuo
+            try:
+                await self.reconciliar_carteira()
                 
                 # 🔄 Aguarda 60 segundos antes do próximo scan
                 await asyncio.sleep(60)
@@ -425,21 +539,167 @@ class ExecutorBot:
                 logger.error(f"🚨 Erro crítico ao assumir carteira: {e} - Tentando novamente em 60s", exc_info=True)
                 await asyncio.sleep(60)
 
+    def atualizar_saldo(self, asset, livre, bloqueado=0.0):
+        """📡 Saldo por ativo (outboundAccountPosition do stream ou get_account da reconciliação)."""
+        if livre > 0 or bloqueado > 0:
+            self.saldos[asset] = {'free': livre, 'locked': bloqueado}
+        else:
+            self.saldos.pop(asset, None)
+        # Saldo mudou: a venda recusada por saldo (retry_saidas) pode ser tentada de novo
+        trade = self.active_trades.get(f"{asset}USDT")
+        if trade is not None and trade.get('saldo_divergente'):
+            trade.pop('saldo_divergente', None)
+
+    def aplicar_execucao_externa(self, symbol, lado, quantidade, preco, comissao=0.0, ativo_comissao=None):
+        """
+        📡 Execução de ordem que NÃO saiu do bot (app da Binance, outro sistema):
+        compra aumenta/adota a posição com preço médio ponderado; venda reduz ou encerra.
+        """
+        if quantidade <= 0 or preco <= 0:
+            return
+        ativo_base = symbol[:-4] if symbol.endswith('USDT') else None
+        trade = self.active_trades.get(symbol)
+        
+        if lado == 'BUY':
+            if ativo_base and ativo_comissao == ativo_base:
+                quantidade -= comissao  # Taxa cobrada no próprio ativo comprado
+            if trade is None:
+                alvos = self.calcular_alvos(preco, "scalping_v6", symbol)
+                self.active_trades[symbol] = {
+                    'qty': quantidade,
+                    'entry_price': preco,
+                    'tp': alvos['tp'],
+                    'sl': alvos['sl'],
+                    'estrategia': 'manual_existing',
+                    'confianca': 0.0,
+                    'legacy': True,
+                    'entry_time': datetime.now()
+                }
+                logger.info(f"📡 {symbol}: compra externa adotada | {quantidade} @ ${preco:.6f}")
+            else:
+                qty_total = trade['qty'] + quantidade
+                trade['entry_price'] = (trade['entry_price'] * trade['qty'] + preco * quantidade) / qty_total
+                trade['qty'] = qty_total
+                logger.info(f"📡 {symbol}: compra externa somada à posição | qty={qty_total} | PM=${trade['entry_price']:.6f}")
+        
+        elif lado == 'SELL' and trade is not None:
+            restante = trade['qty'] - quantidade
+            if restante * preco < 1.0:
+                self.active_trades.pop(symbol, None)
+                logger.info(f"📡 {symbol}: posição encerrada por venda externa @ ${preco:.6f}")
+            else:
+                trade['qty'] = restante
+                logger.info(f"📡 {symbol}: venda externa parcial | restante={restante}")
+
+    async def _enviar_ordem(self, intencao, metodo, **params):
+        """
+        🧷 Envia a ordem da intenção com o client order id dela e registra o desfecho.
+        Timeout/erro de rede deixa a intenção INCERTA e consulta a Binance pelo id antes de desistir.
+        """
+        client = await self._get_client()
+        self.intencoes.enviada(intencao)
+        try:
+            resposta = await getattr(client, metodo)(symbol=intencao.symbol, newClientOrderId=intencao.client_id,
+                                                     **params)
+        except Exception as e:
+            # -1007 / 5xx: "send status unknown" - a Binance pode ter executado, igual a um timeout
+            if isinstance(e, BinanceAPIException) and e.code != -1007 and e.status_code < 500:
+                self.intencoes.rejeitada(intencao, e.message)
+                raise
+            self.intencoes.incerta(intencao, repr(e))
+            try:
+                resposta = await self.intencoes.resolver(client, intencao)
+            except Exception:
+                # Continua INCERTA: nenhuma ordem nova no par até resolver (em background, sem esperar tick)
+                asyncio.ensure_future(self._resolver_em_background(intencao))
+                raise e
+            if resposta is None:
+                raise
+            logger.info(f"🧷 {intencao.symbol}: ordem {intencao.client_id} confirmada na Binance após {e!r}")
+            return resposta
+        self.intencoes.executada(intencao, resposta)
+        return resposta
+
+    async def _resolver_em_background(self, intencao, tentativas=6):
+        """Consulta a ordem INCERTA com espera crescente até a Binance confirmar ou negar."""
+        espera = 1.0
+        for _ in range(tentativas):
+            await asyncio.sleep(espera)
+            espera *= 2
+            async with self.intencoes.trava(intencao.symbol):
+                if self.intencoes.ativa(intencao.symbol) is not intencao:
+                    return  # Outro caminho (_liberar_intencao / reconciliação) já resolveu
+                try:
+                    ordem = await self.intencoes.resolver(await self._get_client(), intencao)
+                except Exception as e:
+                    logger.debug(f"❓ {intencao.symbol}: {intencao.client_id} ainda sem confirmação ({e})")
+                    continue
+                if ordem is not None:
+                    self._aplicar_ordem_resolvida(intencao, ordem)
+                    logger.info(f"🧷 {intencao.symbol}: ordem {intencao.client_id} confirmada na Binance")
+                return
+
+    async def _liberar_intencao(self, pair):
+        """
+        Chamado com a trava do par: se sobrou uma ordem INCERTA, consulta a Binance antes de
+        qualquer ordem nova. Retorna True se o par está livre.
+        """
+        intencao = self.intencoes.ativa(pair)
+        if intencao is None:
+            return True
+        try:
+            ordem = await self.intencoes.resolver(await self._get_client(), intencao)
+        except Exception as e:
+            logger.warning(f"❓ {pair}: ordem {intencao.client_id} ainda sem confirmação ({e}) - aguardando")
+            return False
+        if ordem is not None:
+            self._aplicar_ordem_resolvida(intencao, ordem)
+        return True
+
+    def _aplicar_ordem_resolvida(self, intencao, ordem):
+        """Ordem do bot que só se confirmou depois (o stream ignora ordens r7_): aplica na posição."""
+        execucao = resumir_execucao(ordem, self.precos_taxa, self.taxa_binance)
+        if execucao.qty_executada > 0:
+            self.aplicar_execucao_externa(intencao.symbol, intencao.lado, execucao.qty_executada,
+                                          execucao.preco_medio, execucao.comissoes.get(ativo_base(intencao.symbol), 0.0),
+                                          ativo_base(intencao.symbol))
+
     async def executar_ordem_sniper(self, symbol, preco_entrada_websocket, confianca_ia=0.70, estrategia="scalping_v6"):
         """
         MÉTODO RECALIBRADO: Executa compra com ESCALONAMENTO DE BANCA e STOP LOSS INTELIGENTE.
+        🧷 Uma ordem por símbolo: com outra em andamento (ou posição já aberta) não compra.
         """
         pair = f"{symbol}"
         if not pair.endswith("USDT"): pair += "USDT"
         
+        trava = self.intencoes.trava(pair)
+        if trava.locked():
+            logger.info(f"🧷 {pair}: ordem em andamento - compra duplicada ignorada")
+            return False
+        async with trava:
+            if not await self._liberar_intencao(pair):
+                return False
+            if pair in self.active_trades:
+                logger.info(f"🧷 {pair}: posição já aberta - compra duplicada ignorada")
+                return False
+            intencao = self.intencoes.abrir(pair, 'BUY', estrategia)
+            if intencao is None:
+                return False
+            try:
+                return await self._executar_ordem_sniper(intencao, symbol, preco_entrada_websocket,
+                                                         confianca_ia, estrategia)
+            finally:
+                self.intencoes.descartar(intencao)
+
+    async def _executar_ordem_sniper(self, intencao, symbol, preco_entrada_websocket, confianca_ia, estrategia):
+        pair = intencao.symbol
         try:
-            client = await self._get_client()
-            
             # 1. Usa sistema de alvos inteligente com stop loss dinâmico
             preco_atual = preco_entrada_websocket
             
             # 2. LÓGICA DE ESCALONAMENTO (O "Pulo do Gato") - OTIMIZADA
             # Banca Ref: $2.355,05 | Entrada Base: $35.00
+            # confianca_ia já vem calibrada (tools/calibracao.py): 0.80 = 80% de chance real de acerto
             entrada_base = self.config.get('entrada_usd', 35.0)
             
             if confianca_ia >= 0.90:
@@ -452,12 +712,12 @@ class ExecutorBot:
                 valor_entrada_final = entrada_base        # $35.00 (Padrão)
                 peso_mao = "MÃO CAUTELA"
 
-            # 3. Cálculo de Quantidade com Precisão
-            qty_prec = self.precisoes.get(pair, 4)
-            quantidade = math.floor((valor_entrada_final / preco_entrada_websocket) * (10**qty_prec)) / (10**qty_prec)
+            # 3. Cálculo de Quantidade com Precisão (LOT_SIZE + NOTIONAL checados antes de enviar)
+            quantidade, filtro = self.ajustar_quantidade(
+                pair, valor_entrada_final / preco_entrada_websocket, preco_entrada_websocket)
 
-            if quantidade <= 0: 
-                logger.warning(f"🚫 Quantidade calculada insuficiente para {pair}")
+            if quantidade <= 0 or filtro: 
+                logger.warning(f"🚫 Quantidade calculada insuficiente para {pair} ({filtro or 'qty=0'})")
                 return False
             
             # 🆕 Calcula alvos com quantidade para Stop Loss Híbrido
@@ -468,30 +728,37 @@ class ExecutorBot:
             logger.info(f"🎯 [SNIPER] {pair} | Confiança: {confianca_ia:.2%} | {peso_mao} | Inves: ${valor_entrada_final:.2f}")
 
             # 4. Envio da Ordem Real
-            ordem = await client.order_market_buy(symbol=pair, quantity=quantidade)
+            ordem = await self._enviar_ordem(intencao, 'order_market_buy',
+                                             quantity=self.qty_para_api(pair, quantidade))
             
-            # Pega o preço médio de execução real dos fills
-            precos_fills = [float(f['price']) for f in ordem.get('fills', [])]
-            preco_exec = sum(precos_fills) / len(precos_fills) if precos_fills else preco_entrada_websocket
+            # 🧾 Preço médio ponderado dos fills, taxa real e quantidade que ficou na carteira
+            execucao = resumir_execucao(ordem, self.precos_taxa, self.taxa_binance, preco_entrada_websocket)
+            preco_exec = execucao.preco_medio
+            quantidade = execucao.qty_liquida
 
             # 🚫 NOVA REGRA: Só adiciona ao active_trades se valor >= $1 
             valor_final_posicao = quantidade * preco_exec
+            # Alvos foram calculados sobre o preço do websocket: reancora no preço executado
+            escala = preco_exec / preco_atual if preco_atual > 0 else 1.0
             if valor_final_posicao >= 1.0:
                 self.active_trades[pair] = {
                     'qty': quantidade,
                     'entry_price': preco_exec,
-                    'tp': preco_exec * alvos['tp'],
-                    'sl': preco_exec * alvos['sl'],
+                    'taxa_entrada': execucao.taxa_usdt,
+                    'tp': alvos['tp'] * escala,
+                    'sl': alvos['sl'] * escala,
                     'estrategia': estrategia,
                     'confianca': confianca_ia,
                     'entry_time': datetime.now()
                 }
                 logger.info(f"✅ {pair} adicionado ao monitoramento (${valor_final_posicao:.2f})")
+                if self.oco.ativo:
+                    await self.oco.proteger(pair)
             else:
                 logger.info(f"⚪ {pair} executado mas NÃO monitorado (${valor_final_posicao:.4f} < $1.00)")
 
             # 📲 Notificação Telegram - COMPRA COM INFO DE STOP LOSS
-            valor_investido = quantidade * preco_exec
+            valor_investido = execucao.valor_liquido
             sl_pct = ((alvos['sl'] / preco_exec) - 1) * 100
             tp_pct = ((alvos['tp'] / preco_exec) - 1) * 100
             
@@ -529,198 +796,202 @@ class ExecutorBot:
             logger.error(f"❌ Erro geral na execução {pair}: {e}")
             return False
 
-    async def fechar_posicao_parcial(self, pair, quantidade, motivo="VENDA_PARCIAL"):
-        """Vende apenas uma parte da posição (venda escalonada)"""
+    async def fechar_posicao_parcial(self, pair, quantidade, motivo="VENDA_PARCIAL", agendada=False):
+        """
+        Vende apenas uma parte da posição (venda escalonada). 🧷 Nunca com outra ordem do par em voo.
+        ⏳ Com uma saída do par aguardando nova tentativa, só o agendador (agendada=True) vende.
+        """
         if pair not in self.active_trades:
             return False
-        
-        # 🛡️ COOLDOWN: Verifica se houve tentativa recente com erro
-        now = datetime.now().timestamp()
-        if pair in self._sell_attempts:
-            last_attempt = self._sell_attempts[pair].get('last_attempt', 0)
-            error_count = self._sell_attempts[pair].get('error_count', 0)
-            
-            # Se teve erro recente e está em cooldown, não tenta novamente
-            if error_count > 0 and (now - last_attempt) < self._sell_cooldown:
-                logger.debug(f"⏸️ {pair}: Em cooldown após erro (aguardando {self._sell_cooldown - (now - last_attempt):.1f}s)")
+        if not agendada and self.retry.assumir(pair, PARCIAL, motivo):
+            return False
+        trava = self.intencoes.trava(pair)
+        if trava.locked():
+            logger.debug(f"🧷 {pair}: ordem em andamento - venda parcial fica para o próximo tick")
+            return False
+        async with trava:
+            if pair not in self.active_trades or not await self._liberar_intencao(pair):
                 return False
+            intencao = self.intencoes.abrir(pair, 'SELL', motivo)
+            if intencao is None:
+                return False
+            tinha_oco = bool(self.active_trades[pair].get('oco'))
+            try:
+                return await self._fechar_posicao_parcial(intencao, quantidade, motivo)
+            finally:
+                self.intencoes.descartar(intencao)
+                await self._reproteger(pair, tinha_oco)
+
+    async def _fechar_posicao_parcial(self, intencao, quantidade, motivo):
+        pair = intencao.symbol
         
         trade = self.active_trades[pair]
         
         try:
-            client = await self._get_client()
+            # 📐 Ajusta quantidade ao LOT_SIZE e checa NOTIONAL localmente (sem ordem rejeitada)
+            preco_ref = self.ultimos_precos.get(pair, trade['entry_price'])
+            quantidade_ajustada, filtro = self.ajustar_quantidade(pair, quantidade, preco_ref)
+            
+            # Se o que sobrar não puder mais ser vendido (abaixo do mínimo), vende tudo agora
+            _, filtro_resto = self.ajustar_quantidade(pair, trade['qty'] - quantidade_ajustada, preco_ref)
+            if filtro_resto and not filtro:
+                quantidade_ajustada, filtro = self.ajustar_quantidade(pair, trade['qty'], preco_ref)
+                logger.info(f"📐 {pair}: restante ficaria abaixo do mínimo ({filtro_resto}) - vendendo a posição inteira")
             
-            # Ajusta quantidade para precisão
-            qty_prec = self.precisoes.get(pair, 4)
-            quantidade_ajustada = math.floor(quantidade * (10 ** qty_prec)) / (10 ** qty_prec)
+            if quantidade_ajustada <= 0 or filtro:
+                logger.warning(f"⚠️ {pair}: Quantidade muito pequena para venda parcial ({quantidade} | {filtro or 'qty=0'})")
+                return False
             
-            if quantidade_ajustada <= 0:
-                logger.warning(f"⚠️ {pair}: Quantidade muito pequena para venda parcial ({quantidade})")
+            # 🛡️ A OCO trava o saldo: cancela antes e recoloca sobre o restante depois
+            if not await self.oco.cancelar(pair, trade):
                 return False
             
             logger.info(f"⚡ [VENDA PARCIAL] Executando {pair} | Qty: {quantidade_ajustada} | Motivo: {motivo}")
-            venda = await client.order_market_sell(symbol=pair, quantity=quantidade_ajustada)
+            venda = await self._enviar_ordem(intencao, 'order_market_sell',
+                                             quantity=self.qty_para_api(pair, quantidade_ajustada))
             
-            # Calcula preço médio de venda
-            precos_fills = [float(f['price']) for f in venda.get('fills', [])]
-            preco_venda = sum(precos_fills) / len(precos_fills) if precos_fills else 0.0
+            # 🧾 Execução real: preço ponderado e taxa efetiva da venda
+            execucao = resumir_execucao(venda, self.precos_taxa, self.taxa_binance)
+            qty_vendida = execucao.qty_executada
+            fracao = min(1.0, execucao.qty_liquida / trade['qty']) if trade['qty'] > 0 else 1.0
             
-            # Calcula PnL desta venda parcial
-            custo = trade['entry_price'] * quantidade_ajustada
-            receita = quantidade_ajustada * preco_venda
-            lucro_usdt = receita - custo
-            lucro_usdt -= (custo + receita) * self.taxa_binance  # Desconta taxas
-            lucro_pct = (lucro_usdt / custo) * 100
+            # Calcula PnL desta venda parcial (taxa da compra rateada pela fração vendida)
+            taxa_entrada = trade.get('taxa_entrada', 0.0) * fracao
+            custo = trade['entry_price'] * qty_vendida + taxa_entrada
+            lucro_usdt = execucao.valor_liquido - custo
+            lucro_pct = (lucro_usdt / custo) * 100 if custo > 0 else 0
+            
+            # Posição restante = o que de fato saiu do saldo (inclui taxa cobrada no ativo)
+            trade['qty'] = max(0.0, trade['qty'] - execucao.qty_liquida)
+            if 'taxa_entrada' in trade:
+                trade['taxa_entrada'] -= taxa_entrada
             
             # 📱 Notifica no Telegram
             emoji = "💰" if lucro_usdt > 0 else "📉"
-            pct_posicao = (quantidade_ajustada / trade['qty']) * 100
+            pct_posicao = fracao * 100
             msg = f"{emoji} <b>VENDA PARCIAL</b>\n"
             msg += f"🪙 {pair}\n"
             msg += f"📊 {pct_posicao:.0f}% da posição\n"
             msg += f"💵 Lucro: ${lucro_usdt:.2f} ({lucro_pct:+.2f}%)\n"
             msg += f"🎯 Motivo: {motivo}"
             
-            await self.enviar_telegram(msg)
+            self.enviar_telegram(msg)
             
             logger.info(f"✅ {pair} venda parcial concluída: ${lucro_usdt:.2f} ({lucro_pct:+.2f}%)")
             
-            # ✅ Sucesso: Reseta contador de erros
-            if pair in self._sell_attempts:
-                self._sell_attempts[pair]['error_count'] = 0
-            
+            self.retry.sucesso(pair)
             return True
             
-        except BinanceAPIException as e:
-            # 🚨 Registra erro e ativa cooldown
-            if pair not in self._sell_attempts:
-                self._sell_attempts[pair] = {'last_attempt': 0, 'error_count': 0}
-            
-            self._sell_attempts[pair]['last_attempt'] = now
-            self._sell_attempts[pair]['error_count'] += 1
-            
-            # Se é erro de saldo ou NOTIONAL, aumenta o cooldown
-            if 'insufficient balance' in str(e).lower() or 'NOTIONAL' in str(e):
-                logger.error(f"❌ Erro ao fechar parcial {pair}: {e.message} (cooldown de {self._sell_cooldown}s ativado)")
-            else:
-                logger.error(f"❌ Erro ao fechar parcial {pair}: {e}")
-            
-            return False
         except Exception as e:
-            # 🚨 Registra erro genérico
-            if pair not in self._sell_attempts:
-                self._sell_attempts[pair] = {'last_attempt': 0, 'error_count': 0}
-            
-            self._sell_attempts[pair]['last_attempt'] = now
-            self._sell_attempts[pair]['error_count'] += 1
-            
-            logger.error(f"❌ Erro ao fechar parcial {pair}: {e}")
+            # ⏳ Política pelo tipo de erro (NOTIONAL, saldo, timestamp, rede...) e nova tentativa agendada
+            logger.error(f"❌ Erro ao fechar parcial {pair}: {getattr(e, 'message', None) or e}")
+            self.retry.falhou(pair, PARCIAL, motivo, e, quantidade)
             return False
 
-    async def fechar_posicao(self, pair, motivo):
-        """Fecha posição e reporta lucro líquido - com ajuste de LOT_SIZE."""
+    async def fechar_posicao(self, pair, motivo, agendada=False):
+        """
+        Fecha posição e reporta lucro líquido - com ajuste de LOT_SIZE. 🧷 Uma venda por vez no par.
+        ⏳ Com uma saída do par aguardando nova tentativa, só o agendador (agendada=True) vende.
+        """
         if pair not in self.active_trades:
             return
-        
-        # 🛡️ COOLDOWN: Verifica se houve tentativa recente com erro
-        now = datetime.now().timestamp()
-        if pair in self._sell_attempts:
-            last_attempt = self._sell_attempts[pair].get('last_attempt', 0)
-            error_count = self._sell_attempts[pair].get('error_count', 0)
-            
-            # Se teve erro recente e está em cooldown, não tenta novamente
-            if error_count > 0 and (now - last_attempt) < self._sell_cooldown:
-                logger.debug(f"⏸️ {pair}: Em cooldown após erro (aguardando {self._sell_cooldown - (now - last_attempt):.1f}s)")
+        if not agendada and self.retry.assumir(pair, TOTAL, motivo):
+            return
+        if not agendada and self.active_trades[pair].get('saldo_divergente'):
+            logger.debug(f"⏳ {pair}: venda recusada por saldo aguardando mudança na carteira")
+            return
+        trava = self.intencoes.trava(pair)
+        if trava.locked():
+            logger.debug(f"🧷 {pair}: ordem em andamento - fechamento fica para o próximo tick")
+            return
+        async with trava:
+            # A venda em voo pode ter encerrado a posição enquanto esperávamos
+            if pair not in self.active_trades or not await self._liberar_intencao(pair):
                 return
+            intencao = self.intencoes.abrir(pair, 'SELL', motivo)
+            if intencao is None:
+                return
+            tinha_oco = bool(self.active_trades[pair].get('oco'))
+            try:
+                await self._fechar_posicao(intencao, motivo)
+            finally:
+                self.intencoes.descartar(intencao)
+                await self._reproteger(pair, tinha_oco)
+
+    async def _reproteger(self, pair, tinha_oco):
+        """🛡️ A venda cancelou a OCO e a posição continua (parcial ou venda que falhou): nova OCO."""
+        trade = self.active_trades.get(pair)
+        if tinha_oco and trade is not None and not trade.get('oco'):
+            await self.oco.proteger(pair)
+
+    async def _fechar_posicao(self, intencao, motivo):
+        pair = intencao.symbol
         
         trade = self.active_trades[pair]
         
         try:
-            client = await self._get_client()
-            
-            # 🔧 Ajusta quantidade para o LOT_SIZE mínimo da Binance
-            quantidade_ajustada = trade['qty']
-            qty_prec = self.precisoes.get(pair, 4)  # Pega precisão como int
+            # 🔧 Ajusta quantidade para o LOT_SIZE da Binance e checa NOTIONAL antes de enviar
+            preco_ref = self.ultimos_precos.get(pair, trade['entry_price'])
+            quantidade_ajustada, filtro = self.ajustar_quantidade(pair, trade['qty'], preco_ref)
             
-            # Arredonda para a precisão correta
-            quantidade_ajustada = math.floor(quantidade_ajustada * (10**qty_prec)) / (10**qty_prec)
+            if quantidade_ajustada <= 0 or filtro:
+                # Poeira abaixo do mínimo da Binance: nada de ordem rejeitada nem cooldown a cada tick
+                if not trade.get('abaixo_minimo'):
+                    logger.warning(f"⚠️ {pair}: Quantidade {trade['qty']:.8f} abaixo do mínimo "
+                                   f"({filtro or 'qty=0'}) - Pulando venda")
+                    trade['abaixo_minimo'] = True
+                return
             
-            if quantidade_ajustada <= 0:
-                logger.warning(f"⚠️ {pair}: Quantidade {quantidade_ajustada:.8f} insuficiente - Pulando venda")
+            # 🛡️ A OCO trava o saldo: cancela antes (se ela já executou, o fill encerra a posição)
+            if not await self.oco.cancelar(pair, trade):
                 return
             
-            venda = await client.order_market_sell(symbol=pair, quantity=quantidade_ajustada)
-            
-            precos_fills = [float(f['price']) for f in venda.get('fills', [])]
-            preco_venda = sum(precos_fills) / len(precos_fills) if precos_fills else 0.0
-            
-            # Cálculo de PnL descontando taxas estimadas de ida e volta
-            investido = trade['qty'] * trade['entry_price']
-            retornado = trade['qty'] * preco_venda
-            pnl_liquido = retornado - investido
-            pnl_liquido -= (investido + retornado) * self.taxa_binance
-            pnl_pct = (pnl_liquido / investido) * 100 if investido > 0 else 0
-
-            logger.info(f"💰 {pair} fechado ({motivo}). PnL: ${pnl_liquido:.2f}")
-
-            # 📲 Notificação Telegram - VENDA COMPLETA
-            emoji = "💰" if pnl_liquido > 0 else "📉"
-            msg_venda = (
-                f"{emoji} <b>VENDA COMPLETA</b>\n"
-                f"💎 Moeda: <b>{pair}</b>\n"
-                f"💰 Lucro: <b>${pnl_liquido:+.2f} USDT ({pnl_pct:+.2f}%)</b>\n"
-                f"📊 Preço Venda: <b>${preco_venda:.6f}</b>\n"
-                f"📈 Preço Compra: ${trade['entry_price']:.6f}\n"
-                f"🎯 Motivo: {motivo}"
-            )
-            self.enviar_telegram(msg_venda)
-
-            if self.callback_pnl:
-                await self.callback_pnl(pair, pnl_liquido, trade['estrategia'])
+            venda = await self._enviar_ordem(intencao, 'order_market_sell',
+                                             quantity=self.qty_para_api(pair, quantidade_ajustada))
             
-            # 🎯 Registra venda no histórico de previsões
-            if self.monitor_previsoes:
-                await self.monitor_previsoes.registrar_venda(pair, preco_venda, pnl_pct, motivo)
-
-            # ✅ Sucesso: Reseta contador de erros e remove posição
-            if pair in self._sell_attempts:
-                del self._sell_attempts[pair]
-            if pair in self._trailing_checks:
-                logger.info(f"📊 {pair}: Finalizado após {self._trailing_checks[pair]} verificações de trailing")
-                del self._trailing_checks[pair]
+            execucao = resumir_execucao(venda, self.precos_taxa, self.taxa_binance)
+            await self.registrar_fechamento(pair, trade, execucao, motivo)
             
-            del self.active_trades[pair]
+            self.retry.sucesso(pair)
             
-        except BinanceAPIException as e:
-            # 🚨 Registra erro e ativa cooldown
-            if pair not in self._sell_attempts:
-                self._sell_attempts[pair] = {'last_attempt': 0, 'error_count': 0}
-            
-            self._sell_attempts[pair]['last_attempt'] = now
-            self._sell_attempts[pair]['error_count'] += 1
-            
-            # Se é erro de saldo, aumenta o cooldown e para de tentar
-            if 'insufficient balance' in str(e).lower():
-                logger.error(f"❌ Erro Binance ao fechar {pair}: {e.message} (posição possivelmente já vendida)")
-                # Remove da lista para evitar tentativas futuras
-                if pair in self.active_trades:
-                    del self.active_trades[pair]
-                if pair in self._sell_attempts:
-                    del self._sell_attempts[pair]
-                if pair in self._trailing_checks:
-                    del self._trailing_checks[pair]
-            else:
-                logger.error(f"❌ Erro Binance ao fechar {pair}: {e.message} (cooldown de {self._sell_cooldown}s)")
-                
         except Exception as e:
-            # 🚨 Registra erro genérico
-            if pair not in self._sell_attempts:
-                self._sell_attempts[pair] = {'last_attempt': 0, 'error_count': 0}
-            
-            self._sell_attempts[pair]['last_attempt'] = now
-            self._sell_attempts[pair]['error_count'] += 1
-            
-            logger.error(f"❌ Erro ao fechar {pair}: {e}")
+            # ⏳ Política pelo tipo de erro (NOTIONAL, saldo, timestamp, rede...) e nova tentativa agendada
+            logger.error(f"❌ Erro ao fechar {pair}: {getattr(e, 'message', None) or e}")
+            self.retry.falhou(pair, TOTAL, motivo, e)
+
+    async def registrar_fechamento(self, pair, trade, execucao, motivo):
+        """Encerra a posição a partir da execução da venda: PnL líquido, Telegram, callbacks e limpeza."""
+        # 🧾 PnL com as taxas reais da compra e da venda sobre a quantidade executada
+        preco_venda = execucao.preco_medio
+        investido = execucao.qty_executada * trade['entry_price'] + trade.get('taxa_entrada', 0.0)
+        pnl_liquido = execucao.valor_liquido - investido
+        pnl_pct = (pnl_liquido / investido) * 100 if investido > 0 else 0
+
+        logger.info(f"💰 {pair} fechado ({motivo}). PnL: ${pnl_liquido:.2f}")
+
+        # 📲 Notificação Telegram - VENDA COMPLETA
+        emoji = "💰" if pnl_liquido > 0 else "📉"
+        msg_venda = (
+            f"{emoji} <b>VENDA COMPLETA</b>\n"
+            f"💎 Moeda: <b>{pair}</b>\n"
+            f"💰 Lucro: <b>${pnl_liquido:+.2f} USDT ({pnl_pct:+.2f}%)</b>\n"
+            f"📊 Preço Venda: <b>${preco_venda:.6f}</b>\n"
+            f"📈 Preço Compra: ${trade['entry_price']:.6f}\n"
+            f"🎯 Motivo: {motivo}"
+        )
+        self.enviar_telegram(msg_venda)
+
+        if self.callback_pnl:
+            await self.callback_pnl(pair, pnl_liquido, trade['estrategia'])
+        
+        # 🎯 Registra venda no histórico de previsões
+        if self.monitor_previsoes:
+            await self.monitor_previsoes.registrar_venda(pair, preco_venda, pnl_pct, motivo)
+
+        if pair in self._trailing_checks:
+            logger.info(f"📊 {pair}: Finalizado após {self._trailing_checks[pair]} verificações de trailing")
+            del self._trailing_checks[pair]
+        self.active_trades.pop(pair, None)
 
     async def gerenciar_trailing_stop(self, pair, preco_atual):
         """
@@ -736,6 +1007,12 @@ class ExecutorBot:
             return False
         
         trade = self.active_trades[pair]
+        self.ultimos_precos[pair] = preco_atual
+        
+        # 🛡️ Stop e TP já estão na Binance: só tempo máximo e trailing por cancel-replace
+        if trade.get('oco'):
+            return await self.oco.no_tick(pair, trade, preco_atual)
+        
         lucro_atual = (preco_atual / trade['entry_price']) - 1
         
         # ⏱️ Calcula tempo na posição em segundos e horas
@@ -817,9 +1094,7 @@ class ExecutorBot:
                 success = await self.fechar_posicao_parcial(pair, quantidade_vender, exit_strategy['reason'])
                 
                 if success:
-                    # Atualiza quantidade restante
-                    trade['qty'] -= quantidade_vender
-                    
+                    # Quantidade restante já atualizada por fechar_posicao_parcial com a execução real
                     # Se vendeu tudo, remove da lista
                     if trade['qty'] <= 0.01:  # Margem de segurança
                         logger.info(f"✅ {pair} vendido completamente via escalonamento")
@@ -871,18 +1146,16 @@ class ExecutorBot:
             # 🧠 DECISÃO INTELIGENTE: Vender ou Renovar?
             if self.cerebro_stop_loss:
                 try:
-                    # Busca buffer de preços (se disponível)
-                    buffer_precos = []
-                    if self.monitor and hasattr(self.monitor, 'buffers'):
-                        buffer_precos = self.monitor.buffers.get(pair, [])
+                    # Features já mantidas vela a vela (None = ainda sem barras suficientes → VENDER)
+                    features = self.features_cerebro.obter(pair, preco_atual) if self.features_cerebro else None
                     
-                    # Consulta o cérebro
-                    decisao_cerebro = self.cerebro_stop_loss.decidir_venda_ou_renovacao(
-                        symbol=pair,
-                        preco_atual=preco_atual,
-                        preco_entrada=trade['entry_price'],
-                        buffer_precos=buffer_precos if buffer_precos else [preco_atual],
-                        tempo_posicao_horas=horas_posicao
+                    # Consulta o cérebro em thread, com timeout: nunca segura o tick de outras moedas
+                    decisao_cerebro = await asyncio.wait_for(
+                        asyncio.to_thread(
+                            self.cerebro_stop_loss.decidir_com_features,
+                            pair, preco_atual, trade['entry_price'], features, horas_posicao
+                        ),
+                        timeout=self.timeout_cerebro
                     )
                     
                     if decisao_cerebro['decisao'] == 'RENOVAR':
@@ -931,6 +1204,8 @@ class ExecutorBot:
                         logger.warning(f"   💡 Motivo: {decisao_cerebro['motivo']}")
                         logger.warning(f"   🎯 Confiança: {decisao_cerebro['confianca']:.1%}")
                         
+                except asyncio.TimeoutError:
+                    logger.error(f"⏱️ Cérebro excedeu {self.timeout_cerebro:.1f}s para {pair} - vendendo por segurança")
                 except Exception as e:
                     logger.error(f"❌ Erro ao consultar Cérebro para {pair}: {e}")
                     # Em caso de erro, vende por segurança
@@ -946,4 +1221,5 @@ class ExecutorBot:
     async def fechar_todos_clientes(self):
         if self.client:
             await self.client.close_connection()
-            self.client = None
\ No newline at end of file
+            self.client = None
+            self._regras_carregadas = False
\ No newline at end of file
@@ -145,6 +145,9 @@ class GuardiaoBot:
                 if symbol in self.executor.active_trades:
                     logger.warning(f"🚫 {symbol} já possui trade ativo. Abortando.")
                     return False, "MOEDA_JA_ATIVA"
+                if hasattr(self.executor, 'intencoes') and self.executor.intencoes.ocupado(symbol):
+                    logger.warning(f"🚫 {symbol} já possui ordem em andamento. Abortando.")
+                    return False, "ORDEM_EM_ANDAMENTO"
                 
                 # 3. Regra de Ouro: Exposição Máxima - USO TOTAL DA EXPOSIÇÃO
                 # Conta APENAS trades novos (não-legacy) no limite de 10 por bot (100% exposição)
@@ -0,0 +1,201 @@
+"""
+🧷 INTENÇÕES DE ORDEM POR SÍMBOLO
+Várias corrotinas podem agir sobre o mesmo par ao mesmo tempo: o SniperMonitor
+dispara executar_ordem_sniper com create_task, o trailing stop pode chamar
+fechar_posicao com uma venda parcial ainda em voo, e a reconciliação da carteira
+mexe no active_trades em paralelo.
+
+Toda ordem do executor agora nasce como uma IntencaoOrdem:
+
+    PENDENTE → ENVIADA → EXECUTADA
+                       ↘ REJEITADA
+                       ↘ INCERTA (timeout/rede: não se sabe se a Binance aceitou)
+                            → EXECUTADA / REJEITADA, consultando pelo client order id
+
+e só é criada com a trava do símbolo livre. Quem encontra a trava ocupada desiste
+na hora (não enfileira): o próximo tick reavalia com o estado já atualizado - é
+isso que impede compra duplicada e venda dupla.
+
+O newClientOrderId (client_order_id do user_stream) é a chave de idempotência:
+uma ordem INCERTA é resolvida com get_order(origClientOrderId=...) em vez de
+reenviada às cegas. Logo após um timeout a ordem pode ainda não aparecer na consulta:
+"não existe" (-2013) só vale depois de R7_ORDEM_INCERTA_S e de duas consultas.
+
+Configuração via .env:
+    R7_ORDEM_INCERTA_S=5      # idade mínima da INCERTA para aceitar -2013 como rejeição
+"""
+import asyncio
+import collections
+import logging
+import os
+import time
+
+from bots.user_stream import client_order_id
+
+logger = logging.getLogger('order_intents')
+
+PENDENTE = 'PENDENTE'
+ENVIADA = 'ENVIADA'
+EXECUTADA = 'EXECUTADA'
+REJEITADA = 'REJEITADA'
+INCERTA = 'INCERTA'
+
+TRANSICOES = {
+    PENDENTE: {ENVIADA, REJEITADA},
+    ENVIADA: {EXECUTADA, REJEITADA, INCERTA},
+    INCERTA: {EXECUTADA, REJEITADA},
+    EXECUTADA: set(),
+    REJEITADA: set(),
+}
+FINAIS = {EXECUTADA, REJEITADA}
+
+
+CONSULTAS_INEXISTENTE = 2
+
+
+class TransicaoInvalida(RuntimeError):
+    pass
+
+
+class AindaIncerta(RuntimeError):
+    """A Binance ainda não mostra a ordem, mas é cedo para concluir que ela não existe."""
+
+
+class IntencaoOrdem:
+    """Uma ordem do bot, do momento em que foi decidida até a resposta final."""
+
+    __slots__ = ('symbol', 'lado', 'motivo', 'client_id', 'estado', 'criada_em', 'atualizada_em',
+                 'erro', 'resposta', 'nao_encontrada')
+
+    def __init__(self, symbol, lado, motivo=''):
+        self.symbol = symbol
+        self.lado = lado
+        self.motivo = motivo
+        self.client_id = client_order_id('B' if lado == 'BUY' else 'S')
+        self.estado = PENDENTE
+        self.criada_em = time.time()
+        self.atualizada_em = self.criada_em
+        self.erro = None
+        self.resposta = None
+        self.nao_encontrada = 0  # Consultas que voltaram -2013 enquanto INCERTA
+
+    @property
+    def ativa(self):
+        return self.estado not in FINAIS
+
+    def mudar(self, estado, erro=None, resposta=None):
+        if estado not in TRANSICOES[self.estado]:
+            raise TransicaoInvalida(f"{self.symbol} {self.client_id}: {self.estado} → {estado}")
+        self.estado = estado
+        self.atualizada_em = time.time()
+        if erro is not None:
+            self.erro = str(erro)[:200]
+        if resposta is not None:
+            self.resposta = resposta
+
+    def __repr__(self):
+        return f"IntencaoOrdem({self.symbol} {self.lado} {self.estado} {self.client_id})"
+
+
+class LivroIntencoes:
+    """Travas por símbolo + intenções em andamento + histórico curto para diagnóstico."""
+
+    def __init__(self, historico=200):
+        self._travas = collections.defaultdict(asyncio.Lock)
+        self._ativas = {}  # symbol -> IntencaoOrdem
+        self.historico = collections.deque(maxlen=historico)
+        self.espera_inexistente = float(os.getenv('R7_ORDEM_INCERTA_S', '5'))
+        self.stats = {'criadas': 0, 'bloqueadas': 0, 'executadas': 0, 'rejeitadas': 0, 'incertas': 0}
+
+    def trava(self, symbol):
+        return self._travas[symbol]
+
+    def ocupado(self, symbol):
+        """True se há ordem em andamento no símbolo (trava tomada ou intenção não finalizada)."""
+        return self.em_voo(symbol) or symbol in self._ativas
+
+    def em_voo(self, symbol):
+        """True enquanto uma corrotina está no meio de uma ordem do símbolo."""
+        trava = self._travas.get(symbol)
+        return trava is not None and trava.locked()
+
+    def ativa(self, symbol):
+        return self._ativas.get(symbol)
+
+    def abrir(self, symbol, lado, motivo=''):
+        """Registra a intenção (chamar com a trava do símbolo já tomada). None se já houver outra."""
+        atual = self._ativas.get(symbol)
+        if atual is not None:
+            self.stats['bloqueadas'] += 1
+            logger.warning(f"🧷 {symbol}: {lado} ignorada - {atual.lado} {atual.estado} em andamento ({atual.client_id})")
+            return None
+        intencao = IntencaoOrdem(symbol, lado, motivo)
+        self._ativas[symbol] = intencao
+        self.stats['criadas'] += 1
+        return intencao
+
+    def enviada(self, intencao):
+        intencao.mudar(ENVIADA)
+
+    def executada(self, intencao, resposta=None):
+        intencao.mudar(EXECUTADA, resposta=resposta)
+        self.stats['executadas'] += 1
+        self._fechar(intencao)
+
+    def rejeitada(self, intencao, erro=None):
+        intencao.mudar(REJEITADA, erro=erro)
+        self.stats['rejeitadas'] += 1
+        self._fechar(intencao)
+
+    def incerta(self, intencao, erro=None):
+        """Fica ativa: nenhuma nova ordem no símbolo até resolver()."""
+        intencao.mudar(INCERTA, erro=erro)
+        self.stats['incertas'] += 1
+        logger.warning(f"❓ {intencao.symbol}: resultado da ordem {intencao.client_id} desconhecido ({intencao.erro})")
+
+    def descartar(self, intencao):
+        """Fim do fluxo: intenção que nem chegou a ser enviada (filtro, saldo, erro local) sai do livro."""
+        if intencao.estado == PENDENTE:
+            intencao.mudar(REJEITADA, erro='não enviada')
+            self._fechar(intencao)
+
+    def _fechar(self, intencao):
+        if self._ativas.get(intencao.symbol) is intencao:
+            del self._ativas[intencao.symbol]
+        self.historico.append(intencao)
+
+    async def resolver(self, client, intencao):
+        """
+        Consulta a ordem INCERTA pelo client order id. Retorna a resposta da Binance se ela
+        existir (EXECUTADA), None se a Binance não a conhece (REJEITADA). Erro de rede mantém INCERTA;
+        -2013 cedo demais (ordem ainda não visível) levanta AindaIncerta.
+        """
+        from binance.exceptions import BinanceAPIException
+
+        try:
+            ordem = await client.get_order(symbol=intencao.symbol, origClientOrderId=intencao.client_id)
+        except BinanceAPIException as e:
+            if e.code == -2013:  # Order does not exist
+                intencao.nao_encontrada += 1
+                idade = time.time() - intencao.atualizada_em
+                if intencao.nao_encontrada < CONSULTAS_INEXISTENTE or idade < self.espera_inexistente:
+                    raise AindaIncerta(f"{intencao.client_id} ainda não visível ({idade:.1f}s)") from e
+                self.rejeitada(intencao, erro='ordem não chegou à Binance')
+                return None
+            raise
+        if ordem.get('status') in ('FILLED', 'PARTIALLY_FILLED') or float(ordem.get('executedQty') or 0) > 0:
+            self.executada(intencao, resposta=ordem)
+            return ordem
+        self.rejeitada(intencao, erro=f"status {ordem.get('status')}")
+        return None
+
+    async def resolver_pendentes(self, client):
+        """Resolve todas as intenções INCERTAS (chamado na reconciliação da carteira)."""
+        resolvidas = []
+        for intencao in [i for i in self._ativas.values() if i.estado == INCERTA]:
+            async with self.trava(intencao.symbol):
+                try:
+                    resolvidas.append((intencao, await self.resolver(client, intencao)))
+                except Exception as e:
+                    logger.warning(f"⚠️ {intencao.symbol}: não foi possível consultar {intencao.client_id}: {e}")
+        return resolvidas
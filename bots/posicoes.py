@@ -0,0 +1,250 @@
+"""
+📦 LIVRO DE POSIÇÕES
+O active_trades do executor era um dict de dicts montados à mão em quatro lugares
+(compra do sniper, adoção na reconciliação, compra externa do stream) e sumia a cada
+restart: a adoção recriava as posições com entry_time = agora, zerando as saídas por
+tempo (R7_MAX_HOLD_HOURS) e o trailing já andado.
+
+    Posicao         __slots__ com os campos conhecidos + 'extras' para chaves avulsas;
+                    aceita trade['sl'] / trade.get('oco') / 'taxa_entrada' in trade,
+                    então o código existente não muda
+    LivroPosicoes   dict symbol → Posicao (dicts atribuídos viram Posicao) que marca
+                    alteração em toda escrita
+    snapshot        pickle binário em data/posicoes.snapshot: a cada
+                    R7_POSICOES_SNAPSHOT_S e logo após uma alteração (com intervalo
+                    mínimo R7_POSICOES_DEBOUNCE_S entre gravações)
+
+No startup o executor carrega o snapshot (milissegundos, sem rede) e a primeira
+reconciliação confere as posições restauradas contra o saldo real da carteira.
+Cada gravação também exporta data/active_trades.json, lido pelo dashboard.
+
+Configuração via .env:
+    R7_POSICOES_SNAPSHOT_S=30     # gravação periódica
+    R7_POSICOES_DEBOUNCE_S=1      # intervalo mínimo entre gravações por alteração
+"""
+import asyncio
+import copy
+import logging
+import os
+import pickle
+import time
+
+from utils.arquivos import escrever_json_atomico
+
+logger = logging.getLogger('posicoes')
+
+SNAPSHOT_PATH = os.path.join('data', 'posicoes.snapshot')
+JSON_PATH = os.path.join('data', 'active_trades.json')
+VERSAO_SNAPSHOT = 1
+
+
+class Posicao:
+    """Posição aberta do executor; acesso por atributo ou como dict."""
+
+    __slots__ = ('symbol', 'qty', 'entry_price', 'taxa_entrada', 'tp', 'sl', 'estrategia', 'confianca',
+                 'legacy', 'entry_time', 'oco', 'abaixo_minimo', 'renovacoes', 'renovacao_desabilitada',
+                 'extras', '_livro')
+
+    CAMPOS = __slots__[1:-2]  # Persistidos posição a posição (symbol é a chave; extras vai à parte)
+    _AUSENTE = object()
+
+    def __init__(self, symbol, dados=None, livro=None):
+        self.symbol = symbol
+        self.extras = {}
+        self._livro = None
+        for chave, valor in (dados or {}).items():
+            self[chave] = valor
+        self._livro = livro
+
+    # ------------------------------------------------------------------ interface de dict
+
+    def __getitem__(self, chave):
+        if chave in self.CAMPOS:
+            try:
+                return getattr(self, chave)
+            except AttributeError:
+                raise KeyError(chave) from None
+        return self.extras[chave]
+
+    def __setitem__(self, chave, valor):
+        if chave in self.CAMPOS:
+            setattr(self, chave, valor)
+        else:
+            self.extras[chave] = valor
+        if self._livro is not None:
+            self._livro.marcar_alteracao()
+
+    def __delitem__(self, chave):
+        if chave in self.CAMPOS:
+            try:
+                delattr(self, chave)
+            except AttributeError:
+                raise KeyError(chave) from None
+        else:
+            del self.extras[chave]
+        if self._livro is not None:
+            self._livro.marcar_alteracao()
+
+    def __contains__(self, chave):
+        if chave in self.CAMPOS:
+            return hasattr(self, chave)
+        return chave in self.extras
+
+    def get(self, chave, padrao=None):
+        if chave in self.CAMPOS:
+            return getattr(self, chave, padrao)
+        return self.extras.get(chave, padrao)
+
+    def pop(self, chave, padrao=_AUSENTE):
+        try:
+            valor = self[chave]
+        except KeyError:
+            if padrao is self._AUSENTE:
+                raise
+            return padrao
+        del self[chave]
+        return valor
+
+    def keys(self):
+        return [c for c in self.CAMPOS if hasattr(self, c)] + list(self.extras)
+
+    def items(self):
+        return [(c, self[c]) for c in self.keys()]
+
+    def para_dict(self):
+        return dict(self.items())
+
+    # ------------------------------------------------------------------ snapshot
+
+    def para_tupla(self):
+        """(symbol, máscara dos campos presentes, valores presentes, extras) - compacto no pickle."""
+        mascara, valores = 0, []
+        for i, campo in enumerate(self.CAMPOS):
+            if hasattr(self, campo):
+                mascara |= 1 << i
+                valores.append(getattr(self, campo))
+        return self.symbol, mascara, tuple(valores), self.extras
+
+    @classmethod
+    def de_tupla(cls, campos, tupla):
+        """Inverso de para_tupla; 'campos' é a lista gravada no snapshot (tolera campos novos/removidos)."""
+        symbol, mascara, valores, extras = tupla
+        posicao = cls(symbol)
+        valores = iter(valores)
+        for i, campo in enumerate(campos):
+            if mascara >> i & 1:
+                posicao[campo] = next(valores)
+        posicao.extras.update(extras)
+        return posicao
+
+    def __repr__(self):
+        return (f"Posicao({self.symbol} qty={self.get('qty')} entrada={self.get('entry_price')} "
+                f"sl={self.get('sl')} tp={self.get('tp')})")
+
+
+class LivroPosicoes(dict):
+    """symbol → Posicao. Toda escrita (no livro ou numa posição) agenda um snapshot."""
+
+    def __init__(self, path=SNAPSHOT_PATH, json_path=JSON_PATH, intervalo_s=None, debounce_s=None):
+        super().__init__()
+        self.path = path
+        self.json_path = json_path
+        self.intervalo = float(intervalo_s if intervalo_s is not None else os.getenv('R7_POSICOES_SNAPSHOT_S', '30'))
+        self.debounce = float(debounce_s if debounce_s is not None else os.getenv('R7_POSICOES_DEBOUNCE_S', '1'))
+        self.restauradas = set()  # Vieram do snapshot e ainda não foram conferidas com a carteira
+        self.alterado = False
+        self._evento = None
+        self.stats = {'gravacoes': 0, 'erros': 0, 'ultima_gravacao_ms': 0.0}
+
+    def __setitem__(self, symbol, posicao):
+        if not isinstance(posicao, Posicao):
+            posicao = Posicao(symbol, posicao)
+        posicao.symbol = symbol
+        posicao._livro = self
+        super().__setitem__(symbol, posicao)
+        self.marcar_alteracao()
+
+    def __delitem__(self, symbol):
+        super().__delitem__(symbol)
+        self.restauradas.discard(symbol)
+        self.marcar_alteracao()
+
+    def pop(self, symbol, *padrao):
+        existia = symbol in self
+        valor = super().pop(symbol, *padrao)
+        if existia:
+            self.restauradas.discard(symbol)
+            self.marcar_alteracao()
+        return valor
+
+    def marcar_alteracao(self):
+        self.alterado = True
+        if self._evento is not None:
+            self._evento.set()
+
+    # ------------------------------------------------------------------ disco
+
+    def montar_snapshot(self):
+        """Cópia do estado (no event loop: a gravação em thread nunca vê uma posição pela metade)."""
+        self.alterado = False
+        return copy.deepcopy({'versao': VERSAO_SNAPSHOT, 'salvo_em': time.time(), 'campos': list(Posicao.CAMPOS),
+                              'posicoes': [p.para_tupla() for p in self.values()]})
+
+    def gravar(self, dados):
+        """Grava o snapshot binário (atômico) e o JSON do dashboard."""
+        inicio = time.perf_counter()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp = self.path + '.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self.path)
+        if self.json_path:
+            campos = dados['campos']
+            escrever_json_atomico(self.json_path, {
+                t[0]: Posicao.de_tupla(campos, t).para_dict() for t in dados['posicoes']})
+        self.stats['gravacoes'] += 1
+        self.stats['ultima_gravacao_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+
+    def salvar(self):
+        self.gravar(self.montar_snapshot())
+
+    def carregar(self):
+        """Restaura as posições do snapshot (startup). Retorna quantas vieram."""
+        try:
+            with open(self.path, 'rb') as f:
+                dados = pickle.load(f)
+            if dados.get('versao') != VERSAO_SNAPSHOT:
+                logger.info("📦 Snapshot de posições em versão antiga - ignorado")
+                return 0
+            posicoes = [Posicao.de_tupla(dados['campos'], t) for t in dados['posicoes']]
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot de posições ilegível ({e}) - posições serão readotadas da carteira")
+            return 0
+        for posicao in posicoes:
+            oco = posicao.get('oco')
+            if oco:
+                oco['atualizado_em'] = 0.0  # Relógio monotônico do processo anterior não vale aqui
+            dict.__setitem__(self, posicao.symbol, posicao)
+            posicao._livro = self
+            self.restauradas.add(posicao.symbol)
+        idade_min = (time.time() - float(dados.get('salvo_em', 0))) / 60
+        logger.info(f"📦 {len(posicoes)} posições restauradas do snapshot ({idade_min:.1f} min)")
+        return len(posicoes)
+
+    async def loop(self):
+        """Grava logo após alterações (no máximo uma vez por debounce) e a cada intervalo."""
+        self._evento = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.intervalo)
+                await asyncio.sleep(self.debounce)  # Junta a rajada de escritas do mesmo tick
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            try:
+                await asyncio.to_thread(self.gravar, self.montar_snapshot())
+            except Exception as e:
+                self.stats['erros'] += 1
+                logger.error(f"❌ Erro ao gravar snapshot de posições: {e}")
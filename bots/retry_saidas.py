@@ -0,0 +1,317 @@
+"""
+⏳ REPETIÇÃO AGENDADA DE SAÍDAS QUE FALHARAM
+Antes, uma venda que falhava gravava um timestamp em _sell_attempts e cada tick
+seguinte conferia o _sell_cooldown: a nova tentativa dependia de chegar tick. Moeda
+parada nunca era repetida; moeda agitada reavaliava o cooldown dezenas de vezes por
+segundo.
+
+Agora a saída que falhou vira uma TentativaSaida de um agendador (min-heap pela hora
+da próxima tentativa), que a repete sozinho com backoff exponencial + jitter.
+Enquanto ela estiver agendada, os ticks do par não disparam outra venda (um lookup
+O(1)); um fechamento total pedido no meio promove uma parcial pendente.
+
+Cada erro cai numa política:
+    NOTIONAL / LOT_SIZE   sem repetição: posição marcada abaixo do mínimo (poeira)
+    SALDO                 saldo livre menor: repete com o saldo; esgotou as tentativas:
+                          confere a carteira (get_asset_balance) - vazia: posição encerrada;
+                          com moedas: posição marcada (saldo_divergente) e alerta
+    TIMESTAMP (-1021)     ressincroniza o relógio e repete logo
+    RATE_LIMIT (429/418)  backoff longo (o gateway já pausa o tráfego)
+    REDE / OUTRO          backoff exponencial curto, desiste após N tentativas
+
+Métricas (agendadas, tentativas, recuperadas, desistências, por categoria) vão para
+data/retry_saidas_metrics.json, a mesma superfície data/*.json do dashboard.
+"""
+import asyncio
+import collections
+import heapq
+import logging
+import os
+import random
+import time
+from datetime import datetime
+
+from binance.exceptions import BinanceAPIException
+
+from tools.ledger_custos import ativo_base
+from utils.arquivos import escrever_json_atomico
+
+logger = logging.getLogger('retry_saidas')
+
+METRICAS_PATH = os.path.join('data', 'retry_saidas_metrics.json')
+
+TOTAL, PARCIAL = 'TOTAL', 'PARCIAL'
+
+# categoria: (espera base s, espera máxima s, máx. tentativas, ação quando não repete)
+POLITICAS = {
+    'NOTIONAL': (0, 0, 0, 'poeira'),
+    'SALDO': (2, 2, 1, 'encerrar'),
+    'TIMESTAMP': (1, 10, 5, 'desistir'),
+    'RATE_LIMIT': (30, 300, 10, 'desistir'),
+    'OCUPADO': (1, 10, 20, 'desistir'),
+    'REDE': (2, 120, 8, 'desistir'),
+    'OUTRO': (2, 120, 8, 'desistir'),
+}
+
+
+def classificar_erro(erro):
+    """Categoria da política de repetição para o erro de uma ordem de venda."""
+    if erro is None:
+        return 'OCUPADO'
+    if not isinstance(erro, BinanceAPIException):
+        return 'REDE'
+    texto = str(getattr(erro, 'message', '') or erro).upper()
+    if erro.status_code in (418, 429) or erro.code in (-1003, -1015):
+        return 'RATE_LIMIT'
+    if erro.code == -1021:
+        return 'TIMESTAMP'
+    if 'INSUFFICIENT BALANCE' in texto:
+        return 'SALDO'
+    if erro.code == -1013 or 'NOTIONAL' in texto or 'LOT_SIZE' in texto:
+        return 'NOTIONAL'
+    return 'OUTRO'
+
+
+def calcular_espera(categoria, tentativa):
+    """Backoff exponencial com jitter (metade fixa + metade aleatória) limitado ao teto da política."""
+    base, teto, _, _ = POLITICAS[categoria]
+    espera = min(teto, base * 2 ** max(0, tentativa - 1))
+    return espera / 2 + random.uniform(0, espera / 2)
+
+
+class TentativaSaida:
+    """Saída que falhou e está aguardando a próxima tentativa."""
+
+    __slots__ = ('symbol', 'tipo', 'motivo', 'quantidade', 'tentativas', 'categoria', 'proximo_em', 'seq',
+                 'ultimo_erro', 'criada_em')
+
+    def __init__(self, symbol, tipo, motivo, quantidade=None):
+        self.symbol = symbol
+        self.tipo = tipo
+        self.motivo = motivo
+        self.quantidade = quantidade
+        self.tentativas = 0
+        self.categoria = None
+        self.proximo_em = 0.0
+        self.seq = 0
+        self.ultimo_erro = None
+        self.criada_em = time.time()
+
+    def __repr__(self):
+        return f"TentativaSaida({self.symbol} {self.tipo} #{self.tentativas} {self.categoria})"
+
+
+class AgendadorSaidas:
+    """Min-heap (próxima tentativa, seq, symbol) + uma tentativa pendente por símbolo."""
+
+    def __init__(self, executor, path=METRICAS_PATH):
+        self.executor = executor
+        self.path = path
+        self.time_sync = None  # TimeSyncManager (injetado pelo main.py) para erros de timestamp
+        self._heap = []
+        self._pendentes = {}
+        self._seq = 0
+        self._acordar = asyncio.Event()
+        self.stats = {'agendadas': 0, 'tentativas': 0, 'recuperadas': 0, 'desistencias': 0}
+        self.por_categoria = collections.Counter()
+
+    def __len__(self):
+        return len(self._pendentes)
+
+    def pendente(self, symbol):
+        return self._pendentes.get(symbol)
+
+    def assumir(self, symbol, tipo, motivo):
+        """
+        Chamado pelos fechamentos disparados por tick: True se a saída do par já está com
+        o agendador (o chamador não envia nada). Fechamento total promove uma parcial.
+        """
+        tentativa = self._pendentes.get(symbol)
+        if tentativa is None:
+            return False
+        if tipo == TOTAL and tentativa.tipo == PARCIAL:
+            tentativa.tipo, tentativa.motivo, tentativa.quantidade = TOTAL, motivo, None
+            logger.info(f"⏳ {symbol}: saída agendada promovida a fechamento total ({motivo})")
+        return True
+
+    # ------------------------------------------------------------------ resultado das vendas
+
+    def sucesso(self, symbol):
+        tentativa = self._pendentes.pop(symbol, None)
+        if tentativa is not None:
+            self.stats['recuperadas'] += 1
+            logger.info(f"✅ {symbol}: saída concluída na tentativa {tentativa.tentativas + 1} ({tentativa.motivo})")
+
+    def falhou(self, symbol, tipo, motivo, erro, quantidade=None):
+        """Registra a falha de uma venda e agenda (ou não) a próxima tentativa conforme a política."""
+        categoria = classificar_erro(erro)
+        self.por_categoria[categoria] += 1
+        tentativa = self._pendentes.get(symbol)
+        if tentativa is None:
+            tentativa = TentativaSaida(symbol, tipo, motivo, quantidade)
+            self.stats['agendadas'] += 1
+        else:
+            tentativa.tentativas += 1
+        tentativa.categoria = categoria
+        tentativa.ultimo_erro = str(getattr(erro, 'message', None) or erro)[:200] if erro is not None else None
+
+        _, _, max_tentativas, acao = POLITICAS[categoria]
+        if categoria == 'SALDO' and tipo == TOTAL and self._ajustar_ao_saldo(symbol):
+            acao = None  # Repete com a quantidade que de fato está livre
+        elif tentativa.tentativas >= max_tentativas:
+            self._encerrar_tentativa(tentativa, acao)
+            return None
+
+        self._agendar(tentativa, calcular_espera(categoria, tentativa.tentativas + 1))
+        logger.warning(f"⏳ {symbol}: venda falhou [{categoria}] ({tentativa.ultimo_erro}) - "
+                       f"tentativa {tentativa.tentativas + 1} em {tentativa.proximo_em - time.monotonic():.1f}s")
+        return tentativa
+
+    def _ajustar_ao_saldo(self, symbol):
+        """Insufficient balance com saldo livre conhecido e > 0: a posição passa a ser o saldo livre."""
+        trade = self.executor.active_trades.get(symbol)
+        saldo = self.executor.saldos.get(symbol[:-4] if symbol.endswith('USDT') else symbol)
+        if not trade or not saldo or saldo['free'] <= 0 or saldo['free'] >= trade['qty']:
+            return False
+        logger.warning(f"⏳ {symbol}: saldo livre {saldo['free']} < posição {trade['qty']} - vendendo o saldo livre")
+        trade['qty'] = saldo['free']
+        return True
+
+    def _encerrar_tentativa(self, tentativa, acao):
+        self._pendentes.pop(tentativa.symbol, None)
+        symbol = tentativa.symbol
+        trade = self.executor.active_trades.get(symbol)
+        if acao == 'poeira':
+            if trade is not None and tentativa.tipo == TOTAL:
+                trade['abaixo_minimo'] = True
+            logger.warning(f"⚠️ {symbol}: venda rejeitada por filtro ({tentativa.ultimo_erro}) - sem nova tentativa")
+        elif acao == 'encerrar' and tentativa.tipo == TOTAL:
+            # Continua pendente (ticks não vendem) até a carteira responder
+            self._pendentes[symbol] = tentativa
+            asyncio.ensure_future(self._conferir_saldo(tentativa))
+        else:
+            self.stats['desistencias'] += 1
+            logger.error(f"❌ {symbol}: venda desistida após {tentativa.tentativas + 1} tentativas "
+                         f"[{tentativa.categoria}] ({tentativa.ultimo_erro})")
+            if tentativa.categoria not in ('OCUPADO', 'SALDO'):
+                self.executor.enviar_telegram(
+                    f"🚨 <b>VENDA NÃO EXECUTADA</b>\n💎 {symbol}\n🎯 Motivo: {tentativa.motivo}\n"
+                    f"⚠️ {tentativa.categoria}: {tentativa.ultimo_erro}")
+
+    async def _conferir_saldo(self, tentativa):
+        """
+        Saldo insuficiente em todas as tentativas: o saldo em memória pode estar velho.
+        Consulta a carteira; só remove a posição se não sobrou nada (livre + bloqueado < $1).
+        """
+        symbol = tentativa.symbol
+        asset = ativo_base(symbol)
+        try:
+            client = await self.executor._get_client()
+            saldo = await client.get_asset_balance(asset=asset) or {}
+            livre, bloqueado = float(saldo.get('free') or 0), float(saldo.get('locked') or 0)
+            self.executor.atualizar_saldo(asset, livre, bloqueado)
+        except Exception as e:
+            livre = bloqueado = None
+            logger.warning(f"⚠️ {symbol}: não foi possível consultar o saldo de {asset}: {e}")
+        finally:
+            if self._pendentes.get(symbol) is tentativa:
+                self._pendentes.pop(symbol)
+
+        trade = self.executor.active_trades.get(symbol)
+        if trade is None:
+            return
+        preco = self.executor.ultimos_precos.get(symbol, trade['entry_price'])
+        if livre is not None and (livre + bloqueado) * preco < 1.0:
+            logger.error(f"❌ {symbol}: {tentativa.ultimo_erro} e carteira sem {asset} - posição já vendida, removendo")
+            self.executor.active_trades.pop(symbol, None)
+            self.executor._trailing_checks.pop(symbol, None)
+            return
+        # Ainda há moedas (ou a carteira não respondeu): fica no livro, sem venda automática até o saldo mudar
+        trade['saldo_divergente'] = True  # Cai no próximo atualizar_saldo do ativo
+        logger.error(f"❌ {symbol}: venda recusada por saldo, mas a carteira tem livre={livre} bloqueado={bloqueado} "
+                     f"(posição qty={trade['qty']}) - posição marcada, verifique")
+        self.executor.enviar_telegram(
+            f"🚨 <b>VENDA RECUSADA POR SALDO</b>\n💎 {symbol}\n🎯 Motivo: {tentativa.motivo}\n"
+            f"💰 Carteira: livre={livre} | bloqueado={bloqueado} | posição={trade['qty']}\n"
+            f"⚠️ Vendas automáticas pausadas até o saldo mudar")
+
+    def _agendar(self, tentativa, espera):
+        self._seq += 1
+        tentativa.seq = self._seq
+        tentativa.proximo_em = time.monotonic() + espera
+        self._pendentes[tentativa.symbol] = tentativa
+        heapq.heappush(self._heap, (tentativa.proximo_em, tentativa.seq, tentativa.symbol))
+        self._acordar.set()
+
+    # ------------------------------------------------------------------ loop
+
+    async def executar(self, intervalo_metricas=60):
+        """Dorme até a próxima tentativa vencer (ou uma nova ser agendada) e a executa."""
+        ultimo_export = time.monotonic()
+        while True:
+            espera = self._heap[0][0] - time.monotonic() if self._heap else intervalo_metricas
+            if espera > 0:
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=min(espera, intervalo_metricas))
+                except asyncio.TimeoutError:
+                    pass
+            if time.monotonic() - ultimo_export >= intervalo_metricas:
+                ultimo_export = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.exportar)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao exportar métricas de retry: {e}")
+            while self._heap and self._heap[0][0] <= time.monotonic():
+                _, seq, symbol = heapq.heappop(self._heap)
+                tentativa = self._pendentes.get(symbol)
+                if tentativa is None or tentativa.seq != seq:
+                    continue  # Entrada velha (reagendada ou concluída)
+                await self._tentar(tentativa)
+
+    async def _tentar(self, tentativa):
+        symbol = tentativa.symbol
+        if symbol not in self.executor.active_trades:
+            self._pendentes.pop(symbol, None)
+            return
+        self.stats['tentativas'] += 1
+        if tentativa.categoria == 'TIMESTAMP' and self.time_sync is not None:
+            await self.time_sync.sync_clock()
+        seq = tentativa.seq
+        try:
+            if tentativa.tipo == TOTAL:
+                await self.executor.fechar_posicao(symbol, tentativa.motivo, agendada=True)
+            else:
+                await self.executor.fechar_posicao_parcial(symbol, tentativa.quantidade, tentativa.motivo,
+                                                           agendada=True)
+        except Exception as e:
+            logger.error(f"❌ {symbol}: erro inesperado na repetição da venda: {e}")
+        # Nem sucesso nem falha registrados (par ocupado, OCO executando, poeira): decide aqui
+        if self._pendentes.get(symbol) is tentativa and tentativa.seq == seq:
+            trade = self.executor.active_trades.get(symbol)
+            if trade is None or trade.get('abaixo_minimo'):
+                self._pendentes.pop(symbol, None)
+            else:
+                self.falhou(symbol, tentativa.tipo, tentativa.motivo, None, tentativa.quantidade)
+
+    # ------------------------------------------------------------------ métricas
+
+    def snapshot(self):
+        agora = time.monotonic()
+        return {
+            'atualizado_em': datetime.now().isoformat(),
+            **self.stats,
+            'por_categoria': dict(self.por_categoria),
+            'pendentes': [
+                {'symbol': t.symbol, 'tipo': t.tipo, 'motivo': t.motivo, 'tentativas': t.tentativas,
+                 'categoria': t.categoria, 'proxima_em_s': round(max(0.0, t.proximo_em - agora), 1),
+                 'erro': t.ultimo_erro}
+                for t in self._pendentes.values()
+            ],
+        }
+
+    def exportar(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        dados = self.snapshot()
+        escrever_json_atomico(self.path, dados)
+        return dados
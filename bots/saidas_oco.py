@@ -0,0 +1,235 @@
+"""
+🛡️ SAÍDAS NA EXCHANGE (OCO)
+No modo padrão o stop e o take profit só existem dentro do processo: se o bot travar
+ou o websocket cair, ninguém vende. Com R7_EXIT_MODE=oco, logo após o fill da compra
+o executor deixa uma OCO de venda na Binance:
+
+    perna de cima:  LIMIT_MAKER no TP
+    perna de baixo: STOP_LOSS_LIMIT com gatilho no SL (limite R7_OCO_SL_GAP abaixo)
+
+e a posição continua protegida com o processo fora do ar. O trailing vira
+cancel-replace da OCO, limitado por símbolo (passo mínimo de subida do SL e intervalo
+mínimo entre trocas); o tick só faz contas O(1) e, na imensa maioria das vezes,
+nenhuma chamada REST.
+
+O fill de uma perna chega pelo user data stream (client id com PREFIXO_OCO) ou, sem
+stream, pela consulta da lista na reconciliação; a posição é encerrada com o mesmo
+registro de PnL do fechamento normal. Fechamentos pedidos pelo bot (timeout, guardião,
+venda parcial) cancelam a OCO antes, porque ela trava o saldo.
+
+Configuração via .env:
+    R7_EXIT_MODE=bot            # oco = stops na exchange
+    R7_OCO_SL_GAP=0.003         # distância do limite abaixo do gatilho do stop
+    R7_OCO_PASSO_MIN=0.002      # subida mínima do SL para valer um cancel-replace
+    R7_OCO_INTERVALO_S=30       # intervalo mínimo entre cancel-replace do mesmo par
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from binance.exceptions import BinanceAPIException
+
+from bots.user_stream import client_order_id
+from tools.execucao_ordem import resumir_execucao
+
+logger = logging.getLogger('saidas_oco')
+
+ORDEM_DESCONHECIDA = (-2011, -2013)  # Unknown order / Order does not exist: a lista já acabou
+
+
+def modo_oco():
+    return os.getenv('R7_EXIT_MODE', 'bot').lower() == 'oco'
+
+
+class SaidasOCO:
+    """OCOs de saída das posições do ExecutorBot; estado em trade['oco']."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.ativo = modo_oco()
+        self.sl_gap = float(os.getenv('R7_OCO_SL_GAP', '0.003'))
+        self.passo_min = float(os.getenv('R7_OCO_PASSO_MIN', '0.002'))
+        self.intervalo = float(os.getenv('R7_OCO_INTERVALO_S', '30'))
+        self.max_hold_h = float(os.getenv('R7_MAX_HOLD_HOURS', '72'))
+        self.stats = {'colocadas': 0, 'substituidas': 0, 'executadas': 0, 'falhas': 0}
+
+    # ------------------------------------------------------------------ envio
+
+    async def proteger(self, pair):
+        """
+        Coloca a OCO de saída da posição (chamar com a trava do par tomada).
+        Falhou = posição fica com a gestão por tick do bot (trade['oco'] = None).
+        """
+        trade = self.executor.active_trades.get(pair)
+        if trade is None:
+            return False
+        trade['oco'] = None
+        regra = self.executor.regras.regra(pair)
+        if regra is None:
+            logger.warning(f"🛡️ {pair}: sem regras do símbolo - OCO não colocada, stop fica no bot")
+            return False
+
+        asset_config = self.executor.asset_classifier.classify(pair)
+        oco = {
+            'tp': regra.arredondar_preco(trade['tp']),
+            'sl': regra.arredondar_preco(trade['sl']),
+            'qty': regra.arredondar_qty(trade['qty'], mercado=False),
+            'trailing_pct': asset_config['trailing_pct'],
+            'ativa_trailing': asset_config['tp_min'] * 0.7,
+        }
+        if await self._colocar(pair, trade, oco):
+            return True
+        self.executor.enviar_telegram(f"⚠️ <b>OCO NÃO COLOCADA</b>\n💎 {pair}\n🛡️ Stop fica no bot (por tick)")
+        return False
+
+    async def _colocar(self, pair, trade, oco):
+        regra = self.executor.regras.regra(pair)
+        limite_sl = regra.arredondar_preco(oco['sl'] * (1 - self.sl_gap))
+        filtro = regra.validar(oco['qty'], limite_sl, mercado=False)
+        if filtro:
+            logger.warning(f"🛡️ {pair}: OCO recusada localmente ({filtro}) - stop fica no bot")
+            return False
+        try:
+            client = await self.executor._get_client()
+            # Preços/qty como texto com as casas do símbolo (PEPE, SHIB... cairiam em '8.12e-06')
+            resposta = await client.order_oco_sell(
+                symbol=pair, quantity=regra.formatar_qty(oco['qty']),
+                listClientOrderId=client_order_id('OL'),
+                aboveType='LIMIT_MAKER', abovePrice=regra.formatar_preco(oco['tp']),
+                aboveClientOrderId=client_order_id('OT'),
+                belowType='STOP_LOSS_LIMIT', belowStopPrice=regra.formatar_preco(oco['sl']),
+                belowPrice=regra.formatar_preco(limite_sl),
+                belowTimeInForce='GTC', belowClientOrderId=client_order_id('OS'),
+            )
+        except Exception as e:
+            self.stats['falhas'] += 1
+            logger.error(f"❌ {pair}: falha ao colocar OCO (TP ${oco['tp']} / SL ${oco['sl']}): {e}")
+            return False
+        oco.update(list_id=resposta['orderListId'], list_client_id=resposta.get('listClientOrderId'),
+                   atualizado_em=time.monotonic(), fills=[])
+        trade['oco'] = oco
+        trade['sl'] = oco['sl']
+        self.stats['colocadas'] += 1
+        logger.info(f"🛡️ {pair}: OCO na Binance | qty={oco['qty']} | TP ${oco['tp']} | SL ${oco['sl']}")
+        return True
+
+    async def cancelar(self, pair, trade):
+        """
+        Cancela a OCO antes de uma venda do bot. True = saldo livre para vender;
+        False = a OCO já executou (o fill encerra a posição) ou a Binance não respondeu.
+        """
+        oco = trade.get('oco')
+        if not oco:
+            return True
+        try:
+            client = await self.executor._get_client()
+            await client.v3_delete_order_list(symbol=pair, orderListId=oco['list_id'])
+        except BinanceAPIException as e:
+            if e.code in ORDEM_DESCONHECIDA:
+                logger.info(f"🛡️ {pair}: OCO já executada na Binance - fechamento fica com o fill")
+                return False
+            logger.error(f"❌ {pair}: falha ao cancelar OCO: {e.message}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ {pair}: falha ao cancelar OCO: {e}")
+            return False
+        trade['oco'] = None
+        return True
+
+    # ------------------------------------------------------------------ tick
+
+    async def no_tick(self, pair, trade, preco_atual):
+        """
+        Substitui a gestão por tick para posições com OCO: só o tempo máximo e a
+        subida do stop (cancel-replace com passo e intervalo mínimos).
+        """
+        oco = trade['oco']
+        tempo_entrada = trade.get('entry_time', datetime.now())
+        if isinstance(tempo_entrada, str):
+            tempo_entrada = datetime.fromisoformat(tempo_entrada)
+        horas_posicao = (datetime.now() - tempo_entrada).total_seconds() / 3600
+        if horas_posicao >= self.max_hold_h:
+            lucro = preco_atual / trade['entry_price'] - 1
+            logger.info(f"⏰ [TIMEOUT OCO] {pair} | {horas_posicao:.1f}h | Lucro: {lucro:.2%} | Fechando!")
+            await self.executor.fechar_posicao(pair, f"TIMEOUT_{'PROFIT' if lucro >= 0 else 'LOSS'}_{horas_posicao:.0f}h")
+            return True
+
+        if oco['fills'] or preco_atual < trade['entry_price'] * (1 + oco['ativa_trailing']):
+            return False
+        novo_sl = preco_atual * (1 - oco['trailing_pct'])
+        if novo_sl < oco['sl'] * (1 + self.passo_min) or time.monotonic() - oco['atualizado_em'] < self.intervalo:
+            return False
+        await self._substituir(pair, novo_sl)
+        return False
+
+    async def _substituir(self, pair, novo_sl):
+        """Cancel-replace da OCO com o SL novo. Par ocupado = tenta no próximo tick."""
+        trava = self.executor.intencoes.trava(pair)
+        if trava.locked():
+            return
+        async with trava:
+            trade = self.executor.active_trades.get(pair)
+            if not trade or not trade.get('oco'):
+                return
+            oco = dict(trade['oco'])
+            regra = self.executor.regras.regra(pair)
+            oco['sl'] = regra.arredondar_preco(novo_sl)
+            if oco['sl'] >= oco['tp']:
+                return  # Preço passou do TP: a perna LIMIT_MAKER executa
+            if not await self.cancelar(pair, trade):
+                return
+            if await self._colocar(pair, trade, oco):
+                self.stats['substituidas'] += 1
+                logger.info(f"📈 [TRAILING OCO] {pair} | Novo SL: {oco['sl']}")
+                return
+            # Sem OCO: o tick seguinte cai na gestão do bot, que já tem o SL novo
+            trade['sl'] = oco['sl']
+            self.executor.enviar_telegram(f"⚠️ <b>OCO NÃO RECOLOCADA</b>\n💎 {pair}\n🛡️ Stop voltou para o bot")
+
+    # ------------------------------------------------------------------ fills
+
+    def registrar_execucao(self, evento):
+        """executionReport TRADE de uma perna de OCO (user data stream)."""
+        pair = evento['s']
+        trade = self.executor.active_trades.get(pair)
+        oco = trade.get('oco') if trade else None
+        if not oco or evento.get('g') != oco['list_id']:
+            logger.debug(f"🛡️ {pair}: fill de OCO sem posição correspondente ({evento.get('c')})")
+            return
+        oco['fills'].append({'price': evento['L'], 'qty': evento['l'], 'commission': evento.get('n') or 0,
+                             'commissionAsset': evento.get('N')})
+        if evento.get('X') == 'FILLED':
+            ordem = {'symbol': pair, 'side': 'SELL', 'type': evento.get('o'), 'fills': oco['fills']}
+            asyncio.ensure_future(self._finalizar(pair, oco['list_id'], ordem))
+
+    async def verificar(self, client):
+        """Sem stream: consulta as listas abertas e encerra as posições cuja OCO terminou."""
+        for pair, trade in list(self.executor.active_trades.items()):
+            oco = trade.get('oco')
+            if not oco:
+                continue
+            try:
+                lista = await client.v3_get_order_list(orderListId=oco['list_id'])
+                if lista.get('listOrderStatus') != 'ALL_DONE':
+                    continue
+                for perna in lista.get('orders', []):
+                    ordem = await client.get_order(symbol=pair, orderId=perna['orderId'])
+                    if float(ordem.get('executedQty') or 0) > 0:
+                        await self._finalizar(pair, oco['list_id'], ordem)
+                        break
+            except Exception as e:
+                logger.warning(f"⚠️ {pair}: não foi possível consultar a OCO {oco['list_id']}: {e}")
+
+    async def _finalizar(self, pair, list_id, ordem):
+        async with self.executor.intencoes.trava(pair):
+            trade = self.executor.active_trades.get(pair)
+            if not trade or not trade.get('oco') or trade['oco']['list_id'] != list_id:
+                return
+            execucao = resumir_execucao(ordem, self.executor.precos_taxa, self.executor.taxa_binance)
+            motivo = 'OCO_TP' if ordem.get('type') == 'LIMIT_MAKER' else 'OCO_STOP_LOSS'
+            self.stats['executadas'] += 1
+            trade['oco'] = None
+            await self.executor.registrar_fechamento(pair, trade, execucao, motivo)
+            self.executor.scaled_exit.reset_position(pair)
@@ -7,6 +7,8 @@ Atualizado automaticamente com dados da exchange
 import logging
 from binance import AsyncClient
 
+from tools.regras_simbolos import get_regras
+
 logger = logging.getLogger('symbol_mapper')
 
 class SymbolMapper:
@@ -47,13 +49,12 @@ class SymbolMapper:
         """
         Inicializa o mapeador carregando todos os símbolos válidos da Binance
         Deve ser chamado uma vez ao iniciar o sistema
+        (lê o cache de regras em disco; só baixa o exchangeInfo se não houver cache)
         """
         try:
-            exchange_info = await client.get_exchange_info()
-            cls._valid_symbols_cache = {
-                s['symbol'] for s in exchange_info['symbols']
-                if s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING'
-            }
+            regras = get_regras()
+            await regras.garantir(client)
+            cls._valid_symbols_cache = regras.simbolos_validos('USDT')
             logger.info(f"✅ Carregados {len(cls._valid_symbols_cache)} símbolos válidos da Binance")
             return True
         except Exception as e:
@@ -0,0 +1,128 @@
+"""
+📡 USER DATA STREAM DA BINANCE
+Saldos e execuções chegam por push (executionReport / outboundAccountPosition) em vez
+do polling de get_account() a cada 60s com 3 chamadas REST por ativo.
+
+A chave de escuta (listen key / assinatura) e o keepalive ficam por conta do
+BinanceSocketManager.user_socket(). A varredura completa da carteira
+(ExecutorBot.reconciliar_carteira) só roda ao conectar e após cada reconexão, para
+cobrir o que aconteceu enquanto o stream estava fora.
+
+Ordens enviadas pelo próprio bot levam o prefixo PREFIXO_CLIENT_ID no
+newClientOrderId: os caminhos de compra/venda do executor já atualizam a posição
+com a resposta REST, então o stream só aplica execuções externas (app, outro bot).
+
+Configuração via .env:
+    R7_USER_STREAM=true        # false = volta ao polling de 60s
+"""
+import asyncio
+import logging
+import os
+import time
+
+from binance import BinanceSocketManager
+
+from tools.binance_gateway import cliente_bruto
+
+logger = logging.getLogger('user_stream')
+
+PREFIXO_CLIENT_ID = 'r7_'
+PREFIXO_OCO = f"{PREFIXO_CLIENT_ID}O"  # Pernas das OCOs de saída (bots/saidas_oco.py)
+_BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def client_order_id(lado):
+    """newClientOrderId das ordens do bot (máx. 36 caracteres na Binance)."""
+    n = time.time_ns()
+    sufixo = ''
+    while n:
+        n, r = divmod(n, 36)
+        sufixo = _BASE36[r] + sufixo
+    return f"{PREFIXO_CLIENT_ID}{lado}_{sufixo}"
+
+
+def ordem_do_bot(evento):
+    """True se a execução veio de uma ordem enviada pelo bot (inclusive cancelamentos: 'C')."""
+    return str(evento.get('c') or '').startswith(PREFIXO_CLIENT_ID) or \
+        str(evento.get('C') or '').startswith(PREFIXO_CLIENT_ID)
+
+
+def perna_oco(evento):
+    """True se a execução é de uma perna de OCO de saída do bot."""
+    return str(evento.get('c') or '').startswith(PREFIXO_OCO)
+
+
+def stream_ativo():
+    return os.getenv('R7_USER_STREAM', 'true').lower() in ('1', 'true', 'yes', 'y')
+
+
+class UserDataStream:
+    """Consome o user data stream e repassa os eventos ao ExecutorBot."""
+
+    def __init__(self, executor, max_tentativas=10):
+        self.executor = executor
+        self.max_tentativas = max_tentativas
+        self.conectado = False
+        self.ultimo_evento = None
+        self.eventos = {'executionReport': 0, 'outboundAccountPosition': 0, 'balanceUpdate': 0}
+
+    async def executar(self):
+        """Loop com reconexão e backoff. Retorna se desistir (o executor volta ao polling)."""
+        tentativas = 0
+        while tentativas < self.max_tentativas:
+            try:
+                client = await self.executor._get_client()
+                bsm = BinanceSocketManager(cliente_bruto(client))
+                async with bsm.user_socket() as stream:
+                    self.conectado = True
+                    tentativas = 0
+                    logger.info("📡 User data stream conectado - reconciliando carteira")
+                    # Eventos que chegarem durante a reconciliação ficam na fila do socket
+                    await self.executor.reconciliar_carteira()
+
+                    while True:
+                        msg = await stream.recv()
+                        if msg:
+                            self.processar(msg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                tentativas += 1
+                espera = min(60, 2 ** tentativas)
+                logger.warning(f"⚠️ User data stream caiu ({str(e)[:100]}). "
+                               f"Tentativa {tentativas}/{self.max_tentativas}. Reconectando em {espera}s...")
+                await asyncio.sleep(espera)
+            finally:
+                self.conectado = False
+                self.executor.ledger.marcar_desconexao()
+        logger.error("❌ User data stream indisponível - voltando ao polling da carteira")
+
+    def processar(self, msg):
+        evento = msg.get('event', msg) if isinstance(msg, dict) else {}
+        tipo = evento.get('e')
+        if tipo == 'error':
+            raise ConnectionError(evento.get('m', 'erro no stream'))
+        self.ultimo_evento = time.time()
+        if tipo in self.eventos:
+            self.eventos[tipo] += 1
+
+        if tipo == 'outboundAccountPosition':
+            for saldo in evento.get('B', []):
+                self.executor.atualizar_saldo(saldo['a'], float(saldo['f']), float(saldo['l']))
+
+        elif tipo == 'executionReport':
+            if evento.get('x') != 'TRADE':
+                return
+            self.executor.ledger.aplicar_evento_execucao(evento, self.executor.precos_taxa)
+            if perna_oco(evento):  # Stop/TP que a Binance executou pelo bot (R7_EXIT_MODE=oco)
+                self.executor.oco.registrar_execucao(evento)
+                return
+            if ordem_do_bot(evento):
+                return
+            self.executor.aplicar_execucao_externa(
+                evento['s'], evento['S'], float(evento['l']), float(evento['L']),
+                float(evento.get('n') or 0), evento.get('N'),
+            )
+
+        elif tipo == 'balanceUpdate':
+            logger.info(f"💸 Movimentação de saldo: {evento.get('a')} {float(evento.get('d', 0)):+f}")
@@ -980,6 +980,18 @@ def get_previsoes_acuracia():
     except Exception as e:
         return {'cards_previsoes': [], 'estatisticas_consolidadas': {}}
 
+@st.cache_data(ttl=30)
+def get_metricas_inferencia():
+    """Carrega latência/cache/drift exportados pelo IAEngine."""
+    try:
+        path = os.path.join(diretorio_raiz, 'data', 'ia_inferencia_metrics.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
 # --- LÓGICA DE DADOS FINANCEIROS DINÂMICOS ---
 try:
     with open(os.path.join(diretorio_raiz, 'config', 'settings.json'), 'r') as f:
@@ -1814,6 +1826,32 @@ with tab_analises:
     with col3:
         stops_ativos = len(analises_stop)
         st.metric("🛡️ Stops Híbridos", stops_ativos)
+    
+    # ⏱️ Inferência da IA: latência, cache e drift (data/ia_inferencia_metrics.json)
+    st.markdown("### ⏱️ Inferência da IA")
+    metricas_ia = get_metricas_inferencia()
+    if metricas_ia:
+        latencia = metricas_ia.get('latencia_ms', {})
+        cache_ia = metricas_ia.get('cache') or {}
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("p50", f"{latencia.get('p50', 0):.2f} ms")
+        with col2:
+            st.metric("p95", f"{latencia.get('p95', 0):.2f} ms")
+        with col3:
+            st.metric("p99", f"{latencia.get('p99', 0):.2f} ms")
+        with col4:
+            st.metric("🗃️ Cache Hit", f"{cache_ia.get('taxa_acerto', 0):.1%}")
+        
+        alertas_drift = metricas_ia.get('alertas_drift', [])
+        if alertas_drift:
+            st.warning(f"📉 Drift em {len(alertas_drift)} feature(s) vs treino ({metricas_ia.get('versao_modelo')})")
+            st.dataframe(pd.DataFrame(alertas_drift), use_container_width=True)
+        else:
+            st.caption(f"✅ Sem drift detectado | modelo {metricas_ia.get('versao_modelo')} | "
+                       f"{metricas_ia.get('amostras_drift', 0)} amostras")
+    else:
+        st.info("Aguardando métricas de inferência da IA...")
 
 with tab_diario:
     st.subheader("📅 Histórico de Trades - Análise por Período")
@@ -1,9 +1,10 @@
 import os
 import joblib
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, recall_score, precision_score, f1_score
 import logging
 import requests
@@ -11,46 +12,224 @@ from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import sqlite3
 import json
 from datetime import datetime
-from transformers import pipeline
 import warnings
+import time
 import asyncio
+from tools.model_registry import ModelRegistry, hash_dados
+from tools.aprendizado_incremental import FlorestaIncremental
+from tools.feature_store import FeatureStore
+from tools.cache_predicoes import CachePredicoes
+from tools.lote_predicoes import LotePredicoes
+from tools.metricas_ia import MetricasInferencia, estatisticas_treino
+from tools.pipeline_treino import montar_matriz_incremental, montar_matriz_treino
+from tools.walk_forward import LIMIARES_PATH, carregar_limiares
+from tools.calibracao import MIN_AMOSTRAS_CALIBRACAO, Calibrador, ajustar_calibrador, calibracao_para_metadados
+from tools.roteador_modelos import RoteadorModelos, estrategia_por_simbolo, roteamento_ativo, treinar_por_estrategia
 
 # Limpa avisos de depreciação do Pandas para manter o terminal limpo
 warnings.filterwarnings('ignore', category=FutureWarning)
 
 logger = logging.getLogger('ia_engine')
 
+# Vetor de features do modelo (ordem importa: é a ordem das colunas do fit)
+FEATURES_IA = ['close', 'rsi', 'volume', 'ema20', 'ema200', 'bb_upper', 'bb_lower', 
+               'price_above_ema', 'trend_4h', 'buy_pressure', 'volume_24h', 
+               'fear_greed', 'news_sentiment', 'whale_risk', 'price_change_percent', 'avg_price',
+               # 📖 Order Book features (podem estar vazias em dados antigos)
+               'bid_volume', 'ask_volume', 'bid_ask_ratio', 'spread_pct', 'support_strength',
+               # 🕯️ Candlestick features (podem estar vazias em dados antigos)
+               'hammer', 'inverted_hammer', 'pin_bar', 'bullish_engulfing', 'doji']
+
+LIMIAR_COMPRA_PADRAO = 0.45  # Sem walk-forward, ou limiares em outra escala que a do modelo
+
+# Força do sinal de compra por estratégia (demais = 1.0)
+FORCA_POR_ESTRATEGIA = {'scalping_v6': 1.5, 'momentum_boost': 1.2}
+
 class IAEngine:
-    def __init__(self, model_path='cerebro_ia.joblib', db_path='memoria_bot.db'):
+    def __init__(self, model_path='cerebro_ia.joblib', db_path='memoria_bot.db', carregar_nlp=True,
+                 registry_dir=None):
         self.model_path = model_path
         self.db_path = db_path
+        self.gateway = None  # 🚦 BinanceGateway (main.py); sem ele o order book vai por requests
+        
+        # 🗂️ Registro versionado (o model_path antigo é só fallback de migração)
+        self.registry = ModelRegistry('ia_sniper', base_dir=registry_dir)
+        self.versao_modelo = None
+        self.metadados_modelo = {}
+        self.calibrador = None  # 📏 Tabela de calibração da versão (None = prob bruta)
+        
+        # 🧭 Modelos por estratégia (R7_MODELOS_POR_ESTRATEGIA=false desliga; sem versão = modelo global)
+        self.roteador = RoteadorModelos(registry_dir=registry_dir) if roteamento_ativo() else None
+        
+        # 👥 Avaliação shadow (ativada por ativar_shadow)
+        self.shadow = None
+        
+        # 🎯 Limiares escolhidos pelo walk-forward (tools/walk_forward.py --salvar)
+        self.limiares = {}
+        self.limiar_compra = LIMIAR_COMPRA_PADRAO
+        self._mtime_limiares = None
+        self._avisos_escala = set()  # (estrategia, versao) já avisadas de limiar em outra escala
+        self.recarregar_limiares()
+        
+        # 🧾 Feature store: grava os vetores exatos de inferência (R7_FEATURE_STORE=false desliga)
+        usar_store = os.getenv('R7_FEATURE_STORE', 'true').lower() in ('1', 'true', 'yes', 'y')
+        self.feature_store = FeatureStore(FEATURES_IA) if usar_store else None
+        
+        # 🗃️ Cache de predições por vetor quantizado (R7_PRED_CACHE=false desliga)
+        self.cache_predicoes = CachePredicoes.do_env(FEATURES_IA)
+        
+        # ⏱️ Latência, lotes, cache e drift das features (exportado em data/ia_inferencia_metrics.json)
+        self.metricas = MetricasInferencia(FEATURES_IA, cache=self.cache_predicoes)
+        
+        # 📦 Pedidos simultâneos das moedas agrupados em lotes (R7_LOTE_IA_MS=0 desliga)
+        self.lote = LotePredicoes.do_env(self.predict_lote)
         self.analyzer = SentimentIntensityAnalyzer()
         
+        # Paralelismo do RandomForest no fit (o worker de treino ajusta via R7_TRAIN_N_JOBS)
+        self.n_jobs = None
+        
         # API Keys para Order Book
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_SECRET_KEY')
         
-        # Carregamento do FinBERT (Otimizado)
-        try:
-            self.finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert", device=-1)
-        except Exception as e:
-            logger.warning(f"⚠️ FinBERT não carregado: {e}. Usando fallback Vader.")
-            self.finbert = None
+        # Carregamento do FinBERT (Otimizado) - o worker de treino não precisa dele
+        self.finbert = None
+        if carregar_nlp:
+            try:
+                from transformers import pipeline
+                self.finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert", device=-1)
+            except Exception as e:
+                logger.warning(f"⚠️ FinBERT não carregado: {e}. Usando fallback Vader.")
+                self.finbert = None
 
         self.create_tables()
         self.load_model()
 
     def load_model(self):
-        if os.path.exists(self.model_path):
+        try:
+            modelo, versao, meta = self.registry.carregar()
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar versão do registro: {e}")
+            modelo, versao, meta = None, None, {}
+
+        if modelo is not None:
+            self._trocar_modelo(modelo, versao, meta)
+            logger.info(f"🧠 IA carregada do registro ({versao}).")
+        elif os.path.exists(self.model_path):
             self.model = joblib.load(self.model_path)
             logger.info("🧠 IA carregada do arquivo.")
         else:
             self.model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
             logger.info("🧠 Nova IA criada.")
 
-    def save_model(self):
-        joblib.dump(self.model, self.model_path)
-        logger.info("🧠 IA salva.")
+    def _trocar_modelo(self, modelo, versao, meta):
+        """Troca o modelo em produção. A atribuição de self.model é o ponto de corte:
+        predições em andamento terminam com a referência antiga, as próximas usam a nova."""
+        self.versao_modelo = versao
+        self.metadados_modelo = meta or {}
+        self.calibrador = Calibrador.de_dict(self.metadados_modelo.get('calibracao'))
+        self.model = modelo
+        if getattr(self, 'cache_predicoes', None) is not None:
+            self.cache_predicoes.invalidar()
+        if getattr(self, 'metricas', None) is not None:
+            self.metricas.definir_referencia(self.metadados_modelo)
+
+    def save_model(self, metadados=None):
+        # Publica uma versão imutável no registro; o ponteiro CURRENT é trocado atomicamente.
+        meta = dict(metadados or {})
+        meta.setdefault('features', FEATURES_IA)
+        versao = self.registry.publicar(self.model, meta)
+        self.versao_modelo = versao
+        self.metadados_modelo = self.registry.metadados(versao)
+        self.calibrador = Calibrador.de_dict(self.metadados_modelo.get('calibracao'))
+        if self.cache_predicoes is not None:
+            self.cache_predicoes.invalidar()  # self.model foi trocado pelo treino
+        self.metricas.definir_referencia(self.metadados_modelo)
+        logger.info(f"🧠 IA salva ({versao}).")
+        return versao
+
+    def carregar_versao_atual(self):
+        """Parte lenta do hot-swap (joblib.load) sem tocar no modelo em produção: pode rodar em thread.
+
+        Retorna (modelo, versao, meta) ou None.
+        """
+        try:
+            modelo, versao, meta = self.registry.carregar()
+        except Exception as e:
+            logger.error(f"❌ Falha ao recarregar modelo do registro: {e} - mantendo versão atual")
+            return None
+        if modelo is None:
+            return None
+        if self.roteador is not None:
+            self.roteador.verificar_atualizacao()  # O worker de treino também publica as estratégias
+        return modelo, versao, meta
+
+    def recarregar_modelo(self, carregado=None):
+        """🔄 Hot-swap: carrega a versão atual do registro e troca a referência em uma única atribuição.
+
+        Chamado pelo processo principal quando o worker de treino publica uma nova versão;
+        `carregado` é o retorno de carregar_versao_atual() já feito fora do event loop.
+        """
+        if carregado is None:
+            carregado = self.carregar_versao_atual()
+            if carregado is None:
+                return False
+        modelo, versao, meta = carregado
+        self._trocar_modelo(modelo, versao, meta)
+        logger.info(f"🔄 IA recarregada (hot-swap) → {versao}")
+        return True
+
+    def recarregar_limiares(self):
+        """Relê data/limiares_ia.json se mudou (sem arquivo = limiar padrão 0.45)."""
+        try:
+            mtime = os.path.getmtime(LIMIARES_PATH)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime_limiares:
+            return False
+        self._mtime_limiares = mtime
+        self.limiares = carregar_limiares()
+        self.limiar_compra = float(self.limiares.get('limiar_compra', LIMIAR_COMPRA_PADRAO))
+        self._avisos_escala.clear()
+        if self.limiares:
+            logger.info(f"🎯 Limiar de compra da IA: {self.limiar_compra:.3f} (walk-forward)")
+        return True
+
+    def verificar_atualizacao(self):
+        """Polling barato: só recarrega se o ponteiro CURRENT mudou."""
+        self.recarregar_limiares()
+        if self.roteador is not None and self.roteador.verificar_atualizacao() and self.cache_predicoes is not None:
+            self.cache_predicoes.invalidar()
+        versao = self.registry.versao_atual()
+        if versao and versao != self.versao_modelo:
+            return self.recarregar_modelo()
+        return False
+
+    def _modelo_para(self, estrategia):
+        """(modelo, versao, calibrador) que atende a estratégia: o dela se publicado, senão o global."""
+        if estrategia and self.roteador is not None:
+            modelo, versao, calibrador = self.roteador.modelo_para(estrategia)
+            if modelo is not None:
+                return modelo, f"{estrategia}/{versao}", calibrador
+        return self.model, self.versao_modelo, self.calibrador
+
+    def rollback_modelo(self):
+        """⏪ Volta para a versão anterior do registro e aplica imediatamente."""
+        if self.registry.rollback():
+            return self.recarregar_modelo()
+        return False
+
+    def ativar_shadow(self, versoes=None):
+        """👥 Liga a avaliação shadow com versões candidatas do registro (R7_SHADOW_VERSOES)."""
+        from tools.shadow_models import AvaliadorShadow
+
+        if versoes is None:
+            versoes = [v.strip() for v in os.getenv('R7_SHADOW_VERSOES', '').split(',') if v.strip()]
+        if not versoes:
+            return None
+        shadow = AvaliadorShadow(self.registry, versoes, FEATURES_IA, limiar=self.limiar_compra)
+        self.shadow = shadow if shadow.ativo else None
+        return self.shadow
 
     def registrar_movimento(self, tipo, valor, descricao):
         """
@@ -181,14 +360,20 @@ class IAEngine:
     async def obter_order_book(self, symbol):
         """📖 Busca profundidade de mercado (Order Book) da Binance"""
         try:
-            # Usa API REST da Binance (não precisa de autenticação)
-            url = f"https://api.binance.com/api/v3/depth"
-            params = {'symbol': symbol, 'limit': 20}
-            
-            response = requests.get(url, params=params, timeout=3)
+            if self.gateway is not None:
+                # Mesmo orçamento de peso do resto do processo (e sem bloquear o event loop)
+                depth = await self.gateway.get_order_book(symbol=symbol, limit=20)
+                status = 200
+            else:
+                # Usa API REST da Binance (não precisa de autenticação)
+                url = f"https://api.binance.com/api/v3/depth"
+                params = {'symbol': symbol, 'limit': 20}
+                
+                response = await asyncio.to_thread(requests.get, url, params=params, timeout=3)
+                status = response.status_code
+                depth = response.json() if status == 200 else None
             
-            if response.status_code == 200:
-                depth = response.json()
+            if status == 200:
                 
                 # Analisa bids (compra) e asks (venda)
                 bids = depth.get('bids', [])[:5]  # 5 primeiros níveis
@@ -214,46 +399,130 @@ class IAEngine:
                     'support_strength': bid_volume  # Força do suporte
                 }
             else:
-                logger.warning(f"⚠️ Erro ao buscar order book: {response.status_code}")
+                logger.warning(f"⚠️ Erro ao buscar order book: {status}")
                 return None
         except Exception as e:
             logger.error(f"Erro ao buscar order book: {e}")
             return None
 
-    def predict(self, data, symbol=None):
+    def limiares_para(self, estrategia=None):
+        """
+        🎯 Limiares da estratégia (escolhidos no treino dela, no registro) ou os globais do walk-forward.
+        {} (= limiar padrão) se foram escolhidos em outra escala que a do modelo que vai pontuar:
+        limiar calibrado contra fração de votos bruta, ou o contrário.
+        """
+        limiares = self.limiares
+        if estrategia and self.roteador is not None:
+            limiares = self.roteador.limiares_para(estrategia) or self.limiares
+        if not limiares or 'calibrado' not in limiares:
+            return limiares  # Arquivos antigos não registram a escala
+        _, versao, calibrador = self._modelo_para(estrategia)
+        if bool(limiares['calibrado']) == (calibrador is not None):
+            return limiares
+        if (estrategia, versao) not in self._avisos_escala:
+            self._avisos_escala.add((estrategia, versao))
+            logger.warning(f"⚠️ Limiares {'calibrados' if limiares['calibrado'] else 'brutos'} mas o modelo "
+                           f"{versao} {'não tem' if calibrador is None else 'tem'} calibração - "
+                           f"usando o limiar padrão {LIMIAR_COMPRA_PADRAO:.2f}")
+        return {}
+
+    def _preparar(self, data, symbol, estrategia):
+        """Vetor na ordem do treino (features ausentes = 0), modelo que atende a linha e consulta ao cache."""
+        vetor = np.array([data.get(col, 0) for col in FEATURES_IA], dtype='float64')
+        
+        # 🧭 Modelo da estratégia do símbolo (ou o global, se ela ainda não tem versão)
+        if estrategia is None and symbol and self.roteador is not None:
+            estrategia = estrategia_por_simbolo(symbol)
+        modelo, versao, calibrador = self._modelo_para(estrategia)
+        
+        # 🗃️ Mesmo símbolo + mesmo vetor quantizado + mesmo modelo = mesma probabilidade
+        cache = self.cache_predicoes if symbol else None
+        chave = geracao = prob = None
+        if cache is not None:
+            chave = cache.chave((symbol, estrategia) if estrategia else symbol, vetor)
+            geracao = cache.geracao
+            prob = cache.obter(chave)
+        return {'vetor': vetor, 'estrategia': estrategia, 'modelo': modelo, 'versao': versao,
+                'calibrador': calibrador, 'chave': chave, 'geracao': geracao, 'prob': prob}
+
+    def _pontuar(self, itens):
+        """Roda a floresta só nas linhas sem cache: UM predict_proba por modelo distinto."""
+        grupos = {}
+        for item in itens:
+            if item['prob'] is None:
+                grupos.setdefault(id(item['modelo']), []).append(item)
+        for grupo in grupos.values():
+            X = pd.DataFrame(np.vstack([item['vetor'] for item in grupo]), columns=FEATURES_IA)
+            probs = grupo[0]['modelo'].predict_proba(X)[:, 1]
+            calibrador = grupo[0]['calibrador']
+            if calibrador is not None:
+                probs = calibrador.aplicar(probs)  # 📏 Fração de votos → probabilidade real
+            for item, prob in zip(grupo, probs):
+                item['prob'] = float(prob)
+                if item['chave'] is not None:
+                    self.cache_predicoes.guardar(item['chave'], item['prob'], item['geracao'])
+
+    def _concluir(self, item, data, symbol, duracao_s, tamanho_lote=1):
+        prob = item['prob']
+        
+        # THRESHOLD: 45% por padrão, o do walk-forward, ou o do treino da estratégia
+        limiar = float(self.limiares_para(item['estrategia']).get('limiar_compra', LIMIAR_COMPRA_PADRAO))
+        sinal = "BUY" if prob >= limiar else "WAIT"
+        
+        # 👥 Shadow / 🧾 Feature store: só enfileiram o vetor exato que o modelo viu
+        if symbol and (self.shadow is not None or self.feature_store is not None):
+            if self.shadow is not None:
+                self.shadow.registrar(symbol, item['vetor'], data.get('close'), sinal == "BUY", prob, item['versao'])
+            if self.feature_store is not None:
+                self.feature_store.registrar(symbol, item['vetor'], data.get('close'), item['versao'], sinal == "BUY", prob)
+        
+        self.metricas.registrar_predicao(duracao_s, item['vetor'], tamanho_lote)
+        
+        # Log detalhado para debug
+        if symbol:  # Se symbol foi passado
+            if prob >= 0.40:  # Log se estiver próximo de comprar
+                logger.info(f"🧠 IA {symbol}: prob={prob:.2%} -> sinal={sinal} (threshold={limiar:.0%})")
+        
+        return {"sinal": sinal, "confianca": prob, "modelo": item['versao'], "limiar": limiar}
+
+    def predict(self, data, symbol=None, estrategia=None):
         if self.model is None: return {"sinal": "WAIT", "confianca": 0.5}
+        inicio = time.perf_counter()
         try:
             if isinstance(data, (int, float)):
                 return {"sinal": "WAIT", "confianca": 0.5, "motivo": "Dados brutos"}
-
-            df = pd.DataFrame([data])
-            features_cols = ['close', 'rsi', 'volume', 'ema20', 'ema200', 'bb_upper', 'bb_lower', 
-                             'price_above_ema', 'trend_4h', 'buy_pressure', 'volume_24h', 
-                             'fear_greed', 'news_sentiment', 'whale_risk', 'price_change_percent', 'avg_price',
-                             # 📖 Order Book features
-                             'bid_volume', 'ask_volume', 'bid_ask_ratio', 'spread_pct', 'support_strength',
-                             # 🕯️ Candlestick features
-                             'hammer', 'inverted_hammer', 'pin_bar', 'bullish_engulfing', 'doji']
-            
-            for col in features_cols:
-                if col not in df.columns: df[col] = 0
-            
-            X = df[features_cols]
-            prob = self.model.predict_proba(X)[0][1]
-            
-            # THRESHOLD REDUZIDO: 45% (mais agressivo, alinhado com analista 50%)
-            sinal = "BUY" if prob >= 0.45 else "WAIT"
-            
-            # Log detalhado para debug
-            if symbol:  # Se symbol foi passado
-                if prob >= 0.40:  # Log se estiver próximo de comprar
-                    logger.info(f"🧠 IA {symbol}: prob={prob:.2%} -> sinal={sinal} (threshold=45%)")
-            
-            return {"sinal": sinal, "confianca": prob}
+            item = self._preparar(data, symbol, estrategia)
+            self._pontuar([item])
+            return self._concluir(item, data, symbol, time.perf_counter() - inicio)
         except Exception as e:
             logger.error(f"Erro na predição: {e}")
             return {"sinal": "WAIT", "confianca": 0.0}
 
+    def predict_lote(self, linhas, symbols, estrategias=None):
+        """Mesmo resultado de predict para cada linha, com um predict_proba por modelo, não por linha."""
+        if not linhas:
+            return []
+        if self.model is None:
+            return [{"sinal": "WAIT", "confianca": 0.5} for _ in linhas]
+        inicio = time.perf_counter()
+        estrategias = estrategias or [None] * len(linhas)
+        try:
+            itens = [self._preparar(data, symbol, estrategia)
+                     for data, symbol, estrategia in zip(linhas, symbols, estrategias)]
+            self._pontuar(itens)
+            duracao = (time.perf_counter() - inicio) / len(itens)
+            return [self._concluir(item, data, symbol, duracao, len(itens))
+                    for item, data, symbol in zip(itens, linhas, symbols)]
+        except Exception as e:
+            logger.error(f"Erro na predição em lote: {e}")
+            return [{"sinal": "WAIT", "confianca": 0.0} for _ in linhas]
+
+    async def prever(self, data, symbol=None, estrategia=None):
+        """📦 predict para coroutines: pedidos simultâneos de várias moedas viram um predict_lote."""
+        if self.lote is None:
+            return self.predict(data, symbol=symbol, estrategia=estrategia)
+        return await self.lote.prever(data, symbol, estrategia)
+
     async def analisar_tick(self, symbol, preco_atual, buffer_precos):
         try:
             if len(buffer_precos) < 20:
@@ -321,15 +590,12 @@ class IAEngine:
                 **candlestick_features
             }
 
-            res = self.predict(feat, symbol=symbol)
+            # 🧭 Mesma estratégia que escolhe o modelo (fonte única: tools/roteador_modelos.py)
+            est = estrategia_por_simbolo(symbol)
+            res = await self.prever(feat, symbol=symbol, estrategia=est)
             if res['sinal'] == "BUY":
-                if any(x in symbol for x in ['BTC', 'ETH', 'BNB']):
-                    est, forca = "scalping_v6", 1.5
-                elif any(x in symbol for x in ['SOL', 'AVAX', 'NEAR', 'FET', 'RENDER']):
-                    est, forca = "momentum_boost", 1.2
-                else:
-                    est, forca = "swing_rwa", 1.0
-                return {"decisao": "COMPRAR", "estrategia": est, "forca": forca, "confianca": res['confianca']}
+                return {"decisao": "COMPRAR", "estrategia": est, "forca": FORCA_POR_ESTRATEGIA.get(est, 1.0),
+                        "confianca": res['confianca']}
             
             return {"decisao": "AGUARDAR", "estrategia": "none", "forca": 0}
         except Exception as e:
@@ -339,57 +605,64 @@ class IAEngine:
     def train(self):
         """Treina a IA garantindo que os targets sejam binários/discretos."""
         try:
-            df_db = self.get_historico_for_train()
-            df_csv = pd.read_csv('data/historico_ia.csv') if os.path.exists('data/historico_ia.csv') else pd.DataFrame()
-            
-            df = pd.concat([df_db, df_csv], ignore_index=True)
-            if df.empty or 'sucesso' not in df.columns:
+            # 🏭 Matriz montada em chunks (só colunas necessárias), paralela por símbolo e
+            # reaproveitada do cache quando DB/CSV/feature store não mudaram.
+            dados = montar_matriz_treino(self.db_path, FEATURES_IA, feature_store=self.feature_store)
+            if len(dados['y']) == 0:
                 logger.warning("📄 Sem dados suficientes para treino.")
                 return False
-
-            features = ['close', 'rsi', 'volume', 'ema20', 'ema200', 'bb_upper', 'bb_lower', 
-                        'price_above_ema', 'trend_4h', 'buy_pressure', 'volume_24h', 
-                        'fear_greed', 'news_sentiment', 'whale_risk', 'price_change_percent', 'avg_price',
-                        # 📖 Order Book features (podem estar vazias em dados antigos)
-                        'bid_volume', 'ask_volume', 'bid_ask_ratio', 'spread_pct', 'support_strength',
-                        # 🕯️ Candlestick features (podem estar vazias em dados antigos)
-                        'hammer', 'inverted_hammer', 'pin_bar', 'bullish_engulfing', 'doji']
-            
-            df = df.dropna(subset=['sucesso'])
-            
-            # Adiciona features que podem não existir em dados antigos
-            for feat in features:
-                if feat not in df.columns:
-                    df[feat] = 0
             
-            X = df[features].fillna(0)
+            # Marca d'água: o incremental continua a partir da última linha do DB vista aqui
+            ultimo_id = dados['ultimo_id']
+
+            features = FEATURES_IA
+            X = pd.DataFrame(dados['X'], columns=features)
             
             # --- CORREÇÃO DO ERRO DE TARGET CONTÍNUO ---
-            # Converte a coluna 'sucesso' (que pode vir como lucro real/contínuo) em 0 ou 1.
-            y = df['sucesso']
-            y_numeric = pd.to_numeric(y, errors='coerce').fillna(0)
-            y_binary = (y_numeric > 0).astype(int)
+            # O pipeline já converte 'sucesso' (lucro real/contínuo) em 0 ou 1.
+            y_binary = pd.Series(dados['y'].astype(int))
             
-            # 📊 DIVIDE EM TREINO E TESTE (70/30)
-            if len(df) >= 10:  # Só divide se tiver dados suficientes
-                X_train, X_test, y_train, y_test = train_test_split(X, y_binary, test_size=0.3, random_state=42)
+            # 📊 DIVIDE EM TREINO E TESTE (70/30) NO TEMPO: teste = 30% mais recentes.
+            # Split aleatório vazaria o futuro para o treino (avaliação completa: tools/walk_forward.py)
+            if len(X) >= 10:  # Só divide se tiver dados suficientes
+                ordem = np.argsort(np.nan_to_num(dados['ts'], nan=-np.inf), kind='stable')
+                corte = int(len(ordem) * 0.7)
+                X_train, X_test = X.iloc[ordem[:corte]], X.iloc[ordem[corte:]]
+                y_train, y_test = y_binary.iloc[ordem[:corte]], y_binary.iloc[ordem[corte:]]
             else:
                 X_train, X_test, y_train, y_test = X, X, y_binary, y_binary  # Usa todos os dados
             
-            # Treina
-            self.model.fit(X_train, y_train)
+            # Treina uma cópia: o modelo em produção só é trocado ao final (hot-swap seguro).
+            # Refit completo sempre parte de uma floresta cheia (não das janelas incrementais).
+            base = self.model if isinstance(self.model, RandomForestClassifier) else \
+                RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+            modelo = clone(base)
+            if self.n_jobs is not None and 'n_jobs' in modelo.get_params():
+                modelo.set_params(n_jobs=self.n_jobs)
+            modelo.fit(X_train, y_train)
+            if 'n_jobs' in modelo.get_params():
+                modelo.set_params(n_jobs=None)  # Inferência de 1 linha não ganha nada com threads
+            self.model = modelo
             
             # 📈 CALCULA MÉTRICAS DE PERFORMANCE
+            metricas = {}
+            calibracao = {}
             try:
+                # 📏 Calibração na validação temporal (o modelo não viu essas linhas)
+                if len(X) >= 10:
+                    probs_teste = self.model.predict_proba(X_test)[:, list(self.model.classes_).index(1)]
+                    calibracao = calibracao_para_metadados(*ajustar_calibrador(probs_teste, y_test))
+                
                 y_pred = self.model.predict(X_test)
                 
                 recall = recall_score(y_test, y_pred, zero_division=0)
                 precision = precision_score(y_test, y_pred, zero_division=0)
                 f1 = f1_score(y_test, y_pred, zero_division=0)
                 accuracy = accuracy_score(y_test, y_pred)
+                metricas = {'recall': recall, 'precision': precision, 'f1_score': f1, 'accuracy': accuracy}
                 
                 # Log detalhado
-                logger.info(f"🧠 IA SNIPER TREINADA. Exemplos: {len(df)}")
+                logger.info(f"🧠 IA SNIPER TREINADA. Exemplos: {len(X)}")
                 logger.info(f"📊 MÉTRICAS DE PERFORMANCE:")
                 logger.info(f"   ✅ RECALL:    {recall:.1%} (identifica {recall:.1%} das oportunidades reais)")
                 logger.info(f"   ✅ PRECISION: {precision:.1%} (acurácia quando prevê compra)")
@@ -407,12 +680,32 @@ class IAEngine:
                     logger.warning(f"   → Considere ajustar threshold de confiança")
                 
                 # 💾 Salva métricas no banco
-                self._salvar_metricas_treino(recall, precision, f1, len(df), accuracy)
+                self._salvar_metricas_treino(recall, precision, f1, len(X), accuracy)
                 
             except Exception as e:
                 logger.warning(f"⚠️ Não foi possível calcular métricas: {e}")
             
-            self.save_model()
+            # 🗂️ Metadados da versão: mesmas métricas do ia_metrics + rastreabilidade dos dados
+            self.save_model({
+                'features': features,
+                'metricas': metricas,
+                'estatisticas_features': estatisticas_treino(dados['X'], features),
+                'calibracao': calibracao,
+                'n_samples': len(X),
+                'data_hash': dados['hash'],
+                'treinado_em': datetime.now().isoformat(),
+                'ultimo_id_analises': ultimo_id,
+                'ultimo_ts_store': dados['ultimo_ts_store'],
+            })
+            
+            # 🧭 Mesma matriz, um modelo por estratégia (as sem dados suficientes seguem no global)
+            if self.roteador is not None:
+                try:
+                    treinar_por_estrategia(dados, FEATURES_IA, registry_dir=self.registry.base_dir, n_jobs=self.n_jobs)
+                    if self.roteador.verificar_atualizacao() and self.cache_predicoes is not None:
+                        self.cache_predicoes.invalidar()
+                except Exception as e:
+                    logger.warning(f"⚠️ Treino por estratégia falhou: {e} - mantendo modelos atuais")
             return True
         except Exception as e:
             logger.error(f"Erro no treino: {e}")
@@ -420,6 +713,71 @@ class IAEngine:
             logger.error(traceback.format_exc())
             return False
     
+    def train_incremental(self, min_novas=50):
+        """🌱 Atualiza o modelo só com as linhas rotuladas desde o último treino.
+
+        Em vez de recarregar todo o histórico e refazer a floresta, treina uma janela
+        pequena de árvores nas linhas novas (marcas d'água: id do DB e ts do feature
+        store) e envelhece as antigas. As linhas vêm do mesmo pipeline do train().
+        """
+        try:
+            dados = montar_matriz_incremental(
+                self.db_path, FEATURES_IA, feature_store=self.feature_store,
+                desde_id=int(self.metadados_modelo.get('ultimo_id_analises', 0) or 0),
+                desde_ts=float(self.metadados_modelo.get('ultimo_ts_store', 0) or 0),
+            )
+            n = len(dados['y'])
+            if n < min_novas:
+                logger.info(f"🌱 Incremental: {n} linhas novas (< {min_novas}) - aguardando mais dados")
+                return False
+
+            X = pd.DataFrame(dados['X'], columns=FEATURES_IA)
+            y = pd.Series(dados['y'].astype(int))
+
+            # Trabalha numa cópia: produção continua com o modelo atual até o hot-swap
+            if isinstance(self.model, FlorestaIncremental):
+                base = self.model.copia()
+            else:
+                base = FlorestaIncremental.a_partir_de(self.model if hasattr(self.model, 'classes_') else None)
+            if self.n_jobs is not None:
+                base.n_jobs = self.n_jobs
+
+            # 📏 Calibração refeita para o ensemble novo: janela treinada nos 70% mais antigos
+            # das linhas novas, calibrada nos 30% recentes (nenhuma janela viu essas linhas).
+            # Poucas linhas = versão sem calibração (a do refit anterior não vale mais).
+            calibracao = {}
+            corte = int(n * 0.7)
+            if n - corte >= MIN_AMOSTRAS_CALIBRACAO:
+                validacao = base.copia().atualizar(X.iloc[:corte], y.iloc[:corte])
+                probs_teste = validacao.predict_proba(X.iloc[corte:])[:, 1]
+                calibracao = calibracao_para_metadados(*ajustar_calibrador(probs_teste, y.iloc[corte:]))
+
+            modelo = base.atualizar(X, y)  # Publicado com todas as linhas novas
+            modelo.n_jobs = None
+            if not modelo.janelas_:
+                return False
+            self.model = modelo
+
+            self.save_model({
+                'features': FEATURES_IA,
+                'tipo': 'incremental',
+                'n_samples': n,
+                'janelas': len(modelo.janelas_),
+                'data_hash': hash_dados(X, y),
+                'treinado_em': datetime.now().isoformat(),
+                'ultimo_id_analises': dados['ultimo_id'],
+                'ultimo_ts_store': dados['ultimo_ts_store'],
+                'metricas': self.metadados_modelo.get('metricas', {}),
+                'estatisticas_features': self.metadados_modelo.get('estatisticas_features', {}),
+                'calibracao': calibracao,
+            })
+            logger.info(f"🌱 IA atualizada incrementalmente: +{n} linhas | {len(modelo.janelas_)} janelas | "
+                        f"id ≤ {dados['ultimo_id']}{' | calibrada' if calibracao else ' | sem calibração'}")
+            return True
+        except Exception as e:
+            logger.error(f"Erro no treino incremental: {e}")
+            return False
+    
     def _salvar_metricas_treino(self, recall, precision, f1, n_samples, accuracy):
         """💾 Salva métricas de treino para auditoria"""
         try:
@@ -3,6 +3,7 @@ import sqlite3
 import logging
 from binance.client import Client
 from dotenv import load_dotenv
+from tools.ledger_custos import LedgerCustos
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('IA_SYNC_TOTAL')
@@ -12,6 +13,8 @@ def sincronizar_e_adotar_tudo():
     client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_SECRET_KEY'))
     conn = sqlite3.connect('memoria_bot.db')
     cursor = conn.cursor()
+    ledger = LedgerCustos()
+    precos = {t['symbol']: float(t['price']) for t in client.get_all_tickers()}  # Taxas pagas em BNB
 
     logger.info("🚀 IA: Iniciando varredura total de ativos para gestão Sniper...")
 
@@ -27,15 +30,12 @@ def sincronizar_e_adotar_tudo():
         symbol = f"{asset}USDT"
         
         try:
-            # Busca as últimas ordens para calcular o preço médio de compra
-            trades = client.get_my_trades(symbol=symbol, limit=10)
-            if not trades: continue
+            # 📒 Custo médio ponderado do histórico COMPLETO (ledger local, só baixa execuções novas)
+            ledger.sincronizar(client, [symbol], precos=precos)
+            custo = ledger.custo(symbol)
+            if not custo or custo['qty'] <= 0: continue
 
-            # Lógica para achar o preço médio real das compras
-            compras = [float(t['price']) for t in trades if t['isBuyer']]
-            if not compras: continue
-            
-            preco_medio = sum(compras) / len(compras)
+            preco_medio = custo['preco_medio']
 
             # 2. Registra na tabela de TRADES para o Estrategista assumir
             cursor.execute("""
@@ -24,10 +24,14 @@ from bots.executor import ExecutorBot
 from bots.estrategista import EstrategistaBot
 from bots.guardiao import GuardiaoBot
 from bots.monitor_previsoes import MonitorPrevisoes
-from utils.notify import send_telegram_message
+from utils.notify import get_notifier, send_telegram_message
 from tools.account_monitor import AccountMonitor
 from tools.time_sync import TimeSyncManager
 from tools.state_validator import StateValidator
+from tools.treino_worker import treinar_em_processo, loop_treino_incremental
+from tools.model_registry import vigiar_registry
+from tools.regras_simbolos import get_regras
+from tools.binance_gateway import BinanceGateway
 from sniper_monitor import SniperMonitor
 
 # Configuração de Logs
@@ -79,6 +83,8 @@ async def iniciar_sistema():
         
         # Criamos o cliente com suporte a reconexão automática
         client = await AsyncClient.create(api_key, api_secret)
+        # 🚦 Todas as chamadas REST dos bots passam pelo gateway (orçamento de peso, ordens primeiro)
+        gateway = BinanceGateway(client)
         
         # 🔄 INICIALIZAR SINCRONIZAÇÃO DE RELÓGIO
         time_sync = TimeSyncManager(client)
@@ -92,10 +98,11 @@ async def iniciar_sistema():
 
         # 2. INICIALIZAÇÃO DE MÓDULOS
         estrategista = EstrategistaBot(config)
-        executor = ExecutorBot(config, monitor=None)
+        executor = ExecutorBot(config, monitor=None, client=gateway)
+        executor.ia.gateway = gateway
         
         # 3. MONITOR DE SALDO (Com os $2.355,05 de meta)
-        monitor = AccountMonitor(client, gestor=estrategista.gestor, time_sync=time_sync)
+        monitor = AccountMonitor(gateway, gestor=estrategista.gestor, time_sync=time_sync)
         executor.monitor = monitor
         asyncio.create_task(monitor.monitor_loop())
         
@@ -105,12 +112,45 @@ async def iniciar_sistema():
         train_on_startup = os.getenv('R7_TRAIN_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes', 'y')
         logger.info("🧠 IA: Sincronizando motor de decisão... (train_on_startup=%s)", train_on_startup)
         if train_on_startup:
-            # roda o treino em background sem aguardar (evita atrasar serviços críticos)
-            asyncio.create_task(asyncio.to_thread(executor.ia.train))
+            # roda o treino em um processo separado (sem disputar o GIL com os ticks)
+            # e faz hot-swap do modelo quando o worker terminar
+            asyncio.create_task(treinar_em_processo(executor.ia))
         else:
             logger.info("🧠 Treino de IA ignorado no startup (R7_TRAIN_ON_STARTUP=false)")
         
-        analista = AnalistaBot(config, client=client, ia=executor.ia)
+        # 📐 Regras de símbolos (LOT_SIZE/NOTIONAL): cache em disco renovado em background
+        asyncio.create_task(get_regras().loop(gateway))
+        
+        # 📦 Snapshot das posições (após cada alteração e periódico) para restart sem perder estado
+        asyncio.create_task(executor.active_trades.loop())
+        
+        # ⏳ Vendas que falharam: repetição agendada com backoff (+ ressincronia em erro de timestamp)
+        executor.retry.time_sync = time_sync
+        asyncio.create_task(executor.retry.executar())
+        
+        # 📱 Notificações do Telegram em background (fila + sessão HTTP única + agrupamento)
+        asyncio.create_task(get_notifier().loop())
+        
+        # 🌱 Aprendizado incremental com trades recém-rotulados (R7_INCREMENTAL_INTERVAL_MIN)
+        asyncio.create_task(loop_treino_incremental(executor.ia))
+        
+        # 🗂️ Hot-swap: modelos publicados no registro (por outro processo/CLI) entram sem restart
+        asyncio.create_task(vigiar_registry(executor.ia))
+        if executor.cerebro_stop_loss:
+            asyncio.create_task(vigiar_registry(executor.cerebro_stop_loss))
+        
+        # 🧾 Feature store: flush em lote dos vetores de inferência + rotulagem periódica
+        if executor.ia.feature_store:
+            asyncio.create_task(executor.ia.feature_store.loop())
+        
+        # ⏱️ Métricas de inferência e drift → data/ia_inferencia_metrics.json (dashboard)
+        asyncio.create_task(executor.ia.metricas.loop())
+        
+        # 👥 Avaliação shadow de modelos candidatos (R7_SHADOW_VERSOES)
+        if executor.ia.ativar_shadow():
+            asyncio.create_task(executor.ia.shadow.loop())
+        
+        analista = AnalistaBot(config, client=gateway, ia=executor.ia)
         guardiao = GuardiaoBot(config, executor=executor)
         
         # 4. CONEXÃO DE DEPENDÊNCIAS (Fluxo de Dados)
@@ -119,7 +159,7 @@ async def iniciar_sistema():
         executor.analista = analista  # 🎯 Conecta analista ao executor para saída inteligente
         
         # 🎯 SISTEMA DE PREVISÕES - Roda em background a cada 15min
-        monitor_previsoes = MonitorPrevisoes(client, executor)
+        monitor_previsoes = MonitorPrevisoes(gateway, executor)
         executor.monitor_previsoes = monitor_previsoes
         await monitor_previsoes.iniciar()
         logger.info("✅ Monitor de Previsões iniciado (atualização a cada 15 min)")
@@ -155,6 +195,7 @@ async def iniciar_sistema():
         except Exception:
             logger.exception("Falha ao enviar alerta Telegram de erro fatal")
     finally:
+        await get_notifier().close()  # Entrega o que ficou na fila (ex.: alerta de erro fatal)
         if client:
             await client.close_connection()
             logger.info("🔌 Conexão Binance encerrada.")
@@ -79,8 +79,8 @@ class ResilientSniper:
                                         quantidade_venda = trade['qty'] * (analise['percentual_venda'] / 100)
                                         await self.executor_bot.fechar_posicao_parcial(pair, quantidade_venda, analise['motivo'])
                                 
-                            # Fallback: sistema tradicional de TP/SL
-                            else:
+                            # Fallback: sistema tradicional de TP/SL (com OCO o TP/SL já está na Binance)
+                            elif not trade.get('oco'):
                                 if preco >= trade['tp']:
                                     await self.executor_bot.fechar_posicao(pair, f"TP_{trade['estrategia']}")
                                 elif preco <= trade['sl']:
@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from ia_engine import IAEngine
+from tools.mineracao import carregar_minerio
 import sqlite3
 import pandas as pd
 from datetime import datetime
@@ -77,13 +78,18 @@ def verificar_dados_treino():
             df_csv = pd.read_csv('data/historico_ia.csv')
             count_csv = len(df_csv[df_csv['sucesso'].notna()])
         
-        total = count_db + count_csv
+        # Partições do minerador (data/historico_ia/tf=*/)
+        df_minerio = carregar_minerio(os.path.join('data', 'historico_ia'), ['sucesso'])
+        count_minerio = int(df_minerio['sucesso'].notna().sum()) if not df_minerio.empty else 0
+        
+        total = count_db + count_csv + count_minerio
         
         logger.info("\n" + "="*70)
         logger.info("📚 DADOS DISPONÍVEIS PARA TREINO")
         logger.info("="*70)
         logger.info(f"   💾 Banco de dados: {count_db} registros")
         logger.info(f"   📄 Arquivo CSV:    {count_csv} registros")
+        logger.info(f"   ⛏️  Mineração:      {count_minerio} registros")
         logger.info(f"   📊 TOTAL:          {total} registros")
         
         if total < 50:
@@ -3,6 +3,7 @@ import sqlite3
 import logging
 from binance.client import Client
 from dotenv import load_dotenv
+from tools.ledger_custos import LedgerCustos
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('Sincronizador_R7')
@@ -12,6 +13,8 @@ def sincronizar_posicoes_reais():
     client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_SECRET_KEY'))
     conn = sqlite3.connect('memoria_bot.db')
     cursor = conn.cursor()
+    ledger = LedgerCustos()
+    precos = {t['symbol']: float(t['price']) for t in client.get_all_tickers()}  # Taxas pagas em BNB
 
     logger.info("🔍 Analisando carteira para adoção de ativos...")
 
@@ -27,16 +30,11 @@ def sincronizar_posicoes_reais():
         symbol = f"{asset}USDT"
 
         try:
-            # 2. Busca o histórico de ordens para achar o preço médio
-            trades = client.get_my_trades(symbol=symbol, limit=5)
-            if not trades: continue
-
-            # Calcula o preço médio das últimas compras
-            soma_preco = sum(float(t['price']) for t in trades if t['isBuyer'])
-            contagem = sum(1 for t in trades if t['isBuyer'])
-            
-            if contagem == 0: continue
-            preco_medio = soma_preco / contagem
+            # 2. Custo médio ponderado pelo histórico COMPLETO de execuções (ledger local)
+            ledger.sincronizar(client, [symbol], precos=precos)
+            custo = ledger.custo(symbol)
+            if not custo or custo['qty'] <= 0: continue
+            preco_medio = custo['preco_medio']
 
             # 3. Injeta na memória da IA como uma posição aberta
             cursor.execute("""
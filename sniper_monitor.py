@@ -1,6 +1,7 @@
 import asyncio
 import collections
 import logging
+import time
 from binance import AsyncClient, BinanceSocketManager
 
 logger = logging.getLogger('sniper_monitor')
@@ -66,7 +67,6 @@ class SniperMonitor:
                             
                             # ⏰ SINCRONIZAÇÃO DE RELÓGIO a cada 500 ciclos (ou ~5-10 minutos)
                             if self.time_sync and self.ciclos_contador[symbol] % 500 == 0:
-                                import time
                                 now = time.time()
                                 # Sincroniza apenas se passou mais de 5 minutos desde a última vez
                                 if now - self.last_time_sync > 300:
@@ -111,7 +111,6 @@ class SniperMonitor:
                             # 2. ANÁLISE DE ENTRADA (Analista + IA)
                             # 🎭 COOLDOWN para memes - evita ansiedade excessiva
                             if any(meme in symbol for meme in ['PEPE', 'DOGE', 'WIF']):
-                                import time
                                 now = time.time()
                                 if now - self.last_meme_attempt[symbol] < self.meme_cooldown_seconds:
                                     # logger.debug(f"🕐 {symbol}: Cooldown ativo - aguardando...")
@@ -129,7 +128,6 @@ class SniperMonitor:
                                 
                                 # Atualiza timestamp para memes
                                 if any(meme in symbol for meme in ['PEPE', 'DOGE', 'WIF']):
-                                    import time
                                     self.last_meme_attempt[symbol] = time.time()
                                 # 3. VALIDAÇÃO DE SEGURANÇA (Guardião NÃO é async)
                                 try:
@@ -195,6 +193,32 @@ class SniperMonitor:
                 
                 await asyncio.sleep(espera)
 
+    async def monitorar_klines_cerebro(self, client):
+        """📐 Velas fechadas do timeframe do Cérebro Stop Loss (um socket multiplexado para todas as moedas)."""
+        features = self.executor_bot.features_cerebro
+        retry_count = 0
+        max_retries = 10
+        
+        while self.is_running and retry_count < max_retries:
+            try:
+                bsm = BinanceSocketManager(client)
+                async with bsm.multiplex_socket(features.streams(self.symbols)) as stream:
+                    logger.info(f"✅ Klines {features.timeframe} do Cérebro conectados ({len(self.symbols)} moedas)")
+                    retry_count = 0
+                    while self.is_running:
+                        msg = await stream.recv()
+                        dados = (msg or {}).get('data') or {}
+                        if dados.get('e') == 'kline':
+                            features.atualizar_kline(dados['s'], dados['k'])
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                retry_count += 1
+                espera = min(60, 2 ** retry_count)
+                logger.error(f"⚠️ Erro no stream de klines do Cérebro: {str(e)[:100]}. "
+                             f"Tentativa {retry_count}/{max_retries}. Reconectando em {espera}s...")
+                await asyncio.sleep(espera)
+
     async def iniciar_sniper(self, api_key=None, api_secret=None):
         """Dispara todas as moedas do settings.json em paralelo.
         
@@ -207,6 +231,8 @@ class SniperMonitor:
         
         try:
             tasks = [self.monitorar_moeda(s, self.client) for s in self.symbols]
+            if self.executor_bot.features_cerebro is not None:
+                tasks.append(self.monitorar_klines_cerebro(self.client))
             logger.info(f"🎯 Sniper R7_V3 operando em {len(self.symbols)} moedas.")
             await asyncio.gather(*tasks)
         except Exception as e:
@@ -59,13 +59,16 @@ def teste_calculo_features():
             44500 + i * 50 for i in range(0, 15)   # Recuperação
         ]
         
+        buffer_volumes = [800 + (i % 5) * 50 for i in range(30)]
+        
         preco_atual = 44800
         
         features = cerebro.calcular_features(
             symbol='BTCUSDT',
             preco_atual=preco_atual,
             buffer_precos=buffer_precos,
-            volume_atual=1000
+            volume_atual=1000,
+            buffer_volumes=buffer_volumes
         )
         
         if features is None:
@@ -0,0 +1,105 @@
+"""
+🌱 APRENDIZADO INCREMENTAL
+Floresta que cresce por janelas: cada atualização treina um lote pequeno de árvores
+só com as linhas recém-rotuladas e as janelas mais antigas saem do ensemble.
+Atualizar o modelo custa segundos (proporcional às linhas novas), não um refit
+completo do histórico inteiro.
+"""
+import copy
+import logging
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+
+logger = logging.getLogger('aprendizado_incremental')
+
+
+class FlorestaIncremental(BaseEstimator, ClassifierMixin):
+    """Ensemble de sub-florestas por janela de tempo, com envelhecimento das antigas.
+
+    Compatível com a interface usada pelo IAEngine (predict_proba/predict/fit),
+    então pode ser publicado no registro e trocado a quente como qualquer modelo.
+    """
+
+    def __init__(self, arvores_por_janela=25, max_janelas=8, max_depth=10, random_state=42, n_jobs=None):
+        self.arvores_por_janela = arvores_por_janela
+        self.max_janelas = max_janelas
+        self.max_depth = max_depth
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    @classmethod
+    def a_partir_de(cls, modelo_base, **params):
+        """Usa um modelo já treinado (ex.: RandomForest do treino completo) como primeira janela."""
+        floresta = cls(**params)
+        floresta.janelas_ = []
+        floresta.classes_ = np.array([0, 1])
+        if modelo_base is not None and hasattr(modelo_base, 'classes_'):
+            floresta.janelas_.append({'modelo': modelo_base, 'n_amostras': None, 'origem': 'base'})
+        return floresta
+
+    def fit(self, X, y):
+        """Refit completo: descarta as janelas e começa de uma única janela."""
+        self.janelas_ = []
+        self.classes_ = np.array([0, 1])
+        return self.atualizar(X, y)
+
+    def atualizar(self, X, y, origem='incremental'):
+        """Treina uma nova janela só com as linhas novas e envelhece as antigas."""
+        if not hasattr(self, 'janelas_'):
+            self.janelas_ = []
+            self.classes_ = np.array([0, 1])
+
+        y = np.asarray(y).astype(int)
+        if len(np.unique(y)) < 2:
+            logger.warning("⚠️ Janela nova tem uma única classe - atualização ignorada")
+            return self
+
+        semente = None if self.random_state is None else self.random_state + len(self.janelas_)
+        sub = RandomForestClassifier(
+            n_estimators=self.arvores_por_janela, max_depth=self.max_depth,
+            random_state=semente, n_jobs=self.n_jobs
+        )
+        sub.fit(X, y)
+        if 'n_jobs' in sub.get_params():
+            sub.set_params(n_jobs=None)
+        self.janelas_.append({'modelo': sub, 'n_amostras': int(len(y)), 'origem': origem})
+
+        # 🧹 Janela deslizante: sai a mais antiga
+        while len(self.janelas_) > self.max_janelas:
+            self.janelas_.pop(0)
+        return self
+
+    @staticmethod
+    def _n_arvores(modelo):
+        return len(getattr(modelo, 'estimators_', None) or []) or 1
+
+    def predict_proba(self, X):
+        """Fração de votos de TODAS as árvores: cada janela pesa pelo seu número de árvores
+        (a janela base de 100 árvores não vale o mesmo que uma de 25)."""
+        janelas = getattr(self, 'janelas_', [])
+        if not janelas:
+            return np.full((len(X), 2), 0.5)
+        soma = np.zeros((len(X), 2))
+        total = 0
+        for janela in janelas:
+            modelo = janela['modelo']
+            peso = self._n_arvores(modelo)
+            proba = modelo.predict_proba(X)
+            # Alinha colunas pelas classes do sub-modelo (janelas antigas podem ter uma só classe)
+            for i, classe in enumerate(modelo.classes_):
+                soma[:, int(classe)] += peso * proba[:, i]
+            total += peso
+        return soma / total
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+    def copia(self):
+        """Cópia independente para atualizar sem tocar o modelo em produção."""
+        nova = copy.copy(self)
+        nova.janelas_ = list(getattr(self, 'janelas_', []))  # Sub-modelos são imutáveis após o fit
+        if not hasattr(nova, 'classes_'):
+            nova.classes_ = np.array([0, 1])
+        return nova
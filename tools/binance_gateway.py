@@ -0,0 +1,273 @@
+"""
+🚦 GATEWAY REST DA BINANCE
+Um único ponto de saída para as chamadas REST do processo (Analista, Executor,
+AccountMonitor, PrevisaoEngine, MonitorPrevisoes...). Cada bot chamava o AsyncClient
+por conta própria, sem noção do orçamento de peso do IP - sob carga isso vira
+429 e, insistindo, 418 (IP banido).
+
+O gateway expõe a mesma interface do AsyncClient (gateway.get_klines(...),
+gateway.order_market_buy(...)) e por baixo:
+    - token bucket por limite: peso/min, ordens/10s e ordens/dia, corrigidos pelos
+      headers X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-* de cada resposta
+    - prioridade: ordens passam direto e podem usar a reserva do orçamento;
+      chamadas informativas esperam enquanto houver ordem na fila e ficam limitadas
+      em concorrência
+    - coalescência: leituras idênticas em voo (mesmo método e parâmetros) viram
+      uma única requisição
+    - 429/418: respeita o Retry-After e pausa TODO o tráfego até lá
+
+O dashboard roda em outro processo e só usa endpoints públicos via requests; fica
+fora do gateway.
+
+Configuração via .env:
+    R7_BINANCE_PESO_MIN=6000        # REQUEST_WEIGHT por minuto do IP
+    R7_BINANCE_ORDENS_10S=100       # ORDERS por 10s
+    R7_BINANCE_ORDENS_DIA=200000    # ORDERS por dia
+    R7_BINANCE_RESERVA=0.2          # fração do peso reservada para ordens
+    R7_BINANCE_CONCORRENCIA=8       # chamadas informativas simultâneas
+"""
+import asyncio
+import logging
+import os
+import time
+
+from binance.exceptions import BinanceAPIException
+
+logger = logging.getLogger('binance_gateway')
+
+# Prioridades (menor = mais urgente)
+ORDEM, CONTA, MERCADO = 0, 1, 2
+
+# Peso de cada endpoint (docs da Binance Spot). Métodos fora da tabela: PESO_PADRAO
+PESOS = {
+    'get_exchange_info': 20,
+    'get_symbol_info': 20,
+    'get_account': 20,
+    'get_asset_balance': 20,
+    'get_my_trades': 20,
+    'get_all_orders': 20,
+    'get_open_orders': 6,
+    'get_order': 4,
+    'v3_get_order_list': 4,
+    'get_klines': 2,
+    'get_historical_klines': 2,
+    'get_avg_price': 2,
+    'get_symbol_ticker': 2,
+    'get_all_tickers': 4,
+    'get_ticker': 2,
+    'get_orderbook_ticker': 2,
+    'get_order_book': 5,
+    'get_server_time': 1,
+    'ping': 1,
+}
+PESO_PADRAO = 2
+PREFIXOS_ORDEM = ('order_', 'create_', 'cancel_', 'v3_post_order', 'v3_delete_order')
+PREFIXOS_REST = ('get_', 'v3_get_') + PREFIXOS_ORDEM
+METODOS_CONTA = {'get_account', 'get_asset_balance', 'get_my_trades', 'get_all_orders', 'get_open_orders',
+                 'get_order', 'get_open_oco_orders', 'v3_get_order_list'}
+
+
+def peso_de(metodo, kwargs):
+    """Peso estimado da chamada; ticker/livro sem símbolo pesam bem mais."""
+    if metodo in ('get_symbol_ticker', 'get_ticker', 'get_orderbook_ticker') and 'symbol' not in kwargs:
+        return 80 if metodo == 'get_ticker' else 4
+    if metodo == 'get_open_orders' and 'symbol' not in kwargs:
+        return 80
+    if metodo.startswith(PREFIXOS_ORDEM):
+        return 1
+    return PESOS.get(metodo, PESO_PADRAO)
+
+
+def prioridade_de(metodo):
+    if metodo.startswith(PREFIXOS_ORDEM):
+        return ORDEM
+    return CONTA if metodo in METODOS_CONTA else MERCADO
+
+
+class _Balde:
+    """Token bucket de um limite da Binance, realimentado pelo uso informado nos headers."""
+
+    __slots__ = ('capacidade', 'janela', 'tokens', 'atualizado')
+
+    def __init__(self, capacidade, janela_s):
+        self.capacidade = float(capacidade)
+        self.janela = float(janela_s)
+        self.tokens = self.capacidade
+        self.atualizado = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.capacidade / self.janela)
+        self.atualizado = agora
+
+    def espera(self, custo, reserva=0.0):
+        """Segundos até poder gastar `custo` mantendo `reserva` tokens intocados (0 = já pode)."""
+        self._repor()
+        falta = custo + reserva - self.tokens
+        return max(0.0, falta * self.janela / self.capacidade)
+
+    def gastar(self, custo):
+        self.tokens -= custo
+
+    def sincronizar(self, usado):
+        """O servidor é a fonte da verdade: nunca acreditar em mais tokens do que ele deixa."""
+        self._repor()
+        self.tokens = min(self.tokens, self.capacidade - float(usado))
+
+
+def cliente_bruto(client):
+    """AsyncClient por trás de um gateway (para quem precisa do cliente em si, ex.: sockets)."""
+    return client.client if isinstance(client, BinanceGateway) else client
+
+
+class BinanceGateway:
+    """Envolve um AsyncClient; métodos REST passam pelo controle de taxa, o resto é repassado."""
+
+    def __init__(self, client, peso_min=None, ordens_10s=None, ordens_dia=None, reserva=None,
+                 concorrencia=None):
+        self.client = client  # AsyncClient cru (BinanceSocketManager e TimeSyncManager usam direto)
+        self.peso = _Balde(int(peso_min or os.getenv('R7_BINANCE_PESO_MIN', '6000')), 60)
+        self.ordens_10s = _Balde(int(ordens_10s or os.getenv('R7_BINANCE_ORDENS_10S', '100')), 10)
+        self.ordens_dia = _Balde(int(ordens_dia or os.getenv('R7_BINANCE_ORDENS_DIA', '200000')), 86400)
+        self.reserva = self.peso.capacidade * float(reserva if reserva is not None
+                                                    else os.getenv('R7_BINANCE_RESERVA', '0.2'))
+        self._semaforo = asyncio.Semaphore(int(concorrencia or os.getenv('R7_BINANCE_CONCORRENCIA', '8')))
+        self._ordens_na_fila = 0
+        self._sem_ordens = asyncio.Event()
+        self._sem_ordens.set()
+        self._em_voo = {}
+        self.bloqueado_ate = 0.0
+        self.peso_usado = 0
+        self.stats = {'chamadas': 0, 'ordens': 0, 'coalescidas': 0, 'esperas_s': 0.0, 'limitadas': 0}
+
+    def __getattr__(self, nome):
+        atributo = getattr(self.client, nome)
+        if not nome.startswith(PREFIXOS_REST) or not callable(atributo):
+            return atributo
+
+        async def chamada(*args, **kwargs):
+            return await self.chamar(nome, *args, **kwargs)
+
+        chamada.__name__ = nome
+        return chamada
+
+    # ------------------------------------------------------------------ API
+
+    async def chamar(self, metodo, *args, **kwargs):
+        """Executa client.<metodo>(...) respeitando orçamento, prioridade e coalescência."""
+        prioridade = prioridade_de(metodo)
+        if prioridade == ORDEM:
+            return await self._ordem(metodo, args, kwargs)
+
+        try:
+            chave = (metodo, args, tuple(sorted(kwargs.items())))
+            hash(chave)
+        except TypeError:
+            chave = None
+        if chave is not None:
+            tarefa = self._em_voo.get(chave)
+            if tarefa is not None:
+                self.stats['coalescidas'] += 1
+                return await asyncio.shield(tarefa)
+            tarefa = asyncio.ensure_future(self._informativa(metodo, args, kwargs))
+            self._em_voo[chave] = tarefa
+            tarefa.add_done_callback(lambda _t, c=chave: self._em_voo.pop(c, None))
+            return await asyncio.shield(tarefa)
+        return await self._informativa(metodo, args, kwargs)
+
+    def resumo(self):
+        return dict(self.stats, peso_usado_1m=self.peso_usado, tokens_peso=round(self.peso.tokens, 1),
+                    bloqueado_s=round(max(0.0, self.bloqueado_ate - time.monotonic()), 1))
+
+    # ------------------------------------------------------------------ execução
+
+    async def _ordem(self, metodo, args, kwargs):
+        self._ordens_na_fila += 1
+        self._sem_ordens.clear()
+        try:
+            await self._aguardar_bloqueio()
+            # Ordem pode consumir a reserva, mas nunca estourar o limite do servidor
+            await self._aguardar_baldes(1, 0.0, ordem=True)
+            self.stats['ordens'] += 1
+            return await self._executar(metodo, args, kwargs, repetir=False)
+        finally:
+            self._ordens_na_fila -= 1
+            if self._ordens_na_fila == 0:
+                self._sem_ordens.set()
+
+    async def _informativa(self, metodo, args, kwargs):
+        custo = peso_de(metodo, kwargs)
+        async with self._semaforo:
+            while True:
+                await self._aguardar_bloqueio()
+                await self._sem_ordens.wait()  # Ordem na fila passa na frente
+                if await self._aguardar_baldes(custo, self.reserva):
+                    break
+            return await self._executar(metodo, args, kwargs, repetir=True)
+
+    async def _aguardar_bloqueio(self):
+        espera = self.bloqueado_ate - time.monotonic()
+        if espera > 0:
+            self.stats['esperas_s'] += espera
+            await asyncio.sleep(espera)
+
+    async def _aguardar_baldes(self, custo, reserva, ordem=False):
+        """Espera orçamento. Retorna True quando debitou; False se uma ordem chegou no meio."""
+        while True:
+            espera = self.peso.espera(custo, reserva)
+            if ordem:
+                espera = max(espera, self.ordens_10s.espera(1), self.ordens_dia.espera(1))
+            if espera <= 0:
+                self.peso.gastar(custo)
+                if ordem:
+                    self.ordens_10s.gastar(1)
+                    self.ordens_dia.gastar(1)
+                return True
+            self.stats['esperas_s'] += espera
+            await asyncio.sleep(min(espera, 1.0))
+            if not ordem and not self._sem_ordens.is_set():
+                return False
+
+    async def _executar(self, metodo, args, kwargs, repetir):
+        self.stats['chamadas'] += 1
+        try:
+            resultado = await getattr(self.client, metodo)(*args, **kwargs)
+        except BinanceAPIException as e:
+            self._ler_headers(getattr(e, 'response', None))
+            if e.status_code in (418, 429):
+                self._limitado(e)
+                if repetir:  # Leitura pode esperar e tentar uma vez; ordem velha não é reenviada
+                    await self._aguardar_bloqueio()
+                    return await getattr(self.client, metodo)(*args, **kwargs)
+            raise
+        self._ler_headers(getattr(self.client, 'response', None))
+        return resultado
+
+    def _ler_headers(self, resposta):
+        headers = getattr(resposta, 'headers', None)  # CIMultiDict do aiohttp: sem diferenciar caixa
+        if not headers:
+            return
+        usado = headers.get('X-MBX-USED-WEIGHT-1M')
+        if usado is not None:
+            self.peso_usado = int(usado)
+            self.peso.sincronizar(self.peso_usado)
+        ordens = headers.get('X-MBX-ORDER-COUNT-10S')
+        if ordens is not None:
+            self.ordens_10s.sincronizar(int(ordens))
+        ordens_dia = headers.get('X-MBX-ORDER-COUNT-1D')
+        if ordens_dia is not None:
+            self.ordens_dia.sincronizar(int(ordens_dia))
+
+    def _limitado(self, erro):
+        headers = getattr(getattr(erro, 'response', None), 'headers', None) or {}
+        try:
+            retry_after = float(headers.get('Retry-After') or 0)
+        except (TypeError, ValueError):
+            retry_after = 0.0
+        # Sem Retry-After: 60s no 429 (janela de peso) e 5 min no 418 (ban escala se insistir)
+        retry_after = retry_after or (300.0 if erro.status_code == 418 else 60.0)
+        self.bloqueado_ate = max(self.bloqueado_ate, time.monotonic() + retry_after)
+        self.peso.tokens = 0.0
+        self.stats['limitadas'] += 1
+        logger.error(f"🚦 Binance {erro.status_code} ({'IP banido' if erro.status_code == 418 else 'rate limit'}) "
+                     f"- pausando chamadas REST por {retry_after:.0f}s")
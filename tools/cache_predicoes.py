@@ -0,0 +1,150 @@
+"""
+🗃️ CACHE DE PREDIÇÕES (LRU + TTL)
+Em símbolos parados, ticks seguidos geram praticamente o mesmo vetor de features.
+A chave do cache é (símbolo, vetor quantizado): se o vetor caiu no mesmo "degrau"
+e o modelo não mudou, a probabilidade sai de um dicionário em vez da floresta.
+
+Quantização por feature:
+    passo absoluto  → round(x / passo)          (ex.: rsi=0.5)
+    passo relativo  → round(log(x) / passo)     (preços: r0.001 ≈ 10 bps, independe da escala)
+    off             → feature fora da chave     (a prob do primeiro vetor do degrau vale para todos)
+
+Os degraus precisam ser mais largos que o ruído tick a tick, senão nenhum vetor se
+repete: o order book (top-5 buscado a cada análise) muda alguns % por tick e, com
+passos de 1e-5/1e-6, a taxa de acerto medida era 0%. Com os padrões abaixo, numa
+simulação de ticks de símbolo parado (preço em passos de tick, RSI/EMA do buffer,
+volumes do book variando ~2% por tick): BTC 36%, ETH 34%, PEPE 24% (um tick de PEPE
+já é ~0,1% de preço). O custo é o erro de quantização: vetores do mesmo degrau (0,1%
+de preço, ~10% de volume do book) recebem a mesma probabilidade por até TTL segundos.
+Tirando o book da chave (bid_volume/ask_volume/support_strength/bid_ask_ratio=off),
+a mesma simulação sobe para ~99% (BTC/ETH) e 57% (PEPE).
+
+Configuração via .env:
+    R7_PRED_CACHE=true
+    R7_PRED_CACHE_TTL=30          # segundos
+    R7_PRED_CACHE_MAX=4096        # entradas
+    R7_PRED_CACHE_QUANT=rsi=1,bid_volume=off     # sobrescreve os passos padrão
+"""
+import collections
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger('cache_predicoes')
+
+# Features de preço usam passo relativo; as demais, absoluto
+FEATURES_PRECO = {'close', 'ema20', 'ema200', 'bb_upper', 'bb_lower', 'avg_price'}
+PASSO_RELATIVO_PADRAO = 1e-3
+PASSO_ABSOLUTO_PADRAO = 1e-6
+PASSOS_PADRAO = {
+    'rsi': 0.5,
+    # 📖 Order book: ruidoso tick a tick (volumes em escala log, ~10% por degrau)
+    'bid_volume': ('r', 0.1), 'ask_volume': ('r', 0.1), 'support_strength': ('r', 0.1),
+    'bid_ask_ratio': 0.1, 'spread_pct': 0.01,
+}
+
+
+def ler_passos_env(valor=None):
+    """Converte 'rsi=0.05,close=r0.0002,spread_pct=off' em {'rsi': 0.05, 'close': ('r', 0.0002), 'spread_pct': inf}."""
+    valor = os.getenv('R7_PRED_CACHE_QUANT', '') if valor is None else valor
+    passos = {}
+    for item in valor.split(','):
+        if '=' not in item:
+            continue
+        nome, passo = (p.strip() for p in item.split('=', 1))
+        try:
+            if passo.lower() == 'off':
+                passos[nome] = float('inf')  # round(x / inf) = 0: a feature não diferencia chaves
+                continue
+            passos[nome] = ('r', float(passo[1:])) if passo.startswith('r') else float(passo)
+        except ValueError:
+            logger.warning(f"⚠️ Passo de quantização inválido ignorado: {item}")
+    return passos
+
+
+class CachePredicoes:
+    """LRU com expiração, chaveado por símbolo + vetor quantizado."""
+
+    def __init__(self, colunas, passos=None, max_itens=4096, ttl_s=30.0):
+        self.colunas = list(colunas)
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self._itens = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self.acertos = 0
+        self.falhas = 0
+
+        config = dict(PASSOS_PADRAO)
+        config.update(passos or {})
+        divisores = np.empty(len(self.colunas))
+        relativo = np.zeros(len(self.colunas), dtype=bool)
+        for i, col in enumerate(self.colunas):
+            passo = config.get(col, ('r', PASSO_RELATIVO_PADRAO) if col in FEATURES_PRECO else PASSO_ABSOLUTO_PADRAO)
+            if isinstance(passo, tuple):
+                relativo[i], passo = True, passo[1]
+            divisores[i] = passo
+        self._divisores = divisores
+        self._relativo = relativo
+
+    @classmethod
+    def do_env(cls, colunas):
+        """Cria o cache a partir do .env (None se R7_PRED_CACHE=false)."""
+        if os.getenv('R7_PRED_CACHE', 'true').lower() not in ('1', 'true', 'yes', 'y'):
+            return None
+        return cls(
+            colunas, passos=ler_passos_env(),
+            max_itens=int(os.getenv('R7_PRED_CACHE_MAX', '4096')),
+            ttl_s=float(os.getenv('R7_PRED_CACHE_TTL', '30')),
+        )
+
+    def chave(self, symbol, vetor):
+        valores = np.asarray(vetor, dtype='float64').copy()
+        positivos = self._relativo & (valores > 0)
+        valores[positivos] = np.log(valores[positivos])
+        return symbol, np.rint(valores / self._divisores).astype(np.int64).tobytes()
+
+    @property
+    def geracao(self):
+        """Muda a cada invalidação; resultados calculados antes dela não entram no cache."""
+        return self._geracao
+
+    def obter(self, chave):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] < agora:
+                if item is not None:
+                    del self._itens[chave]
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, valor, geracao):
+        with self._lock:
+            if geracao != self._geracao:
+                return  # Modelo trocou enquanto a predição rodava
+            self._itens[chave] = (time.monotonic() + self.ttl_s, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self):
+        """Chamado no hot-swap do modelo."""
+        with self._lock:
+            self._itens.clear()
+            self._geracao += 1
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / total if total else 0.0,
+            'itens': len(self._itens),
+        }
@@ -0,0 +1,126 @@
+"""
+📏 CALIBRAÇÃO DE PROBABILIDADES
+A "probabilidade" do RandomForest é a fração de árvores que votaram compra, não a
+chance real de o trade dar certo. Os limiares (0.45 do predict, 0.50/0.60 do
+Analista, 0.80/0.90 do tamanho da mão no executor) só significam o que dizem depois
+de calibrados.
+
+A calibração é ajustada no treino, sobre o conjunto de validação (30% mais recentes,
+que o modelo não viu), e exportada como uma tabela compacta de pontos (x → y)
+gravada nos metadados da versão. Na inferência é só um np.interp: busca binária
+em ~64 pontos, sem sklearn no hot path.
+
+    isotonic → IsotonicRegression (monotônica, sem forma fixa; precisa de mais dados)
+    platt    → regressão logística sobre o logit da probabilidade bruta (poucos dados)
+
+Configuração via .env:
+    R7_CALIBRACAO=isotonic      # isotonic | platt | off
+    R7_CALIBRACAO_MIN=200       # abaixo disso usa platt; abaixo de 50 não calibra
+"""
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger('calibracao')
+
+MIN_AMOSTRAS_CALIBRACAO = 50
+MAX_PONTOS = 64
+
+
+class Calibrador:
+    """Tabela monotônica probabilidade bruta → probabilidade calibrada."""
+
+    __slots__ = ('metodo', 'x', 'y')
+
+    def __init__(self, x, y, metodo='isotonic'):
+        self.metodo = metodo
+        self.x = np.asarray(x, dtype='float64')
+        self.y = np.asarray(y, dtype='float64')
+
+    def aplicar(self, prob):
+        """Escalar ou array; fora da tabela fica no valor da ponta (igual ao clip do isotonic)."""
+        saida = np.interp(prob, self.x, self.y)
+        return float(saida) if np.ndim(saida) == 0 else saida
+
+    def para_dict(self):
+        return {'metodo': self.metodo, 'x': [round(float(v), 6) for v in self.x],
+                'y': [round(float(v), 6) for v in self.y]}
+
+    @classmethod
+    def de_dict(cls, dados):
+        """None se a versão não tem calibração (modelos antigos seguem com a prob bruta)."""
+        if not dados or len(dados.get('x') or []) < 2:
+            return None
+        return cls(dados['x'], dados['y'], dados.get('metodo', 'isotonic'))
+
+
+def metricas_calibracao(probs, y, n_bins=10):
+    """Brier score e ECE (erro de calibração esperado, bins de largura fixa)."""
+    probs = np.asarray(probs, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if len(probs) == 0:
+        return {'brier': 0.0, 'ece': 0.0}
+    bins = np.minimum((probs * n_bins).astype(int), n_bins - 1)
+    soma_p = np.bincount(bins, weights=probs, minlength=n_bins)
+    soma_y = np.bincount(bins, weights=y, minlength=n_bins)
+    ece = float(np.abs(soma_p - soma_y).sum() / len(probs))
+    return {'brier': float(np.mean((probs - y) ** 2)), 'ece': ece}
+
+
+def _tabela_isotonica(probs, y, max_pontos):
+    from sklearn.isotonic import IsotonicRegression
+
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, increasing=True, out_of_bounds='clip').fit(probs, y)
+    x = np.asarray(iso.X_thresholds_, dtype='float64')
+    if len(x) > max_pontos:
+        # Os degraus do isotonic são muitos em dados grandes: reamostra nos quantis dos limites
+        x = np.unique(np.quantile(x, np.linspace(0, 1, max_pontos)))
+    return x, iso.predict(x)
+
+
+def _tabela_platt(probs, y, max_pontos):
+    from sklearn.linear_model import LogisticRegression
+
+    eps = 1e-4
+    p = np.clip(probs, eps, 1 - eps)
+    logit = np.log(p / (1 - p)).reshape(-1, 1)
+    lr = LogisticRegression(C=1e4).fit(logit, y)
+    if lr.coef_[0, 0] <= 0:
+        return None, None  # Prob bruta anticorrelacionada com o rótulo: não há o que calibrar
+    x = np.linspace(0.0, 1.0, max_pontos)
+    xc = np.clip(x, eps, 1 - eps)
+    return x, lr.predict_proba(np.log(xc / (1 - xc)).reshape(-1, 1))[:, 1]
+
+
+def ajustar_calibrador(probs, y, metodo=None, max_pontos=MAX_PONTOS):
+    """Ajusta a calibração na validação. Retorna (Calibrador, métricas) ou (None, {})."""
+    metodo = (metodo or os.getenv('R7_CALIBRACAO', 'isotonic')).lower()
+    probs = np.asarray(probs, dtype='float64')
+    y = np.asarray(y, dtype=int)
+    if metodo in ('off', 'false', 'nenhum') or len(probs) < MIN_AMOSTRAS_CALIBRACAO or len(np.unique(y)) < 2:
+        return None, {}
+    if metodo == 'isotonic' and len(probs) < int(os.getenv('R7_CALIBRACAO_MIN', '200')):
+        metodo = 'platt'
+
+    try:
+        x, tabela = (_tabela_platt if metodo == 'platt' else _tabela_isotonica)(probs, y, max_pontos)
+    except Exception as e:
+        logger.warning(f"⚠️ Calibração ({metodo}) falhou: {e} - mantendo probabilidade bruta")
+        return None, {}
+    if x is None:
+        return None, {}
+
+    calibrador = Calibrador(x, np.maximum.accumulate(tabela), metodo)
+    antes = metricas_calibracao(probs, y)
+    depois = metricas_calibracao(calibrador.aplicar(probs), y)
+    metricas = {'n': int(len(probs)), 'brier_bruto': antes['brier'], 'brier_calibrado': depois['brier'],
+                'ece_bruto': antes['ece'], 'ece_calibrado': depois['ece']}
+    logger.info(f"📏 Calibração {metodo} ({len(x)} pontos): ECE {antes['ece']:.3f} → {depois['ece']:.3f} | "
+                f"Brier {antes['brier']:.4f} → {depois['brier']:.4f}")
+    return calibrador, metricas
+
+
+def calibracao_para_metadados(calibrador, metricas):
+    """Bloco 'calibracao' dos metadados da versão ({} = sem calibração)."""
+    return dict(calibrador.para_dict(), metricas=metricas) if calibrador is not None else {}
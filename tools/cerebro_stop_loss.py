@@ -7,24 +7,36 @@ import os
 import logging
 import pandas as pd
 import pandas_ta as ta
+from tools.model_registry import ModelRegistry
 
 logger = logging.getLogger('cerebro_stop_loss')
 
+# Ordem de features dos modelos antigos (sem 'features' nos metadados)
+FEATURES_LEGADO = ['rsi', 'ema20', 'atr_pct', 'rel_vol']
+
 class CerebroStopLoss:
     """
     🧠 Cérebro de Decisão para Stop Loss
     Carrega modelo treinado e decide se deve vender ou aguardar reversão
     """
     
-    def __init__(self, model_path='models/cerebro_r7_v3.pkl'):
+    def __init__(self, model_path='models/cerebro_r7_v3.pkl', registry_dir=None):
         self.model_path = model_path
         self.modelo = None
+        self.versao_modelo = None
+        self.metadados_modelo = {}
+        self.features_modelo = FEATURES_LEGADO
+        self.registry = ModelRegistry('cerebro_stop_loss', base_dir=registry_dir)
         self.carregar_modelo()
     
     def carregar_modelo(self):
-        """Carrega o modelo treinado"""
+        """Carrega o modelo treinado (versão atual do registro; arquivo antigo como fallback)"""
         try:
-            if os.path.exists(self.model_path):
+            modelo, versao, meta = self.registry.carregar()
+            if modelo is not None:
+                self._trocar_modelo(modelo, versao, meta)
+                logger.info(f"🧠 Cérebro Stop Loss carregado do registro: {versao}")
+            elif os.path.exists(self.model_path):
                 self.modelo = joblib.load(self.model_path)
                 logger.info(f"🧠 Cérebro Stop Loss carregado: {self.model_path}")
             else:
@@ -34,7 +46,30 @@ class CerebroStopLoss:
             logger.error(f"❌ Erro ao carregar modelo: {e}")
             self.modelo = None
     
-    def calcular_features(self, symbol, preco_atual, buffer_precos, volume_atual=None):
+    def _trocar_modelo(self, modelo, versao, meta):
+        """Hot-swap sem lock: a atribuição de self.modelo é o ponto de corte."""
+        self.versao_modelo = versao
+        self.metadados_modelo = meta or {}
+        self.features_modelo = self.metadados_modelo.get('features', FEATURES_LEGADO)
+        self.modelo = modelo
+    
+    def verificar_atualizacao(self):
+        """Recarrega se o ponteiro CURRENT do registro mudou (chamado fora do event loop)."""
+        versao = self.registry.versao_atual()
+        if not versao or versao == self.versao_modelo:
+            return False
+        modelo, versao, meta = self.registry.carregar(versao)
+        self._trocar_modelo(modelo, versao, meta)
+        logger.info(f"🔄 Cérebro Stop Loss atualizado (hot-swap) → {versao}")
+        return True
+    
+    def rollback_modelo(self):
+        """⏪ Volta para a versão anterior do registro."""
+        if self.registry.rollback():
+            return self.verificar_atualizacao()
+        return False
+    
+    def calcular_features(self, symbol, preco_atual, buffer_precos, volume_atual=None, buffer_volumes=None):
         """
         Calcula features necessárias para o modelo
         
@@ -43,6 +78,7 @@ class CerebroStopLoss:
             preco_atual: Preço atual do ativo
             buffer_precos: Lista de preços históricos recentes
             volume_atual: Volume atual (opcional)
+            buffer_volumes: Volumes das mesmas velas (opcional; sem ele rel_vol = 1.0)
         
         Returns:
             dict com features calculadas ou None se houver erro
@@ -66,12 +102,15 @@ class CerebroStopLoss:
             # Última linha (valores atuais)
             last = df.iloc[-1]
             
-            # Features esperadas pelo modelo: [rsi, ema20, atr_pct, rel_vol]
+            # Features dos dois formatos de modelo: ema20 (legado, nível de preço) e
+            # ema_dist_pct (normalizada, modelos de tools/treino_cerebro_stop_loss.py)
+            ema20 = last['ema20'] if not pd.isna(last['ema20']) else preco_atual
             features = {
                 'rsi': last['rsi'] if not pd.isna(last['rsi']) else 50.0,
-                'ema20': last['ema20'] if not pd.isna(last['ema20']) else preco_atual,
+                'ema20': ema20,
+                'ema_dist_pct': (preco_atual / ema20 - 1) * 100 if ema20 else 0.0,
                 'atr_pct': (last['atr'] / preco_atual * 100) if not pd.isna(last['atr']) and preco_atual > 0 else 1.0,
-                'rel_vol': volume_atual / df['close'].mean() if volume_atual else 1.0
+                'rel_vol': self._volume_relativo(buffer_volumes, volume_atual)
             }
             
             return features
@@ -80,8 +119,19 @@ class CerebroStopLoss:
             logger.error(f"❌ Erro ao calcular features para {symbol}: {e}")
             return None
     
+    @staticmethod
+    def _volume_relativo(buffer_volumes, volume_atual=None):
+        """volume / EMA20(volume), igual ao treino (tools/mineracao.py); 1.0 sem histórico."""
+        volumes = [float(v) for v in (buffer_volumes or [])]
+        if volume_atual:
+            volumes.append(float(volume_atual))
+        if len(volumes) < 20:
+            return 1.0
+        ema = ta.ema(pd.Series(volumes), length=20).iloc[-1]
+        return volumes[-1] / ema if ema and not pd.isna(ema) else 1.0
+    
     def decidir_venda_ou_renovacao(self, symbol, preco_atual, preco_entrada, buffer_precos, 
-                                    tempo_posicao_horas=0, volume_atual=None):
+                                    tempo_posicao_horas=0, volume_atual=None, buffer_volumes=None):
         """
         🎯 DECISÃO INTELIGENTE: Vender ou Renovar?
         
@@ -92,13 +142,25 @@ class CerebroStopLoss:
             buffer_precos: Histórico de preços
             tempo_posicao_horas: Há quanto tempo está na posição
             volume_atual: Volume atual
+            buffer_volumes: Volumes das velas do buffer (para o rel_vol)
         
         Returns:
             dict com decisão e informações
         """
+        # Calcula features
+        features = self.calcular_features(symbol, preco_atual, buffer_precos, volume_atual, buffer_volumes)
+        return self.decidir_com_features(symbol, preco_atual, preco_entrada, features, tempo_posicao_horas)
+    
+    def decidir_com_features(self, symbol, preco_atual, preco_entrada, features, tempo_posicao_horas=0):
+        """
+        🎯 Mesma decisão, com features já calculadas (ex.: tools/features_incrementais.py).
+        Só avalia o modelo: seguro para rodar em thread fora do event loop.
+        """
         try:
+            modelo = self.modelo  # Referência local: um hot-swap no meio não afeta esta decisão
+            
             # Se modelo não está carregado, vende por segurança
-            if self.modelo is None:
+            if modelo is None:
                 return {
                     'decisao': 'VENDER',
                     'motivo': 'modelo_nao_disponivel',
@@ -106,9 +168,6 @@ class CerebroStopLoss:
                     'features': None
                 }
             
-            # Calcula features
-            features = self.calcular_features(symbol, preco_atual, buffer_precos, volume_atual)
-            
             if features is None:
                 return {
                     'decisao': 'VENDER',
@@ -117,20 +176,18 @@ class CerebroStopLoss:
                     'features': None
                 }
             
-            # Prepara dados para predição (ordem: rsi, ema20, atr_pct, rel_vol)
-            dados_modelo = [[
-                features['rsi'],
-                features['ema20'],
-                features['atr_pct'],
-                features['rel_vol']
-            ]]
+            # Prepara dados na ordem do modelo que vai decidir (modelos novos guardam os nomes)
+            nomes = list(getattr(modelo, 'feature_names_in_', self.features_modelo))
+            dados_modelo = pd.DataFrame([[features[nome] for nome in nomes]], columns=nomes)
+            if not hasattr(modelo, 'feature_names_in_'):
+                dados_modelo = dados_modelo.to_numpy()  # Modelo legado treinado sem nomes
             
             # 🧠 PREDIÇÃO
-            previsao = self.modelo.predict(dados_modelo)[0]
+            previsao = modelo.predict(dados_modelo)[0]
             
             # Tenta obter probabilidade (se modelo suportar)
             try:
-                proba = self.modelo.predict_proba(dados_modelo)[0]
+                proba = modelo.predict_proba(dados_modelo)[0]
                 confianca = max(proba)  # Confiança na predição
             except:
                 confianca = 0.75  # Confiança padrão se não tiver predict_proba
@@ -200,7 +257,7 @@ class CerebroStopLoss:
             rsi: RSI atual (0-100)
             ema20_vs_preco: EMA20 dividido pelo preço atual
             atr_pct: ATR em percentual do preço
-            rel_vol: Volume relativo (volume_atual / média)
+            rel_vol: Volume relativo (volume / EMA20 do volume)
         
         Returns:
             'RENOVAR' ou 'VENDER'
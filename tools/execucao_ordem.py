@@ -0,0 +1,92 @@
+"""
+🧾 LEITURA DA EXECUÇÃO DE ORDENS
+Resume a resposta FULL de uma ordem a mercado (order_market_buy/sell) a partir dos
+fills reais, em vez da média simples de fills[].price e da taxa estimada em 0,1%:
+
+    - preço médio ponderado pela quantidade de cada fill
+    - taxa efetiva em USDT (commission/commissionAsset de cada fill: desconto do BNB,
+      taxa cobrada no próprio ativo comprado)
+    - quantidade líquida que realmente ficou na carteira
+
+Taxa em um ativo sem cotação conhecida (ex.: BNB antes da primeira reconciliação)
+cai na estimativa percentual (taxa_padrao) só para aquele fill.
+"""
+import logging
+
+from tools.ledger_custos import QUOTE_PADRAO, ativo_base, taxa_em_usdt
+
+logger = logging.getLogger('execucao_ordem')
+
+
+class ResumoExecucao:
+    """Execução consolidada de uma ordem."""
+
+    __slots__ = ('symbol', 'lado', 'qty_executada', 'qty_liquida', 'preco_medio', 'valor_quote',
+                 'taxa_usdt', 'comissoes', 'n_fills')
+
+    def __init__(self, symbol, lado):
+        self.symbol = symbol
+        self.lado = lado
+        self.qty_executada = 0.0
+        self.qty_liquida = 0.0
+        self.preco_medio = 0.0
+        self.valor_quote = 0.0
+        self.taxa_usdt = 0.0
+        self.comissoes = {}  # {ativo: quantidade}
+        self.n_fills = 0
+
+    @property
+    def valor_liquido(self):
+        """Compra: USDT gasto com taxas. Venda: USDT recebido já sem as taxas."""
+        return self.valor_quote + self.taxa_usdt if self.lado == 'BUY' else self.valor_quote - self.taxa_usdt
+
+    def __repr__(self):
+        return (f"ResumoExecucao({self.symbol} {self.lado} qty={self.qty_executada} liq={self.qty_liquida} "
+                f"preco={self.preco_medio:.8f} taxa=${self.taxa_usdt:.4f})")
+
+
+def resumir_execucao(ordem, precos=None, taxa_padrao=0.001, preco_referencia=0.0):
+    """
+    Consolida a resposta de uma ordem da Binance em um ResumoExecucao.
+
+    precos: cotações {'BNBUSDT': ...} para converter taxas pagas em outros ativos.
+    preco_referencia: usado só se a ordem não trouxer nem fills nem cummulativeQuoteQty.
+    """
+    symbol = ordem.get('symbol', '')
+    resumo = ResumoExecucao(symbol, ordem.get('side', 'BUY'))
+    base = ativo_base(symbol)
+
+    qty_total = valor_total = 0.0
+    for fill in ordem.get('fills') or []:
+        preco = float(fill.get('price') or 0)
+        qty = float(fill.get('qty') or 0)
+        if qty <= 0:
+            continue
+        comissao = float(fill.get('commission') or 0)
+        ativo_comissao = fill.get('commissionAsset')
+        qty_total += qty
+        valor_total += preco * qty
+        resumo.n_fills += 1
+
+        if comissao:
+            resumo.comissoes[ativo_comissao] = resumo.comissoes.get(ativo_comissao, 0.0) + comissao
+            if ativo_comissao in (QUOTE_PADRAO, base) or f"{ativo_comissao}{QUOTE_PADRAO}" in (precos or {}):
+                resumo.taxa_usdt += taxa_em_usdt(comissao, ativo_comissao, base, preco, precos)
+            else:
+                logger.debug(f"Sem cotação de {ativo_comissao} para a taxa de {symbol}: usando {taxa_padrao:.2%}")
+                resumo.taxa_usdt += preco * qty * taxa_padrao
+
+    # Sem fills (newOrderRespType ACK/RESULT): cai nos totais da ordem e na taxa estimada
+    if qty_total <= 0:
+        qty_total = float(ordem.get('executedQty') or 0)
+        valor_total = float(ordem.get('cummulativeQuoteQty') or 0) or qty_total * preco_referencia
+        resumo.taxa_usdt = valor_total * taxa_padrao
+
+    resumo.qty_executada = qty_total
+    resumo.valor_quote = valor_total
+    resumo.preco_medio = valor_total / qty_total if qty_total > 0 else preco_referencia
+    # Taxa cobrada no ativo base sai da quantidade: na compra fica menos na carteira,
+    # na venda sai um pouco a mais do saldo além do vendido
+    taxa_base = resumo.comissoes.get(base, 0.0)
+    resumo.qty_liquida = qty_total - taxa_base if resumo.lado == 'BUY' else qty_total + taxa_base
+    return resumo
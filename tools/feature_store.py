@@ -0,0 +1,190 @@
+"""
+🧾 FEATURE STORE DE INFERÊNCIA
+Grava EXATAMENTE o vetor de features que o predict viu (mesmas colunas, mesma ordem),
+com símbolo, timestamp, versão do modelo e decisão. Depois rotula cada linha a partir
+do caminho de preço realizado e o treino lê daqui: paridade treino/produção.
+
+Layout (Parquet particionado por dia; CSV comprimido se pyarrow não estiver instalado):
+    data/feature_store/inferencias/data=2026-01-15/part-<ts>.parquet
+    data/feature_store/rotulado/data=2026-01-15/part-<ts>.parquet   # + coluna 'sucesso'
+"""
+import asyncio
+import collections
+import glob
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('feature_store')
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+FEATURE_STORE_DIR = os.path.join('data', 'feature_store')
+COLUNAS_META = ['ts', 'symbol', 'preco', 'versao_modelo', 'decisao', 'prob']
+
+
+def _extensao():
+    return 'parquet' if PARQUET_DISPONIVEL else 'csv.gz'
+
+
+def _gravar(df, path):
+    if PARQUET_DISPONIVEL:
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, compression='gzip')
+
+
+def _ler(path, colunas=None):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=colunas)
+    return pd.read_csv(path, usecols=colunas)
+
+
+class FeatureStore:
+    """Buffer em memória + gravação em lote, colunar e particionada por dia."""
+
+    def __init__(self, colunas_features, base_dir=FEATURE_STORE_DIR, max_buffer=20000):
+        self.colunas_features = list(colunas_features)
+        self.base_dir = base_dir
+        self.dir_inferencias = os.path.join(base_dir, 'inferencias')
+        self.dir_rotulado = os.path.join(base_dir, 'rotulado')
+        self._buffer = collections.deque(maxlen=max_buffer)
+        if not PARQUET_DISPONIVEL:
+            logger.warning("⚠️ pyarrow não instalado - feature store usando CSV comprimido")
+
+    # ------------------------------------------------------------------ escrita
+
+    def registrar(self, symbol, vetor, preco, versao_modelo, decisao, prob):
+        """Chamado no caminho de produção: apenas enfileira (O(1), sem I/O)."""
+        self._buffer.append((time.time(), symbol, float(preco or 0.0), versao_modelo or 'legado',
+                             int(decisao), float(prob), vetor))
+
+    def flush(self):
+        """Grava o buffer acumulado em um arquivo por partição diária."""
+        itens = []
+        while self._buffer:
+            itens.append(self._buffer.popleft())
+        if not itens:
+            return 0
+
+        meta = pd.DataFrame([item[:6] for item in itens], columns=COLUNAS_META)
+        features = pd.DataFrame(np.vstack([item[6] for item in itens]).astype('float32'),
+                                columns=self.colunas_features)
+        df = pd.concat([meta, features], axis=1)
+        df['data'] = pd.to_datetime(df['ts'], unit='s').dt.strftime('%Y-%m-%d')
+
+        for data, parte in df.groupby('data'):
+            diretorio = os.path.join(self.dir_inferencias, f"data={data}")
+            os.makedirs(diretorio, exist_ok=True)
+            path = os.path.join(diretorio, f"part-{time.time_ns()}.{_extensao()}")
+            _gravar(parte.drop(columns=['data']), path)
+        return len(itens)
+
+    async def loop(self, intervalo_flush=10, intervalo_rotulo_min=60):
+        """Background: flush periódico (em thread) e rotulagem horária."""
+        ultimo_rotulo = time.time()
+        while True:
+            await asyncio.sleep(intervalo_flush)
+            try:
+                if self._buffer:
+                    await asyncio.to_thread(self.flush)
+                if time.time() - ultimo_rotulo >= intervalo_rotulo_min * 60:
+                    ultimo_rotulo = time.time()
+                    await asyncio.to_thread(self.rotular)
+            except Exception as e:
+                logger.error(f"❌ Erro no feature store: {e}")
+
+    # ------------------------------------------------------------------ rotulagem
+
+    def _particoes(self, diretorio):
+        return sorted(glob.glob(os.path.join(diretorio, 'data=*')))
+
+    def rotular(self, horizonte_min=60, alvo_pct=1.5, stop_pct=2.0):
+        """🏷️ Rotula partições cujo horizonte já fechou, usando o caminho de preço realizado.
+
+        sucesso = preço atingiu +alvo_pct dentro do horizonte SEM cair stop_pct (mesma
+        lógica de target dos mineradores, agora sobre os preços vistos ao vivo).
+        """
+        particoes = [p for p in self._particoes(self.dir_inferencias)
+                     if not os.path.exists(os.path.join(p, '_rotulado'))]
+        if not particoes:
+            return 0
+
+        # Carrega a partição pendente + a seguinte (o horizonte pode cruzar a meia-noite)
+        todas = self._particoes(self.dir_inferencias)
+        total = 0
+        for particao in particoes:
+            idx = todas.index(particao)
+            vizinhas = todas[idx:idx + 2]
+            df = pd.concat([_ler(f) for p in vizinhas for f in glob.glob(os.path.join(p, 'part-*'))],
+                           ignore_index=True)
+            if df.empty:
+                continue
+
+            dia = os.path.basename(particao).split('=', 1)[1]
+            fim_dia = pd.Timestamp(dia).timestamp() + 86400
+            if df['ts'].max() < fim_dia + horizonte_min * 60:
+                continue  # Horizonte do fim do dia ainda não foi observado
+
+            rotulado = self._rotular_df(df, horizonte_min, alvo_pct, stop_pct)
+            if not rotulado.empty:
+                rotulado = rotulado[(rotulado['ts'] >= fim_dia - 86400) & (rotulado['ts'] < fim_dia)]
+            if not rotulado.empty:
+                destino = os.path.join(self.dir_rotulado, os.path.basename(particao))
+                os.makedirs(destino, exist_ok=True)
+                _gravar(rotulado, os.path.join(destino, f"part-{time.time_ns()}.{_extensao()}"))
+                total += len(rotulado)
+            open(os.path.join(particao, '_rotulado'), 'w').close()
+
+        if total:
+            logger.info(f"🏷️ Feature store: {total} inferências rotuladas")
+        return total
+
+    @staticmethod
+    def _rotular_df(df, horizonte_min, alvo_pct, stop_pct):
+        """Máximo/mínimo futuro por símbolo em janela de tempo, vetorizado (rolling invertido)."""
+        partes = []
+        janela = f"{int(horizonte_min)}min"
+        for _, g in df.sort_values('ts').groupby('symbol', sort=False):
+            g = g[g['preco'] > 0]
+            if g.empty:
+                continue
+            ts_final = g['ts'].iloc[-1]
+            # Rolling "para frente": inverte o tempo e usa janela temporal normal
+            invertido = g.iloc[::-1]
+            indice = pd.to_datetime(ts_final - invertido['ts'], unit='s')
+            precos = pd.Series(invertido['preco'].values, index=indice)
+            futuro_max = precos.rolling(janela).max().values[::-1]
+            futuro_min = precos.rolling(janela).min().values[::-1]
+
+            g = g.copy()
+            g['sucesso'] = ((futuro_max >= g['preco'].values * (1 + alvo_pct / 100)) &
+                            (futuro_min > g['preco'].values * (1 - stop_pct / 100))).astype(int)
+            # Só linhas com horizonte completo observado
+            partes.append(g[g['ts'] <= ts_final - horizonte_min * 60])
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+    # ------------------------------------------------------------------ leitura
+
+    def carregar_treino(self, colunas=None, desde_ts=None):
+        """Lê as linhas rotuladas só com as colunas pedidas (column pruning no Parquet).
+
+        desde_ts: só linhas com ts > desde_ts (treino incremental); dias inteiros
+        anteriores nem são abertos.
+        """
+        arquivos = sorted(glob.glob(os.path.join(self.dir_rotulado, 'data=*', 'part-*')))
+        if desde_ts:
+            dia_minimo = pd.to_datetime(desde_ts, unit='s').strftime('%Y-%m-%d')
+            arquivos = [f for f in arquivos
+                        if os.path.basename(os.path.dirname(f)).split('=', 1)[1] >= dia_minimo]
+        if not arquivos:
+            return pd.DataFrame()
+        df = pd.concat([_ler(f, colunas) for f in arquivos], ignore_index=True)
+        return df[df['ts'] > desde_ts].reset_index(drop=True) if desde_ts else df
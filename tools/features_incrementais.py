@@ -0,0 +1,147 @@
+"""
+📐 FEATURES INCREMENTAIS POR SÍMBOLO
+Mantém, em O(1) por vela, os indicadores que o Cérebro Stop Loss usa (RSI, EMA20,
+ATR e volume relativo, com as mesmas suavizações do pandas_ta). Quando um stop é
+tocado, as features já estão prontas: nada de DataFrame nem de recalcular
+indicadores sobre o buffer inteiro.
+
+As velas vêm do kline stream da Binance no timeframe do modelo (SniperMonitor, um
+único socket multiplexado para todos os símbolos): OHLCV da própria exchange, com o
+volume real da vela - o mesmo 'vol' do cache de klines em que o cérebro foi
+treinado (o 'v' do ticker é o acumulado de 24h em janela deslizante e não serve).
+Só velas fechadas entram nos indicadores. O pré-aquecimento com o cache local faz o
+cérebro decidir logo após um restart.
+
+Configuração via .env:
+    R7_CEREBRO_TF=1h        # timeframe das barras (igual ao do treino do cérebro)
+"""
+import logging
+import os
+
+logger = logging.getLogger('features_incrementais')
+
+SEGUNDOS_POR_TF = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400}
+
+
+class BarrasIncrementais:
+    """Indicadores de um símbolo atualizados barra a barra (Wilder/EMA recursivos)."""
+
+    __slots__ = ('intervalo_s', 'n_barras', 'inicio', 'fechamento_ant', 'ganho_medio', 'perda_media',
+                 'ema20', 'atr', 'vol_ema', 'rsi', 'vol_barra_ant')
+
+    PERIODO_RSI = 14
+    PERIODO_ATR = 14
+    PERIODO_EMA = 20
+
+    def __init__(self, intervalo_s=3600):
+        self.intervalo_s = intervalo_s
+        self.n_barras = 0
+        self.inicio = None  # Abertura (s) da última vela incorporada
+        self.fechamento_ant = None
+        self.ganho_medio = self.perda_media = None
+        self.ema20 = self.atr = self.vol_ema = None
+        self.rsi = None
+        self.vol_barra_ant = None
+
+    @property
+    def pronto(self):
+        return self.n_barras > self.PERIODO_RSI and self.atr is not None
+
+    def atualizar_kline(self, kline):
+        """Evento 'k' do kline stream. Só a vela fechada (x=True) entra; True se entrou."""
+        if not kline.get('x'):
+            return False
+        inicio = int(kline['t']) // 1000
+        if self.inicio is not None and inicio <= self.inicio:
+            return False  # Já incorporada (pré-aquecimento ou evento repetido na reconexão)
+        self.inicio = inicio
+        self.fechar_barra(float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v']))
+        return True
+
+    def fechar_barra(self, maxima, minima, fechamento, volume):
+        """Incorpora uma barra fechada aos indicadores (também usado no pré-aquecimento)."""
+        self.n_barras += 1
+        anterior = self.fechamento_ant
+        self.fechamento_ant = fechamento
+        if anterior is None:
+            self.ema20 = fechamento
+            self.vol_ema = volume
+            return
+
+        # RSI e ATR: média móvel de Wilder (RMA), igual ao pandas_ta
+        variacao = fechamento - anterior
+        ganho, perda = max(variacao, 0.0), max(-variacao, 0.0)
+        tr = max(maxima - minima, abs(maxima - anterior), abs(minima - anterior))
+        if self.ganho_medio is None:
+            self.ganho_medio, self.perda_media, self.atr = ganho, perda, tr
+        else:
+            a = 1.0 / self.PERIODO_RSI
+            self.ganho_medio += a * (ganho - self.ganho_medio)
+            self.perda_media += a * (perda - self.perda_media)
+            self.atr += (tr - self.atr) / self.PERIODO_ATR
+        soma = self.ganho_medio + self.perda_media
+        self.rsi = 100.0 * self.ganho_medio / soma if soma > 0 else 50.0
+
+        k = 2.0 / (self.PERIODO_EMA + 1)
+        self.ema20 += k * (fechamento - self.ema20)
+        self.vol_barra_ant = volume
+        self.vol_ema += k * (volume - self.vol_ema)
+
+    def features(self, preco_atual):
+        """Features do cérebro (barras fechadas, avaliadas no preço atual). None se frio."""
+        if not self.pronto or not preco_atual:
+            return None
+        return {
+            'rsi': self.rsi,
+            'ema20': self.ema20,
+            'ema_dist_pct': (preco_atual / self.ema20 - 1) * 100 if self.ema20 else 0.0,
+            'atr_pct': self.atr / preco_atual * 100,
+            'rel_vol': self.vol_barra_ant / self.vol_ema if self.vol_ema else 1.0,
+        }
+
+
+class FeaturesIncrementais:
+    """Um BarrasIncrementais por símbolo, alimentado pelo kline stream do SniperMonitor."""
+
+    def __init__(self, timeframe=None, aquecer_com_cache=True):
+        self.timeframe = timeframe or os.getenv('R7_CEREBRO_TF', '1h')
+        self.intervalo_s = SEGUNDOS_POR_TF.get(self.timeframe, 3600)
+        self.aquecer_com_cache = aquecer_com_cache
+        self._simbolos = {}
+
+    def _barras(self, symbol):
+        barras = self._simbolos.get(symbol)
+        if barras is None:
+            barras = self._simbolos[symbol] = BarrasIncrementais(self.intervalo_s)
+            if self.aquecer_com_cache:
+                self._aquecer(symbol, barras)
+        return barras
+
+    def _aquecer(self, symbol, barras, max_barras=200):
+        """Pré-aquece com as últimas barras FECHADAS do cache de klines (se houver)."""
+        try:
+            from tools.feature_store import _extensao, _ler
+            from tools.mineracao import KLINES_DIR
+
+            path = os.path.join(KLINES_DIR, self.timeframe, f"{symbol}.{_extensao()}")
+            if not os.path.exists(path):
+                return
+            df = _ler(path).tail(max_barras + 1).iloc[:-1]  # A última pode estar em aberto
+            for maxima, minima, fechamento, volume in df[['high', 'low', 'close', 'vol']].itertuples(index=False):
+                barras.fechar_barra(maxima, minima, fechamento, volume)
+            if len(df) and 'ts' in df.columns:
+                barras.inicio = int(df['ts'].iloc[-1]) // 1000  # O stream não repete estas velas
+            logger.debug(f"📐 {symbol}: {len(df)} barras {self.timeframe} pré-carregadas")
+        except Exception as e:
+            logger.debug(f"Pré-aquecimento de {symbol} indisponível: {e}")
+
+    def streams(self, symbols):
+        """Nomes dos streams de kline para o multiplex socket (ex.: 'btcusdt@kline_1h')."""
+        return [f"{s.lower()}@kline_{self.timeframe}" for s in symbols]
+
+    def atualizar_kline(self, symbol, kline):
+        return self._barras(symbol).atualizar_kline(kline)
+
+    def obter(self, symbol, preco_atual):
+        barras = self._simbolos.get(symbol)
+        return barras.features(preco_atual) if barras is not None else None
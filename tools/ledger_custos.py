@@ -0,0 +1,277 @@
+"""
+📒 LEDGER DE CUSTO MÉDIO
+Histórico COMPLETO de execuções por símbolo em um SQLite local (data/ledger_custos.db).
+Na primeira vez baixa tudo com get_my_trades(fromId=...) paginado; depois só pede as
+execuções novas (fromId = último id + 1) ou recebe-as do user data stream.
+
+Por símbolo mantém, incrementalmente (cada execução é aplicada uma única vez):
+    - quantidade líquida (taxa cobrada no próprio ativo já descontada)
+    - custo médio ponderado e custo FIFO dos lotes ainda abertos
+    - PnL realizado (médio e FIFO) e taxas pagas em USDT
+
+A adoção de posições vira um lookup em memória (custo(symbol)) em vez de chamadas
+REST a cada varredura e de médias simples das últimas 5-10 ordens.
+
+Uso:
+    python tools/ledger_custos.py BTCUSDT SOLUSDT ...   # sincroniza e imprime o custo
+"""
+import collections
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+logger = logging.getLogger('ledger_custos')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+LEDGER_PATH = os.path.join('data', 'ledger_custos.db')
+LIMITE_PAGINA = 1000
+PESO_MY_TRADES = 20  # Peso de GET /api/v3/myTrades
+QUOTE_PADRAO = 'USDT'
+RESIDUO_QTY = 1e-12
+
+
+class EstadoCusto:
+    """Custo de um símbolo, atualizado execução a execução."""
+
+    __slots__ = ('symbol', 'ultimo_id', 'qty', 'custo_total', 'lotes', 'pnl_realizado',
+                 'pnl_realizado_fifo', 'taxas_usdt', 'n_execucoes')
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.ultimo_id = -1
+        self.qty = 0.0
+        self.custo_total = 0.0
+        self.lotes = collections.deque()  # [qty, custo_unitario] dos lotes abertos (FIFO)
+        self.pnl_realizado = 0.0
+        self.pnl_realizado_fifo = 0.0
+        self.taxas_usdt = 0.0
+        self.n_execucoes = 0
+
+    @property
+    def preco_medio(self):
+        return self.custo_total / self.qty if self.qty > RESIDUO_QTY else 0.0
+
+    @property
+    def preco_fifo(self):
+        qty = sum(l[0] for l in self.lotes)
+        return sum(l[0] * l[1] for l in self.lotes) / qty if qty > RESIDUO_QTY else 0.0
+
+    def aplicar(self, comprador, preco, qty, comissao, ativo_comissao, ativo_base, precos=None):
+        """Aplica uma execução. Taxas entram no custo (compra) ou saem da receita (venda)."""
+        taxa_usdt = taxa_em_usdt(comissao, ativo_comissao, ativo_base, preco, precos)
+        self.taxas_usdt += taxa_usdt
+        self.n_execucoes += 1
+
+        if comprador:
+            qty_liquida = qty - comissao if ativo_comissao == ativo_base else qty
+            custo = preco * qty + (taxa_usdt if ativo_comissao != ativo_base else 0.0)
+            if qty_liquida <= RESIDUO_QTY:
+                return
+            self.qty += qty_liquida
+            self.custo_total += custo
+            self.lotes.append([qty_liquida, custo / qty_liquida])
+            return
+
+        # Venda: só a parte coberta pelo histórico tem custo conhecido (o resto veio de
+        # transferências/depósitos e não entra no PnL)
+        coberta = min(qty, self.qty)
+        receita = preco * coberta - taxa_usdt * (coberta / qty if qty else 0.0)
+        if coberta > RESIDUO_QTY:
+            custo_medio = self.preco_medio * coberta
+            self.pnl_realizado += receita - custo_medio
+            self.custo_total -= custo_medio
+            self.qty -= coberta
+
+            restante, custo_fifo = coberta, 0.0
+            while restante > RESIDUO_QTY and self.lotes:
+                lote = self.lotes[0]
+                usado = min(lote[0], restante)
+                custo_fifo += usado * lote[1]
+                lote[0] -= usado
+                restante -= usado
+                if lote[0] <= RESIDUO_QTY:
+                    self.lotes.popleft()
+            self.pnl_realizado_fifo += receita - custo_fifo
+        if self.qty <= RESIDUO_QTY:
+            self.qty, self.custo_total = 0.0, 0.0
+            self.lotes.clear()
+
+    def resumo(self):
+        return {
+            'symbol': self.symbol, 'qty': self.qty, 'preco_medio': self.preco_medio,
+            'preco_fifo': self.preco_fifo, 'custo_total': self.custo_total,
+            'pnl_realizado': self.pnl_realizado, 'pnl_realizado_fifo': self.pnl_realizado_fifo,
+            'taxas_usdt': self.taxas_usdt, 'n_execucoes': self.n_execucoes, 'ultimo_id': self.ultimo_id,
+        }
+
+
+def taxa_em_usdt(comissao, ativo_comissao, ativo_base, preco, precos=None):
+    if not comissao:
+        return 0.0
+    if ativo_comissao == QUOTE_PADRAO:
+        return comissao
+    if ativo_comissao == ativo_base:
+        return comissao * preco
+    cotacao = (precos or {}).get(f"{ativo_comissao}{QUOTE_PADRAO}")
+    return comissao * cotacao if cotacao else 0.0
+
+
+def ativo_base(symbol):
+    return symbol[:-len(QUOTE_PADRAO)] if symbol.endswith(QUOTE_PADRAO) else symbol
+
+
+class LedgerCustos:
+    """Ledger persistente; lookups em memória, escrita em lote por página de execuções."""
+
+    def __init__(self, db_path=LEDGER_PATH):
+        self.db_path = db_path
+        self._estados = {}
+        self._lock = threading.Lock()
+        # Símbolos sincronizados via REST desde a última conexão do user data stream: só neles
+        # um evento do stream pode ser aplicado sem risco de pular execuções (o fromId seguinte
+        # partiria do id do evento)
+        self.sincronizados = set()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._criar_tabelas()
+        self._carregar()
+
+    def _conectar(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _criar_tabelas(self):
+        conn = self._conectar()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS execucoes (
+                symbol TEXT, id INTEGER, order_id INTEGER, ts INTEGER, comprador INTEGER,
+                preco REAL, qty REAL, quote_qty REAL, comissao REAL, ativo_comissao TEXT,
+                PRIMARY KEY (symbol, id)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS custos (
+                symbol TEXT PRIMARY KEY, ultimo_id INTEGER, qty REAL, custo_total REAL, lotes TEXT,
+                pnl_realizado REAL, pnl_realizado_fifo REAL, taxas_usdt REAL, n_execucoes INTEGER
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _carregar(self):
+        conn = self._conectar()
+        for linha in conn.execute('SELECT * FROM custos'):
+            estado = EstadoCusto(linha[0])
+            (estado.ultimo_id, estado.qty, estado.custo_total, lotes, estado.pnl_realizado,
+             estado.pnl_realizado_fifo, estado.taxas_usdt, estado.n_execucoes) = linha[1:]
+            estado.lotes = collections.deque(json.loads(lotes or '[]'))
+            self._estados[estado.symbol] = estado
+        conn.close()
+
+    # ------------------------------------------------------------------ leitura
+
+    def custo(self, symbol):
+        """Resumo do custo do símbolo (None se nunca sincronizado). O(1), sem rede."""
+        estado = self._estados.get(symbol)
+        return estado.resumo() if estado is not None else None
+
+    def ultimo_id(self, symbol):
+        estado = self._estados.get(symbol)
+        return estado.ultimo_id if estado is not None else -1
+
+    # ------------------------------------------------------------------ escrita
+
+    def aplicar_execucoes(self, symbol, trades, precos=None):
+        """Aplica execuções no formato de get_my_trades (ids já vistos são ignorados)."""
+        with self._lock:
+            estado = self._estados.get(symbol) or EstadoCusto(symbol)
+            base = ativo_base(symbol)
+            novas = sorted((t for t in trades if int(t['id']) > estado.ultimo_id), key=lambda t: int(t['id']))
+            linhas = []
+            for t in novas:
+                preco, qty, comissao = float(t['price']), float(t['qty']), float(t.get('commission') or 0)
+                estado.aplicar(bool(t['isBuyer']), preco, qty, comissao, t.get('commissionAsset'), base, precos)
+                estado.ultimo_id = int(t['id'])
+                linhas.append((symbol, int(t['id']), int(t.get('orderId') or 0), int(t.get('time') or 0),
+                               int(bool(t['isBuyer'])), preco, qty, float(t.get('quoteQty') or preco * qty),
+                               comissao, t.get('commissionAsset')))
+            self._estados[symbol] = estado
+            if linhas:
+                self._persistir(estado, linhas)
+            return len(novas)
+
+    def aplicar_evento_execucao(self, evento, precos=None):
+        """executionReport (x=TRADE) do user data stream → execução do ledger."""
+        if evento['s'] not in self.sincronizados:
+            return 0  # A próxima sincronização REST pega esta execução junto com as anteriores
+        return self.aplicar_execucoes(evento['s'], [{
+            'id': evento['t'], 'orderId': evento.get('i'), 'time': evento.get('T'),
+            'isBuyer': evento['S'] == 'BUY', 'price': evento['L'], 'qty': evento['l'],
+            'quoteQty': evento.get('Y'), 'commission': evento.get('n'), 'commissionAsset': evento.get('N'),
+        }], precos)
+
+    def marcar_desconexao(self):
+        """Stream caiu: execuções podem ter se perdido até a próxima sincronização REST."""
+        self.sincronizados.clear()
+
+    def _persistir(self, estado, linhas):
+        conn = self._conectar()
+        with conn:
+            conn.executemany('INSERT OR IGNORE INTO execucoes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', linhas)
+            conn.execute('INSERT OR REPLACE INTO custos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                estado.symbol, estado.ultimo_id, estado.qty, estado.custo_total, json.dumps(list(map(list, estado.lotes))),
+                estado.pnl_realizado, estado.pnl_realizado_fifo, estado.taxas_usdt, estado.n_execucoes,
+            ))
+        conn.close()
+
+    # ------------------------------------------------------------------ sincronização
+
+    def sincronizar(self, client, symbols, precos=None, limitador=None):
+        """Cliente síncrono: baixa só as execuções novas de cada símbolo (paginado por fromId)."""
+        total = 0
+        for symbol in symbols:
+            while True:
+                if limitador is not None:
+                    limitador.adquirir(PESO_MY_TRADES)
+                pagina = client.get_my_trades(symbol=symbol, fromId=self.ultimo_id(symbol) + 1, limit=LIMITE_PAGINA)
+                total += self.aplicar_execucoes(symbol, pagina, precos)
+                if len(pagina) < LIMITE_PAGINA:
+                    break
+            self.sincronizados.add(symbol)
+        return total
+
+    async def sincronizar_async(self, client, symbols, precos=None):
+        """AsyncClient: mesmo que sincronizar(); a escrita no SQLite roda em thread."""
+        import asyncio
+
+        total = 0
+        for symbol in symbols:
+            while True:
+                pagina = await client.get_my_trades(symbol=symbol, fromId=self.ultimo_id(symbol) + 1,
+                                                    limit=LIMITE_PAGINA)
+                total += await asyncio.to_thread(self.aplicar_execucoes, symbol, pagina, precos)
+                if len(pagina) < LIMITE_PAGINA:
+                    break
+            self.sincronizados.add(symbol)
+        return total
+
+
+if __name__ == "__main__":
+    from binance.client import Client
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    load_dotenv()
+    client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_SECRET_KEY'))
+    ledger = LedgerCustos()
+    precos = {t['symbol']: float(t['price']) for t in client.get_all_tickers()}
+    ledger.sincronizar(client, sys.argv[1:], precos=precos)
+    for symbol in sys.argv[1:]:
+        c = ledger.custo(symbol) or {}
+        print(f"📒 {symbol}: qty={c.get('qty', 0):.8f} | médio=${c.get('preco_medio', 0):.6f} | "
+              f"FIFO=${c.get('preco_fifo', 0):.6f} | PnL=${c.get('pnl_realizado', 0):.2f} | "
+              f"taxas=${c.get('taxas_usdt', 0):.2f}")
@@ -0,0 +1,71 @@
+"""
+📦 LOTES DE PREDIÇÃO NO EVENT LOOP
+Cada moeda roda na sua própria coroutine do SniperMonitor e pedia um predict de UMA
+linha: overhead do sklearn (validação, threads, DataFrame) por linha, para o mesmo
+modelo, várias vezes no mesmo milissegundo. Aqui os pedidos que chegam dentro de uma
+janela curta viram um único IAEngine.predict_lote (um predict_proba por modelo).
+
+Sem contenção o custo é a janela de espera; com muitas moedas ticando juntas, o lote
+paga o overhead uma vez só.
+
+Configuração via .env:
+    R7_LOTE_IA_MS=3        # janela de agrupamento (0 = predict direto, sem lote)
+    R7_LOTE_IA_MAX=64      # lote cheio despacha na hora
+"""
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger('lote_predicoes')
+
+
+class LotePredicoes:
+    """Agrupa chamadas concorrentes de prever() em chamadas de pontuar_lote(linhas, symbols, estrategias)."""
+
+    def __init__(self, pontuar_lote, janela_ms=3.0, max_itens=64):
+        self.pontuar_lote = pontuar_lote
+        self.janela = janela_ms / 1000.0
+        self.max_itens = max_itens
+        self._pendentes = []
+        self._agendado = None
+        self.stats = {'lotes': 0, 'linhas': 0, 'maior_lote': 0}
+
+    @classmethod
+    def do_env(cls, pontuar_lote):
+        """None se R7_LOTE_IA_MS=0 (predict direto)."""
+        janela_ms = float(os.getenv('R7_LOTE_IA_MS', '3'))
+        if janela_ms <= 0:
+            return None
+        return cls(pontuar_lote, janela_ms=janela_ms, max_itens=int(os.getenv('R7_LOTE_IA_MAX', '64')))
+
+    async def prever(self, data, symbol=None, estrategia=None):
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((data, symbol, estrategia, futuro))
+        if len(self._pendentes) >= self.max_itens:
+            self._despachar()
+        elif self._agendado is None:
+            self._agendado = loop.call_later(self.janela, self._despachar)
+        return await futuro
+
+    def _despachar(self):
+        if self._agendado is not None:
+            self._agendado.cancel()
+            self._agendado = None
+        itens, self._pendentes = self._pendentes, []
+        if not itens:
+            return
+        try:
+            resultados = self.pontuar_lote([i[0] for i in itens], [i[1] for i in itens], [i[2] for i in itens])
+        except Exception as e:
+            logger.error(f"❌ Lote de predições falhou ({len(itens)} linhas): {e}")
+            for *_, futuro in itens:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (*_, futuro), resultado in zip(itens, resultados):
+            if not futuro.done():  # Quem pediu pode ter sido cancelado
+                futuro.set_result(resultado)
+        self.stats['lotes'] += 1
+        self.stats['linhas'] += len(itens)
+        self.stats['maior_lote'] = max(self.stats['maior_lote'], len(itens))
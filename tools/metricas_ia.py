@@ -0,0 +1,185 @@
+"""
+⏱️ MÉTRICAS DE INFERÊNCIA E DRIFT
+Instrumentação barata do IAEngine.predict:
+    - latência por chamada em histograma de buckets logarítmicos (p50/p95/p99)
+    - tamanhos de lote (predict unitário, lotes shadow/scoring)
+    - taxa de acerto do cache de predições
+    - média/desvio/mín/máx por feature em janela deslizante (amostrada) comparados
+      com as estatísticas do treino → alertas de drift
+
+No hot path só entram um perf_counter, um bisect e (1 a cada N chamadas) um append;
+a agregação roda no export periódico, em thread. O resultado vai para
+data/ia_inferencia_metrics.json, lido pelo dashboard como os demais data/*.json.
+
+Configuração via .env:
+    R7_METRICAS_AMOSTRA=10     # 1 vetor de features a cada N predições entra na janela
+    R7_DRIFT_Z=1.0             # desvio da média ao vivo, em desvios-padrão do treino
+    R7_DRIFT_FORA_FAIXA=0.05   # fração máxima de amostras fora do [mín, máx] do treino
+"""
+import asyncio
+import bisect
+import collections
+import logging
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from utils.arquivos import escrever_json_atomico
+
+logger = logging.getLogger('metricas_ia')
+
+METRICAS_PATH = os.path.join('data', 'ia_inferencia_metrics.json')
+
+# Buckets de 10µs a ~10s, 8 por década
+LIMITES_LATENCIA_S = [10 ** (e / 8) for e in range(-40, 9)]
+LIMITES_LOTE = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096]
+
+
+class Histograma:
+    """Contagens por bucket fixo; percentis aproximados pelo limite superior do bucket."""
+
+    def __init__(self, limites):
+        self.limites = list(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+
+    def registrar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.soma += valor
+
+    def percentil(self, p):
+        if not self.total:
+            return 0.0
+        alvo = p / 100 * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return self.limites[min(i, len(self.limites) - 1)]
+        return self.limites[-1]
+
+    def resumo(self, escala=1.0):
+        return {
+            'n': self.total,
+            'media': self.soma / self.total * escala if self.total else 0.0,
+            'p50': self.percentil(50) * escala,
+            'p95': self.percentil(95) * escala,
+            'p99': self.percentil(99) * escala,
+        }
+
+
+def estatisticas_treino(X, colunas):
+    """Estatísticas por feature gravadas nos metadados do modelo (referência do drift)."""
+    X = np.asarray(X, dtype='float64')
+    return {
+        col: {'mean': float(np.nanmean(X[:, i])), 'std': float(np.nanstd(X[:, i])),
+              'min': float(np.nanmin(X[:, i])), 'max': float(np.nanmax(X[:, i]))}
+        for i, col in enumerate(colunas)
+    } if len(X) else {}
+
+
+class MetricasInferencia:
+    """Coletor do hot path + agregação/export fora dele."""
+
+    def __init__(self, colunas, cache=None, janela=2000, amostra_a_cada=None, path=METRICAS_PATH):
+        self.colunas = list(colunas)
+        self.cache = cache
+        self.path = path
+        self.amostra_a_cada = max(1, amostra_a_cada or int(os.getenv('R7_METRICAS_AMOSTRA', '10')))
+        self.limiar_z = float(os.getenv('R7_DRIFT_Z', '1.0'))
+        self.limiar_fora_faixa = float(os.getenv('R7_DRIFT_FORA_FAIXA', '0.05'))
+        self.latencia = Histograma(LIMITES_LATENCIA_S)
+        self.lotes = Histograma(LIMITES_LOTE)
+        self._amostras = collections.deque(maxlen=janela)
+        self._lock_amostras = threading.Lock()
+        self._chamadas = 0
+        self.estatisticas_referencia = {}
+        self.versao_referencia = None
+        self._alertas_ativos = set()
+
+    def definir_referencia(self, metadados):
+        """Chamado a cada troca de modelo: o drift passa a ser medido contra o novo treino."""
+        self.estatisticas_referencia = (metadados or {}).get('estatisticas_features', {})
+        self.versao_referencia = (metadados or {}).get('versao')
+        with self._lock_amostras:
+            self._amostras.clear()
+        self._alertas_ativos.clear()
+
+    # ------------------------------------------------------------------ hot path
+
+    def registrar_predicao(self, duracao_s, vetor, tamanho_lote=1):
+        self.latencia.registrar(duracao_s)
+        self.lotes.registrar(tamanho_lote)
+        self._chamadas += 1
+        if self._chamadas % self.amostra_a_cada == 0:
+            with self._lock_amostras:
+                self._amostras.append(vetor)
+
+    def registrar_lote(self, duracao_s, tamanho_lote):
+        """Predições em lote (shadow, scoring): latência por linha + tamanho do lote."""
+        if tamanho_lote:
+            self.latencia.registrar(duracao_s / tamanho_lote)
+            self.lotes.registrar(tamanho_lote)
+
+    # ------------------------------------------------------------------ agregação
+
+    def drift(self):
+        with self._lock_amostras:
+            copia = list(self._amostras)
+        if not copia:
+            return {}, []
+        amostras = np.vstack(copia).astype('float64')
+        vivo = {}
+        alertas = []
+        for i, col in enumerate(self.colunas):
+            valores = amostras[:, i]
+            atual = {'mean': float(np.nanmean(valores)), 'std': float(np.nanstd(valores)),
+                     'min': float(np.nanmin(valores)), 'max': float(np.nanmax(valores))}
+            ref = self.estatisticas_referencia.get(col)
+            if ref:
+                z = abs(atual['mean'] - ref['mean']) / (ref['std'] if ref['std'] > 1e-12 else 1.0)
+                fora = float(np.mean((valores < ref['min']) | (valores > ref['max'])))
+                atual.update({'z_media': z, 'fora_faixa': fora})
+                if z > self.limiar_z or fora > self.limiar_fora_faixa:
+                    alertas.append({'feature': col, 'z_media': round(z, 3), 'fora_faixa': round(fora, 4)})
+            vivo[col] = atual
+        return vivo, alertas
+
+    def snapshot(self):
+        vivo, alertas = self.drift()
+        novos = {a['feature'] for a in alertas} - self._alertas_ativos
+        for alerta in alertas:
+            if alerta['feature'] in novos:
+                logger.warning(f"📉 DRIFT em '{alerta['feature']}': média a {alerta['z_media']:.2f}σ do treino | "
+                               f"{alerta['fora_faixa']:.1%} fora da faixa (modelo {self.versao_referencia})")
+        self._alertas_ativos = {a['feature'] for a in alertas}
+
+        return {
+            'atualizado_em': datetime.now().isoformat(),
+            'versao_modelo': self.versao_referencia,
+            'latencia_ms': self.latencia.resumo(escala=1000.0),
+            'tamanho_lote': self.lotes.resumo(),
+            'cache': self.cache.estatisticas() if self.cache is not None else None,
+            'amostras_drift': len(self._amostras),
+            'features': vivo,
+            'alertas_drift': alertas,
+        }
+
+    def exportar(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        dados = self.snapshot()
+        escrever_json_atomico(self.path, dados)
+        return dados
+
+    async def loop(self, intervalo=60):
+        """Export periódico em thread (mesma superfície data/*.json do dashboard)."""
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await asyncio.to_thread(self.exportar)
+            except Exception as e:
+                logger.error(f"❌ Erro ao exportar métricas da IA: {e}")
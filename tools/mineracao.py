@@ -0,0 +1,216 @@
+"""
+⛏️ PIPELINE DE MINERAÇÃO DE HISTÓRICO
+Base comum do minerador.py e do minerador_elite.py:
+    1. Download concorrente de klines (ThreadPool) sob um limitador de taxa compartilhado
+    2. Cache local incremental por símbolo/timeframe (só baixa as velas novas)
+    3. Indicadores e rótulos futuros (máx/mín das próximas N velas) 100% vetorizados
+    4. Saída particionada gravada direto pelos workers (sem acumular linha a linha)
+
+Layout:
+    data/klines/<tf>/<SYMBOL>.parquet              # cache bruto de velas
+    data/historico_ia/tf=<tf>/<SYMBOL>.parquet     # linhas de treino prontas
+
+Configuração via .env:
+    R7_MINER_WORKERS=8      # downloads simultâneos
+    R7_MINER_REQ_S=15       # requisições/s somadas de todos os workers
+"""
+import glob
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+from tools.feature_store import _extensao, _gravar, _ler
+
+logger = logging.getLogger('mineracao')
+
+KLINES_DIR = os.path.join('data', 'klines')
+COLUNAS_KLINE = ['ts', 'open', 'high', 'low', 'close', 'vol', 'ct', 'qv', 'nt', 'tb', 'tq', 'i']
+MS_POR_TF = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+
+
+class LimitadorTaxa:
+    """Token bucket thread-safe compartilhado por todos os workers de download."""
+
+    def __init__(self, taxa_por_s=15.0, capacidade=None):
+        self.taxa = float(taxa_por_s)
+        self.capacidade = float(capacidade or taxa_por_s)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self, peso=1.0):
+        """Bloqueia até haver `peso` tokens disponíveis."""
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= peso:
+                    self._tokens -= peso
+                    return
+                espera = (peso - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+def ler_config_mineracao():
+    return {
+        'workers': int(os.getenv('R7_MINER_WORKERS', '8')),
+        'req_s': float(os.getenv('R7_MINER_REQ_S', '15')),
+    }
+
+
+# ---------------------------------------------------------------------- download
+
+def baixar_klines(client, symbol, tf, dias, limitador, cache_dir=KLINES_DIR):
+    """Retorna as velas dos últimos `dias`, baixando só o que falta no cache local."""
+    path = os.path.join(cache_dir, tf, f"{symbol}.{_extensao()}")
+    inicio = int((time.time() - dias * 86400) * 1000)
+
+    cache = pd.DataFrame()
+    if os.path.exists(path):
+        try:
+            cache = _ler(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de klines corrompido ({symbol} {tf}): {e}")
+
+    # Continua a partir da última vela FECHADA do cache (a última pode estar em aberto)
+    desde = int(cache['ts'].iloc[-2]) + 1 if len(cache) > 1 and cache['ts'].iloc[0] <= inicio else inicio
+    if len(cache) > 1:
+        cache = cache[cache['ts'] < desde]
+
+    novas = []
+    passo = MS_POR_TF.get(tf, 3_600_000)
+    while True:
+        limitador.adquirir(2)  # peso de /api/v3/klines com limit=1000
+        lote = client.get_klines(symbol=symbol, interval=tf, startTime=desde, limit=1000)
+        if not lote:
+            break
+        novas.extend(lote)
+        if len(lote) < 1000:
+            break
+        desde = int(lote[-1][0]) + passo
+
+    if novas:
+        df_novas = pd.DataFrame(novas, columns=COLUNAS_KLINE)[['ts', 'open', 'high', 'low', 'close', 'vol']]
+        df_novas = df_novas.astype({'ts': 'int64', 'open': 'float64', 'high': 'float64',
+                                    'low': 'float64', 'close': 'float64', 'vol': 'float64'})
+        cache = pd.concat([cache, df_novas], ignore_index=True) if not cache.empty else df_novas
+        cache = cache.drop_duplicates('ts', keep='last').sort_values('ts', ignore_index=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        _gravar(cache, tmp_path)
+        os.replace(tmp_path, path)
+
+    return cache[cache['ts'] >= inicio].reset_index(drop=True) if not cache.empty else cache
+
+
+# ---------------------------------------------------------------------- features / rótulos
+
+def extremos_futuros(valores, janela):
+    """Máximo e mínimo das próximas `janela` velas (exclui a atual), vetorizado. NaN no fim."""
+    valores = np.asarray(valores, dtype='float64')
+    n = len(valores)
+    futuro_max = np.full(n, np.nan)
+    futuro_min = np.full(n, np.nan)
+    if n > janela:
+        janelas = np.lib.stride_tricks.sliding_window_view(valores[1:], janela)
+        futuro_max[:len(janelas)] = janelas.max(axis=1)
+        futuro_min[:len(janelas)] = janelas.min(axis=1)
+    return futuro_max, futuro_min
+
+
+def calcular_indicadores(df):
+    """RSI, EMA20, ATR% e volume relativo sobre o DataFrame inteiro (sem loops)."""
+    df = df.copy()
+    df['rsi'] = ta.rsi(df['close'], length=14)
+    df['ema20'] = ta.ema(df['close'], length=20)
+    atr = ta.atr(df['high'], df['low'], df['close'], length=14)
+    df['atr_pct'] = atr / df['close'] * 100
+    df['rel_vol'] = df['vol'] / ta.ema(df['vol'], length=20)
+    return df
+
+
+def rotular(df, janela=12, alvo_pct=1.5, stop_pct=None):
+    """sucesso = fecha +alvo_pct daqui a `janela` velas (e, se stop_pct, sem mínima futura abaixo do stop)."""
+    close = df['close'].to_numpy(dtype='float64')
+    fechamento_futuro = df['close'].shift(-janela).to_numpy(dtype='float64')
+    sucesso = fechamento_futuro > close * (1 + alvo_pct / 100)
+    if stop_pct is not None:
+        _, futuro_min = extremos_futuros(df['low'].to_numpy(), janela)
+        sucesso &= futuro_min > close * (1 - stop_pct / 100)
+    rotulo = pd.Series(sucesso.astype('float64'), index=df.index)
+    rotulo[np.isnan(fechamento_futuro)] = np.nan  # Horizonte ainda não fechado
+    return rotulo
+
+
+# ---------------------------------------------------------------------- pipeline
+
+def minerar(client, simbolos, timeframes, dias, destino_dir, colunas, janela=12, alvo_pct=1.5,
+            stop_pct=None, workers=None, req_s=None, cache_dir=KLINES_DIR):
+    """⛏️ Baixa, processa e grava cada (símbolo, timeframe) em paralelo.
+
+    `simbolos` é {symbol: categoria}. Retorna o total de linhas gravadas.
+    """
+    config = ler_config_mineracao()
+    workers = workers or config['workers']
+    limitador = LimitadorTaxa(req_s or config['req_s'])
+
+    def processar(symbol, categoria, tf):
+        df = baixar_klines(client, symbol, tf, dias, limitador, cache_dir)
+        if len(df) <= janela + 20:
+            return 0
+        df = calcular_indicadores(df)
+        df['sucesso'] = rotular(df, janela, alvo_pct, stop_pct)
+        df['symbol'] = symbol
+        df['categoria'] = categoria
+        df['timeframe'] = tf
+        df = df.dropna(subset=[c for c in colunas if c in df.columns and c not in ('categoria',)])
+
+        diretorio = os.path.join(destino_dir, f"tf={tf}")
+        os.makedirs(diretorio, exist_ok=True)
+        path = os.path.join(diretorio, f"{symbol}.{_extensao()}")
+        tmp_path = path + '.tmp'
+        _gravar(df[[c for c in colunas if c in df.columns]], tmp_path)
+        os.replace(tmp_path, path)
+        return len(df)
+
+    tarefas = [(s, c, tf) for s, c in simbolos.items() for tf in timeframes]
+    total = 0
+    erros = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(processar, *t): t for t in tarefas}
+        for futuro in _progresso(as_completed(futuros), len(futuros)):
+            symbol, _, tf = futuros[futuro]
+            try:
+                total += futuro.result()
+            except Exception as e:
+                erros += 1
+                logger.warning(f"⚠️ Falha minerando {symbol} {tf}: {e}")
+
+    logger.info(f"⛏️ Mineração concluída: {total} linhas | {len(tarefas)} séries | {erros} erros")
+    return total
+
+
+def _progresso(iteravel, total):
+    try:
+        from tqdm import tqdm
+        return tqdm(iteravel, total=total)
+    except ImportError:
+        return iteravel
+
+
+def carregar_minerio(destino_dir, colunas=None):
+    """Lê as partições geradas pela mineração (só as colunas existentes pedidas)."""
+    partes = []
+    for path in sorted(glob.glob(os.path.join(destino_dir, 'tf=*', '*.*'))):
+        if path.endswith('.tmp'):
+            continue
+        df = _ler(path)
+        partes.append(df[[c for c in colunas if c in df.columns]] if colunas else df)
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
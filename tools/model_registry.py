@@ -0,0 +1,207 @@
+"""
+🗂️ REGISTRO VERSIONADO DE MODELOS
+Cada treino publica uma versão imutável (modelo + metadados) e um ponteiro "CURRENT"
+indica qual versão está em produção. A troca do ponteiro é atômica (os.replace),
+então um crash no meio da escrita nunca corrompe o modelo em uso.
+
+Layout em disco:
+    models/registry/<nome>/
+        CURRENT              # {"atual": "v0003", "anterior": "v0002", ...}
+        v0001/model.joblib
+        v0001/meta.json      # features, métricas de treino, hash dos dados...
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import joblib
+
+from utils.arquivos import escrever_json_atomico
+
+logger = logging.getLogger('model_registry')
+
+REGISTRY_DIR_PADRAO = os.getenv('R7_MODEL_REGISTRY_DIR', os.path.join('models', 'registry'))
+
+
+def hash_dados(X, y=None):
+    """Hash curto e estável do dataset de treino (para auditoria e cache)."""
+    import pandas as pd
+
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(pd.DataFrame(X), index=False).values.tobytes())
+    if y is not None:
+        h.update(pd.util.hash_pandas_object(pd.Series(y), index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+class ModelRegistry:
+    """Registro de versões de um modelo com ponteiro de produção e rollback instantâneo."""
+
+    def __init__(self, nome, base_dir=None, max_versoes=10):
+        self.nome = nome
+        self.base_dir = base_dir or REGISTRY_DIR_PADRAO
+        self.dir = os.path.join(self.base_dir, nome)
+        self.path_current = os.path.join(self.dir, 'CURRENT')
+        self.max_versoes = max_versoes
+
+    # ------------------------------------------------------------------ leitura
+
+    def listar_versoes(self):
+        """Lista as versões publicadas em ordem crescente."""
+        if not os.path.isdir(self.dir):
+            return []
+        return sorted(
+            d for d in os.listdir(self.dir)
+            if d.startswith('v') and os.path.exists(os.path.join(self.dir, d, 'model.joblib'))
+        )
+
+    def ponteiro(self):
+        """Lê o ponteiro CURRENT (ou {} se o registro ainda está vazio)."""
+        try:
+            with open(self.path_current, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def versao_atual(self):
+        return self.ponteiro().get('atual')
+
+    def metadados(self, versao=None):
+        versao = versao or self.versao_atual()
+        if not versao:
+            return {}
+        try:
+            with open(os.path.join(self.dir, versao, 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def caminho(self, versao=None):
+        """Caminho do model.joblib de uma versão (joblib sem compressão: aceita mmap_mode)."""
+        versao = versao or self.versao_atual()
+        return os.path.join(self.dir, versao, 'model.joblib') if versao else None
+
+    def carregar(self, versao=None):
+        """Carrega (modelo, versao, metadados). Retorna (None, None, {}) se não houver versão."""
+        versao = versao or self.versao_atual()
+        if not versao:
+            return None, None, {}
+        modelo = joblib.load(self.caminho(versao))
+        return modelo, versao, self.metadados(versao)
+
+    # ------------------------------------------------------------------ escrita
+
+    def _proxima_versao(self):
+        versoes = self.listar_versoes()
+        ultimo = int(versoes[-1][1:]) if versoes else 0
+        return f"v{ultimo + 1:04d}"
+
+    def publicar(self, modelo, metadados=None, promover=True):
+        """Publica uma nova versão imutável e (por padrão) aponta a produção para ela."""
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.dir)
+        try:
+            joblib.dump(modelo, os.path.join(tmp_dir, 'model.joblib'))
+            meta = dict(metadados or {})
+            meta.setdefault('publicado_em', datetime.now().isoformat())
+            meta['modelo'] = self.nome
+
+            # rename de diretório é atômico; se outro processo publicou a mesma versão, tenta a próxima
+            for _ in range(5):
+                versao = self._proxima_versao()
+                meta['versao'] = versao
+                with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                    json.dump(meta, f, indent=2, default=str)
+                try:
+                    os.rename(tmp_dir, os.path.join(self.dir, versao))
+                    break
+                except OSError:
+                    continue
+            else:
+                raise RuntimeError(f"Não foi possível reservar versão para {self.nome}")
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"🗂️ {self.nome}: versão {versao} publicada")
+        if promover:
+            self.promover(versao)
+        self._limpar_antigas()
+        return versao
+
+    def promover(self, versao):
+        """Aponta a produção para `versao`, guardando a anterior para rollback."""
+        if versao not in self.listar_versoes():
+            raise ValueError(f"Versão inexistente: {self.nome}/{versao}")
+        atual = self.versao_atual()
+        escrever_json_atomico(self.path_current, {
+            'atual': versao,
+            'anterior': atual if atual != versao else self.ponteiro().get('anterior'),
+            'atualizado_em': datetime.now().isoformat(),
+        })
+        logger.info(f"🚀 {self.nome}: produção → {versao} (anterior: {atual})")
+        return versao
+
+    def rollback(self):
+        """⏪ Volta instantaneamente para a versão anterior."""
+        ponteiro = self.ponteiro()
+        anterior = ponteiro.get('anterior')
+        if not anterior:
+            versoes = self.listar_versoes()
+            atual = ponteiro.get('atual')
+            candidatas = [v for v in versoes if atual is None or v < atual]
+            anterior = candidatas[-1] if candidatas else None
+        if not anterior:
+            logger.warning(f"⚠️ {self.nome}: sem versão anterior para rollback")
+            return None
+        return self.promover(anterior)
+
+    def _limpar_antigas(self):
+        versoes = self.listar_versoes()
+        ponteiro = self.ponteiro()
+        protegidas = {ponteiro.get('atual'), ponteiro.get('anterior')}
+        for versao in versoes[:-self.max_versoes] if len(versoes) > self.max_versoes else []:
+            if versao not in protegidas:
+                shutil.rmtree(os.path.join(self.dir, versao), ignore_errors=True)
+
+
+async def vigiar_registry(alvo, intervalo=30):
+    """🔄 Polling em background: chama `alvo.verificar_atualizacao()` fora do event loop.
+
+    O carregamento do novo modelo acontece em thread; o hot path só enxerga a troca
+    de referência (uma atribuição), sem locks.
+    """
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await asyncio.to_thread(alvo.verificar_atualizacao)
+        except Exception as e:
+            logger.error(f"❌ Erro ao verificar registro de modelos: {e}")
+
+
+if __name__ == "__main__":
+    # Uso: python tools/model_registry.py <nome> [listar|rollback|promover <versao>]
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    if len(sys.argv) < 2:
+        print("Uso: python tools/model_registry.py <ia_sniper|cerebro_stop_loss> [listar|rollback|promover <versao>]")
+        sys.exit(1)
+
+    registry = ModelRegistry(sys.argv[1])
+    acao = sys.argv[2] if len(sys.argv) > 2 else 'listar'
+    if acao == 'rollback':
+        print(f"⏪ Produção → {registry.rollback()}")
+    elif acao == 'promover' and len(sys.argv) > 3:
+        print(f"🚀 Produção → {registry.promover(sys.argv[3])}")
+    else:
+        atual = registry.versao_atual()
+        for versao in registry.listar_versoes():
+            meta = registry.metadados(versao)
+            marcador = '👉' if versao == atual else '  '
+            print(f"{marcador} {versao} | {meta.get('publicado_em', '?')} | métricas: {meta.get('metricas', {})}")
@@ -0,0 +1,319 @@
+"""
+🏭 PIPELINE DE DADOS DE TREINO
+Monta a matriz de treino em streaming: lê o SQLite e os CSVs em chunks só com as
+colunas necessárias e guarda a matriz pronta em cache com hash de conteúdo. Se as
+fontes não mudaram, o próximo treino reaproveita o cache sem tocar no banco.
+
+Paralelismo:
+    1. Features + rótulo (to_numeric, datas, binarização) num ProcessPool: cada worker
+       lê sozinho a sua faixa de ids do SQLite ou o seu arquivo do minerador (nada de
+       serializar a entrada); chunks de CSV e do feature store são lidos aqui e enviados.
+       Cada tarefa devolve as linhas já normalizadas e separadas por símbolo. Abaixo de
+       MIN_LINHAS_PROCESSOS (ou workers=1) as tarefas rodam no próprio processo.
+    2. Partições de símbolo: concat + ordenação no tempo em threads (o numpy solta o
+       GIL no sort; é a etapa barata).
+A ordem final das linhas é a mesma da montagem serial (workers=1).
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tools.feature_store import _ler
+
+logger = logging.getLogger('pipeline_treino')
+
+CACHE_TREINO_DIR = os.path.join('data', 'cache_treino')
+FONTES_CSV_PADRAO = [os.path.join('data', 'historico_ia.csv')]
+VERSAO_PIPELINE = 3  # Incrementar quando a montagem mudar (invalida caches antigos)
+FONTES_MINERIO_PADRAO = [os.path.join('data', 'historico_ia')]  # Partições do minerador.py
+MIN_LINHAS_PROCESSOS = 200_000  # Abaixo disso subir o ProcessPool (spawn) custa mais que o trabalho
+BYTES_POR_LINHA = 150            # Estimativa de linhas dos CSVs/parquets pelo tamanho
+
+
+def _colunas_tabela(conn, tabela):
+    return [linha[1] for linha in conn.execute(f'PRAGMA table_info({tabela})')]
+
+
+def _arquivos_minerio(dirs_minerio):
+    return sorted(p for d in dirs_minerio for p in glob.glob(os.path.join(d, 'tf=*', '*.*'))
+                  if not p.endswith('.tmp'))
+
+
+def assinatura_fontes(db_path, features, csv_paths=(), feature_store=None, dirs_minerio=()):
+    """Hash de conteúdo barato das fontes: estado do DB + tamanho/mtime dos arquivos."""
+    h = hashlib.sha256()
+    h.update(json.dumps([VERSAO_PIPELINE, list(features)]).encode())
+
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            estado = conn.execute(
+                'SELECT COUNT(*), MAX(id) FROM analises WHERE sucesso IS NOT NULL'
+            ).fetchone()
+        except sqlite3.OperationalError:
+            estado = (0, None)
+        conn.close()
+        h.update(f"db:{estado}".encode())
+
+    arquivos = [p for p in csv_paths if os.path.exists(p)] + _arquivos_minerio(dirs_minerio)
+    if feature_store is not None:
+        arquivos += glob.glob(os.path.join(feature_store.dir_rotulado, 'data=*', 'part-*'))
+    for path in sorted(arquivos):
+        st = os.stat(path)
+        h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()[:20]
+
+
+def _faixas_ids(db_path, n_faixas):
+    """
+    Divide os ids rotulados do DB em até n_faixas intervalos (desde, ate] para os workers.
+    Retorna (faixas, linhas rotuladas).
+    """
+    if not os.path.exists(db_path):
+        return [], 0
+    conn = sqlite3.connect(db_path)
+    try:
+        minimo, maximo, linhas = conn.execute(
+            'SELECT MIN(id), MAX(id), COUNT(*) FROM analises WHERE sucesso IS NOT NULL').fetchone()
+    except sqlite3.OperationalError:
+        return [], 0
+    finally:
+        conn.close()
+    if minimo is None:
+        return [], 0
+    cortes = np.unique(np.linspace(minimo - 1, maximo, max(1, n_faixas) + 1).astype(np.int64))
+    return list(zip(cortes[:-1].tolist(), cortes[1:].tolist())), linhas
+
+
+def _chunks_db(db_path, colunas, chunksize, desde_id=0, ate_id=None):
+    if not os.path.exists(db_path):
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        existentes = set(_colunas_tabela(conn, 'analises'))
+        selecionadas = [c for c in colunas if c in existentes]
+        if 'sucesso' not in selecionadas:
+            return
+        sql = f"SELECT {', '.join(selecionadas)} FROM analises WHERE sucesso IS NOT NULL AND id > ?"
+        params = [int(desde_id or 0)]
+        if ate_id is not None:
+            sql += " AND id <= ?"
+            params.append(int(ate_id))
+        for chunk in pd.read_sql_query(sql + " ORDER BY id", conn, params=params, chunksize=chunksize):
+            yield chunk
+    finally:
+        conn.close()
+
+
+def _chunks_csv(path, colunas, chunksize):
+    if not os.path.exists(path):
+        return
+    desejadas = set(colunas)
+    for chunk in pd.read_csv(path, usecols=lambda c: c in desejadas, chunksize=chunksize):
+        yield chunk
+
+
+def _normalizar_chunk(chunk, features):
+    """Reduz o chunk ao mínimo: features float32, rótulo binário, símbolo e timestamp."""
+    chunk = chunk.dropna(subset=['sucesso']) if 'sucesso' in chunk.columns else chunk.iloc[0:0]
+    if chunk.empty:
+        return None
+
+    saida = pd.DataFrame(index=chunk.index)
+    for feat in features:
+        saida[feat] = pd.to_numeric(chunk[feat], errors='coerce') if feat in chunk.columns else 0.0
+    saida = saida.fillna(0).astype('float32')
+    saida['sucesso'] = (pd.to_numeric(chunk['sucesso'], errors='coerce').fillna(0) > 0).astype('int8')
+    saida['symbol'] = chunk['symbol'].astype(str) if 'symbol' in chunk.columns else 'DESCONHECIDO'
+
+    if 'timestamp' in chunk.columns:
+        datas = pd.to_datetime(chunk['timestamp'], errors='coerce', utc=True)
+        saida['ts'] = (datas - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)  # Independe da resolução
+    elif 'ts' in chunk.columns:
+        ts = pd.to_numeric(chunk['ts'], errors='coerce')
+        saida['ts'] = np.where(ts > 1e11, ts / 1000.0, ts)  # klines vêm em ms
+    else:
+        saida['ts'] = np.nan
+    return saida
+
+
+def _normalizar_por_simbolo(chunk, features):
+    """(maior id do chunk, [(symbol, linhas normalizadas)]) - unidade de trabalho dos workers."""
+    ultimo_id = int(chunk['id'].max()) if 'id' in chunk.columns and not chunk.empty else 0
+    normalizado = _normalizar_chunk(chunk, features)
+    if normalizado is None:
+        return ultimo_id, []
+    return ultimo_id, list(normalizado.groupby('symbol', sort=False))
+
+
+def _tarefa_db(db_path, colunas, features, desde_id, ate_id, chunksize):
+    return [_normalizar_por_simbolo(chunk, features)
+            for chunk in _chunks_db(db_path, colunas, chunksize, desde_id=desde_id, ate_id=ate_id)]
+
+
+def _tarefa_minerio(path, colunas, features):
+    df = _ler(path)
+    return [_normalizar_por_simbolo(df[[c for c in df.columns if c in set(colunas)]], features)]
+
+
+def _tarefa_chunk(chunk, features):
+    return [_normalizar_por_simbolo(chunk, features)]
+
+
+class _ExecutorLocal:
+    """workers=1: mesma interface do pool, tudo no processo atual."""
+
+    class _Feito:
+        def __init__(self, valor):
+            self._valor = valor
+
+        def result(self):
+            return self._valor
+
+    def submit(self, funcao, *args):
+        return self._Feito(funcao(*args))
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _construir_particao(partes, features):
+    """Concatena e ordena no tempo a partição de um símbolo (roda em paralelo)."""
+    df = pd.concat(partes, ignore_index=True).sort_values('ts', kind='stable')
+    return (df[features].to_numpy(dtype='float32'), df['sucesso'].to_numpy(dtype='int8'),
+            df['symbol'].to_numpy(dtype=object), df['ts'].to_numpy(dtype='float64'))
+
+
+def montar_matriz_treino(db_path, features, csv_paths=None, feature_store=None, dirs_minerio=None,
+                         chunksize=50000, workers=None, cache_dir=CACHE_TREINO_DIR, usar_cache=True):
+    """🏭 Retorna {'X', 'y', 'symbol', 'ts', 'hash', 'ultimo_id', 'ultimo_ts_store'} prontos para o fit.
+
+    Ordem das linhas: por símbolo e, dentro dele, por tempo (útil para validação temporal).
+    """
+    features = list(features)
+    csv_paths = list(FONTES_CSV_PADRAO if csv_paths is None else csv_paths)
+    dirs_minerio = list(FONTES_MINERIO_PADRAO if dirs_minerio is None else dirs_minerio)
+    assinatura = assinatura_fontes(db_path, features, csv_paths, feature_store, dirs_minerio)
+    cache_path = os.path.join(cache_dir, f"treino_{assinatura}.npz")
+
+    if usar_cache and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=True) as dados:
+            logger.info(f"♻️ Matriz de treino reaproveitada do cache ({assinatura})")
+            return {
+                'X': dados['X'], 'y': dados['y'], 'symbol': dados['symbol'], 'ts': dados['ts'],
+                'hash': assinatura, 'ultimo_id': int(dados['ultimo_id']),
+                'ultimo_ts_store': float(dados['ultimo_ts_store']),
+            }
+
+    colunas = features + ['sucesso', 'symbol', 'timestamp', 'ts', 'id']
+    particoes = {}
+    ultimo_id = 0
+    ultimo_ts_store = 0.0  # Marcas d'água do próximo treino incremental
+    workers = workers or min(8, os.cpu_count() or 1)
+
+    faixas, linhas_db = _faixas_ids(db_path, workers * 2)
+    arquivos_minerio = _arquivos_minerio(dirs_minerio)
+    store_df = pd.DataFrame()
+    if feature_store is not None:
+        store_df = feature_store.carregar_treino(features + ['sucesso', 'symbol', 'ts'])
+        if not store_df.empty:
+            ultimo_ts_store = float(store_df['ts'].max())
+    bytes_arquivos = sum(os.path.getsize(p) for p in list(csv_paths) + arquivos_minerio if os.path.exists(p))
+    linhas_estimadas = linhas_db + len(store_df) + bytes_arquivos // BYTES_POR_LINHA
+
+    # 1. Features + rótulo por tarefa (faixa de ids do DB, arquivo do minerador, chunk de CSV/store)
+    #    no ProcessPool; resultados consumidos na ordem de submissão (mesma ordem da versão serial)
+    if workers <= 1 or linhas_estimadas < MIN_LINHAS_PROCESSOS:
+        pool = _ExecutorLocal()
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futuros = [pool.submit(_tarefa_db, db_path, colunas, features, desde, ate, chunksize)
+                   for desde, ate in faixas]
+        for path in csv_paths:
+            futuros += [pool.submit(_tarefa_chunk, chunk, features) for chunk in _chunks_csv(path, colunas, chunksize)]
+        futuros += [pool.submit(_tarefa_minerio, path, colunas, features) for path in arquivos_minerio]
+        futuros += [pool.submit(_tarefa_chunk, store_df.iloc[inicio:inicio + chunksize], features)
+                    for inicio in range(0, len(store_df), chunksize)]
+
+        for futuro in futuros:
+            for maior_id, por_simbolo in futuro.result():
+                ultimo_id = max(ultimo_id, maior_id)
+                for symbol, parte in por_simbolo:
+                    particoes.setdefault(symbol, []).append(parte)
+    finally:
+        pool.shutdown(wait=True)
+
+    if not particoes:
+        return {'X': np.empty((0, len(features)), dtype='float32'), 'y': np.empty(0, dtype='int8'),
+                'symbol': np.empty(0, dtype=object), 'ts': np.empty(0), 'hash': assinatura, 'ultimo_id': ultimo_id,
+                'ultimo_ts_store': ultimo_ts_store}
+
+    # 2. Concat + ordenação por partição de símbolo (threads)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        blocos = list(pool.map(lambda partes: _construir_particao(partes, features), particoes.values()))
+
+    resultado = {
+        'X': np.concatenate([b[0] for b in blocos]),
+        'y': np.concatenate([b[1] for b in blocos]),
+        'symbol': np.concatenate([b[2] for b in blocos]),
+        'ts': np.concatenate([b[3] for b in blocos]),
+        'hash': assinatura,
+        'ultimo_id': ultimo_id,
+        'ultimo_ts_store': ultimo_ts_store,
+    }
+    logger.info(f"🏭 Matriz de treino montada: {len(resultado['y'])} linhas | {len(particoes)} símbolos")
+
+    # 3. Cache com hash de conteúdo (mantém só o mais recente)
+    if usar_cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            for antigo in glob.glob(os.path.join(cache_dir, 'treino_*.npz')):
+                os.remove(antigo)
+            tmp_path = cache_path + '.tmp.npz'
+            np.savez(tmp_path, X=resultado['X'], y=resultado['y'], symbol=resultado['symbol'],
+                     ts=resultado['ts'], ultimo_id=ultimo_id, ultimo_ts_store=ultimo_ts_store)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível gravar cache de treino: {e}")
+    return resultado
+
+
+def montar_matriz_incremental(db_path, features, desde_id=0, feature_store=None, desde_ts=0.0, chunksize=50000):
+    """🌱 Só as linhas rotuladas depois das marcas d'água do último treino, normalizadas
+    como em montar_matriz_treino: analises com id > desde_id e feature store com ts > desde_ts.
+
+    CSVs e partições do minerador são carga histórica: entram só no refit completo.
+    Retorna o mesmo dict de montar_matriz_treino (sem cache), em ordem de tempo.
+    """
+    features = list(features)
+    colunas = features + ['sucesso', 'symbol', 'timestamp', 'ts', 'id']
+    partes = []
+    ultimo_id, ultimo_ts_store = int(desde_id or 0), float(desde_ts or 0.0)
+
+    for chunk in _chunks_db(db_path, colunas, chunksize, desde_id=ultimo_id):
+        if not chunk.empty:
+            ultimo_id = max(ultimo_id, int(chunk['id'].max()))
+        partes.append(_normalizar_chunk(chunk, features))
+    if feature_store is not None:
+        store_df = feature_store.carregar_treino(features + ['sucesso', 'symbol', 'ts'], desde_ts=ultimo_ts_store)
+        if not store_df.empty:
+            ultimo_ts_store = float(store_df['ts'].max())
+            partes.append(_normalizar_chunk(store_df, features))
+
+    partes = [p for p in partes if p is not None]
+    if partes:
+        X, y, symbol, ts = _construir_particao(partes, features)
+    else:
+        X, y = np.empty((0, len(features)), dtype='float32'), np.empty(0, dtype='int8')
+        symbol, ts = np.empty(0, dtype=object), np.empty(0)
+    return {'X': X, 'y': y, 'symbol': symbol, 'ts': ts, 'hash': None, 'ultimo_id': ultimo_id,
+            'ultimo_ts_store': ultimo_ts_store}
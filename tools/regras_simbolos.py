@@ -0,0 +1,270 @@
+"""
+📐 REGRAS DE NEGOCIAÇÃO POR SÍMBOLO
+Cache persistente dos filtros do exchangeInfo da Binance: LOT_SIZE / MARKET_LOT_SIZE
+(step, minQty, maxQty), PRICE_FILTER (tick) e MIN_NOTIONAL / NOTIONAL.
+
+O exchangeInfo completo pesa 20 e tem megabytes; antes era baixado duas vezes a cada
+startup (carregar_precisoes e SymbolMapper.initialize) e só o número de casas do
+LOT_SIZE era aproveitado. Agora:
+    - startup lê data/regras_simbolos.json (sem rede) se estiver dentro do TTL
+    - loop() renova em background quando o TTL vence
+    - arredondamento e checagem de notional são locais, antes de enviar a ordem:
+      nada de ordem rejeitada por NOTIONAL/LOT_SIZE caindo no cooldown de venda
+
+Configuração via .env:
+    R7_REGRAS_TTL_H=12      # validade do cache em disco (horas)
+
+Uso:
+    python tools/regras_simbolos.py [SYMBOL ...]   # atualiza o cache e imprime as regras
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+logger = logging.getLogger('regras_simbolos')
+
+REGRAS_PATH = os.path.join('data', 'regras_simbolos.json')
+QUOTE_PADRAO = 'USDT'
+EPS = 1e-9
+
+
+def _casas(step):
+    """Casas decimais de um step/tick ('0.00100000' → 3)."""
+    texto = f"{step:.10f}".rstrip('0').rstrip('.')
+    return len(texto.split('.')[1]) if '.' in texto else 0
+
+
+class RegrasSimbolo:
+    """Filtros de um símbolo já convertidos para float."""
+
+    __slots__ = ('symbol', 'base', 'quote', 'status', 'step', 'min_qty', 'max_qty', 'step_mercado',
+                 'min_qty_mercado', 'max_qty_mercado', 'tick', 'min_notional', 'max_notional',
+                 'notional_mercado', 'casas_qty', 'casas_preco')
+
+    CAMPOS = __slots__
+
+    def __init__(self, symbol, base='', quote='', status='TRADING', step=0.0, min_qty=0.0, max_qty=0.0,
+                 step_mercado=0.0, min_qty_mercado=0.0, max_qty_mercado=0.0, tick=0.0, min_notional=0.0,
+                 max_notional=0.0, notional_mercado=True, casas_qty=None, casas_preco=None):
+        self.symbol = symbol
+        self.base = base
+        self.quote = quote
+        self.status = status
+        self.step = step
+        self.min_qty = min_qty
+        self.max_qty = max_qty
+        self.step_mercado = step_mercado
+        self.min_qty_mercado = min_qty_mercado
+        self.max_qty_mercado = max_qty_mercado
+        self.tick = tick
+        self.min_notional = min_notional
+        self.max_notional = max_notional
+        self.notional_mercado = notional_mercado
+        self.casas_qty = _casas(step) if casas_qty is None else casas_qty
+        self.casas_preco = _casas(tick) if casas_preco is None else casas_preco
+
+    @classmethod
+    def de_exchange_info(cls, info):
+        """Monta as regras a partir de um item de exchangeInfo['symbols']."""
+        filtros = {f['filterType']: f for f in info.get('filters', [])}
+        lot = filtros.get('LOT_SIZE', {})
+        lot_mercado = filtros.get('MARKET_LOT_SIZE', {})
+        preco = filtros.get('PRICE_FILTER', {})
+        # NOTIONAL substituiu MIN_NOTIONAL na maioria dos pares; alguns ainda trazem o antigo
+        notional = filtros.get('NOTIONAL') or filtros.get('MIN_NOTIONAL') or {}
+        return cls(
+            info['symbol'], info.get('baseAsset', ''), info.get('quoteAsset', ''), info.get('status', ''),
+            step=float(lot.get('stepSize', 0)), min_qty=float(lot.get('minQty', 0)),
+            max_qty=float(lot.get('maxQty', 0)),
+            step_mercado=float(lot_mercado.get('stepSize', 0)),
+            min_qty_mercado=float(lot_mercado.get('minQty', 0)),
+            max_qty_mercado=float(lot_mercado.get('maxQty', 0)),
+            tick=float(preco.get('tickSize', 0)),
+            min_notional=float(notional.get('minNotional', 0)),
+            max_notional=float(notional.get('maxNotional', 0)),
+            notional_mercado=bool(notional.get('applyMinToMarket', notional.get('applyToMarket', True))),
+        )
+
+    def para_lista(self):
+        return [getattr(self, c) for c in self.CAMPOS]
+
+    @classmethod
+    def de_lista(cls, valores):
+        return cls(*valores)
+
+    def limites_qty(self, mercado=True):
+        """(step, min, max) efetivos; MARKET_LOT_SIZE zerado = vale o LOT_SIZE."""
+        if not mercado:
+            return self.step, self.min_qty, self.max_qty
+        maximos = [v for v in (self.max_qty, self.max_qty_mercado) if v > 0]
+        return (max(self.step, self.step_mercado), max(self.min_qty, self.min_qty_mercado),
+                min(maximos) if maximos else 0.0)
+
+    def arredondar_qty(self, qty, mercado=True):
+        """Arredonda PARA BAIXO no step e limita ao maxQty (nunca vende mais do que tem)."""
+        step, _, max_qty = self.limites_qty(mercado)
+        if max_qty > 0:
+            qty = min(qty, max_qty)
+        if step > 0:
+            qty = math.floor(qty / step + EPS) * step
+        return round(max(qty, 0.0), self.casas_qty)
+
+    def arredondar_preco(self, preco):
+        if self.tick <= 0:
+            return preco
+        return round(math.floor(preco / self.tick + EPS) * self.tick, self.casas_preco)
+
+    def formatar_qty(self, qty):
+        """Texto decimal para a API: str(float) vira notação científica abaixo de 1e-4 e a Binance rejeita."""
+        return f"{qty:.{self.casas_qty}f}"
+
+    def formatar_preco(self, preco):
+        return f"{preco:.{self.casas_preco}f}"
+
+    def validar(self, qty, preco, mercado=True):
+        """None se a ordem passa nos filtros; senão o filtro que a Binance rejeitaria."""
+        _, min_qty, max_qty = self.limites_qty(mercado)
+        if qty <= 0 or qty < min_qty - EPS:
+            return 'LOT_SIZE'
+        if max_qty > 0 and qty > max_qty + EPS:
+            return 'LOT_SIZE'
+        if not mercado or self.notional_mercado:
+            valor = qty * preco
+            if self.min_notional > 0 and valor < self.min_notional:
+                return 'NOTIONAL'
+            if self.max_notional > 0 and valor > self.max_notional:
+                return 'NOTIONAL'
+        return None
+
+    def __repr__(self):
+        return (f"RegrasSimbolo({self.symbol} step={self.step} min={self.min_qty} max={self.max_qty} "
+                f"tick={self.tick} notional>={self.min_notional})")
+
+
+class CacheRegras:
+    """Regras de todos os símbolos; lookup O(1) em memória, persistido em JSON com TTL."""
+
+    def __init__(self, path=REGRAS_PATH, ttl_h=None):
+        self.path = path
+        self.ttl = float(ttl_h if ttl_h is not None else os.getenv('R7_REGRAS_TTL_H', '12')) * 3600
+        self._regras = {}
+        self.atualizado_em = 0.0
+
+    def __len__(self):
+        return len(self._regras)
+
+    def __contains__(self, symbol):
+        return symbol in self._regras
+
+    @property
+    def expirado(self):
+        return not self._regras or time.time() - self.atualizado_em > self.ttl
+
+    def regra(self, symbol):
+        return self._regras.get(symbol)
+
+    def simbolos_validos(self, quote=QUOTE_PADRAO):
+        return {s for s, r in self._regras.items() if r.status == 'TRADING' and (not quote or r.quote == quote)}
+
+    def casas_qty(self):
+        """{symbol: casas decimais do LOT_SIZE} (formato do antigo ExecutorBot.precisoes)."""
+        return {s: r.casas_qty for s, r in self._regras.items()}
+
+    # ------------------------------------------------------------------ disco
+
+    def carregar_disco(self):
+        """Lê o cache salvo (mesmo vencido: regras de ontem são melhores que nenhuma)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get('campos') != list(RegrasSimbolo.CAMPOS):
+                logger.info("📐 Cache de regras em formato antigo - será baixado de novo")
+                return False
+            self._regras = {v[0]: RegrasSimbolo.de_lista(v) for v in dados['simbolos']}
+            self.atualizado_em = float(dados.get('atualizado_em', 0))
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de regras ilegível ({e}) - será baixado de novo")
+            return False
+        idade_h = (time.time() - self.atualizado_em) / 3600
+        logger.info(f"📐 {len(self._regras)} regras de símbolos carregadas do disco ({idade_h:.1f}h)")
+        return True
+
+    def _salvar(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'atualizado_em': self.atualizado_em, 'campos': list(RegrasSimbolo.CAMPOS),
+                       'simbolos': [r.para_lista() for r in self._regras.values()]}, f, separators=(',', ':'))
+        os.replace(temp, self.path)
+
+    # ------------------------------------------------------------------ rede
+
+    def aplicar_exchange_info(self, info):
+        # Troca por atribuição: leitores no meio de um lookup nunca veem o dict pela metade
+        self._regras = {s['symbol']: RegrasSimbolo.de_exchange_info(s) for s in info.get('symbols', [])}
+        self.atualizado_em = time.time()
+        try:
+            self._salvar()
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar {self.path}: {e}")
+        logger.info(f"📐 Regras de {len(self._regras)} símbolos atualizadas da Binance")
+
+    async def atualizar(self, client, timeout=10.0):
+        info = await asyncio.wait_for(client.get_exchange_info(), timeout=timeout)
+        await asyncio.to_thread(self.aplicar_exchange_info, info)
+        return True
+
+    async def garantir(self, client):
+        """Startup: disco primeiro; só vai à rede se não houver cache algum."""
+        if not self._regras:
+            self.carregar_disco()
+        if not self._regras:
+            await self.atualizar(client)
+        return bool(self._regras)
+
+    async def loop(self, client, intervalo_min=5):
+        """Renova em background quando o TTL vence (falha = tenta de novo no próximo ciclo)."""
+        if not self._regras:
+            self.carregar_disco()
+        while True:
+            if self.expirado:
+                try:
+                    await self.atualizar(client)
+                except Exception as e:
+                    logger.warning(f"⚠️ Falha ao renovar regras de símbolos: {e}")
+            await asyncio.sleep(intervalo_min * 60)
+
+
+_cache = None
+
+
+def get_regras():
+    """Cache compartilhado (um exchangeInfo por processo)."""
+    global _cache
+    if _cache is None:
+        _cache = CacheRegras()
+    return _cache
+
+
+if __name__ == "__main__":
+    from binance import AsyncClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    async def _main():
+        client = await AsyncClient.create()
+        try:
+            cache = CacheRegras()
+            await cache.atualizar(client)
+            for symbol in sys.argv[1:]:
+                print(cache.regra(symbol.upper()))
+        finally:
+            await client.close_connection()
+
+    asyncio.run(_main())
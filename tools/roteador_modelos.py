@@ -0,0 +1,223 @@
+"""
+🧭 ROTEADOR DE MODELOS POR ESTRATÉGIA
+Um modelo por estratégia do AnalistaBot (scalping_v6, meme_sniper, momentum_boost,
+layer2_defi, gaming, swing_rwa) atrás de uma única API de predição. Todos usam o
+mesmo vetor de features (FEATURES_IA) e a mesma matriz de treino; só muda o
+subconjunto de símbolos e os hiperparâmetros (florestas menores e mais rápidas,
+memes com folhas maiores para aguentar a volatilidade).
+
+Cada estratégia tem seu próprio registro versionado (models/registry/ia_<estrategia>).
+Estratégia sem versão publicada cai no modelo global (ia_sniper), então o roteador
+pode ser ligado antes de qualquer treino.
+
+Lotes: IAEngine.predict_lote agrupa as linhas pelo modelo que o roteador escolheu e
+faz UM predict_proba por grupo.
+
+Limiares: cada estratégia grava nos metadados da versão o seu limiar de compra,
+varrido na validação temporal dela (mesma grade e PnL simulado do walk-forward) e na
+escala da sua calibração; sem limiar próprio, vale o global (data/limiares_ia.json).
+
+Configuração via .env:
+    R7_MODELOS_POR_ESTRATEGIA=true   # false = tudo no modelo global
+    R7_MIN_AMOSTRAS_ESTRATEGIA=300   # mínimo de linhas rotuladas para treinar uma estratégia
+
+Uso:
+    python tools/roteador_modelos.py [estrategia ...]   # treina e publica (todas se vazio)
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger('roteador_modelos')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+from tools.calibracao import Calibrador, ajustar_calibrador, calibracao_para_metadados  # noqa: E402
+
+# Ordem importa: o primeiro padrão que casar com o símbolo define a estratégia
+ESTRATEGIAS = [
+    ('scalping_v6', ['BTC', 'ETH', 'BNB']),                            # 🔷 Blue chips
+    ('meme_sniper', ['PEPE', 'WIF', 'DOGE']),                          # 🎭 Memes de alta volatilidade
+    ('momentum_boost', ['SOL', 'AVAX', 'NEAR', 'FET', 'RENDER', 'ATOM']),  # 🚀 Layer 1 + AI
+    ('layer2_defi', ['ARB', 'POL', 'JUP']),                            # 🌐 Layer 2 e DeFi
+    ('gaming', ['MAGIC', 'AXS', 'GALA', 'SAND', 'MANA']),              # 🎮 Gaming/Metaverse
+]
+ESTRATEGIA_PADRAO = 'swing_rwa'                                        # 📊 Old school alts
+NOMES_ESTRATEGIAS = [nome for nome, _ in ESTRATEGIAS] + [ESTRATEGIA_PADRAO]
+
+# Hiperparâmetros por estratégia (sobre PARAMS_BASE). Florestas menores que a global:
+# cada uma vê só uma fatia dos símbolos.
+PARAMS_BASE = {'n_estimators': 60, 'max_depth': 8, 'min_samples_leaf': 5, 'random_state': 42}
+PARAMS_POR_ESTRATEGIA = {
+    'meme_sniper': {'max_depth': 6, 'min_samples_leaf': 20, 'class_weight': 'balanced_subsample'},
+    'scalping_v6': {'max_depth': 10},
+}
+
+
+def estrategia_por_simbolo(symbol):
+    """Estratégia do AnalistaBot para o símbolo (fonte única para análise e roteamento)."""
+    for nome, padroes in ESTRATEGIAS:
+        if any(p in symbol for p in padroes):
+            return nome
+    return ESTRATEGIA_PADRAO
+
+
+def nome_registro(estrategia):
+    return f"ia_{estrategia}"
+
+
+def roteamento_ativo():
+    return os.getenv('R7_MODELOS_POR_ESTRATEGIA', 'true').lower() in ('1', 'true', 'yes', 'y')
+
+
+class RoteadorModelos:
+    """Modelos por estratégia carregados do registro, com hot-swap por atribuição."""
+
+    def __init__(self, registry_dir=None, estrategias=None):
+        from tools.model_registry import ModelRegistry
+
+        self.registros = {est: ModelRegistry(nome_registro(est), base_dir=registry_dir)
+                          for est in (estrategias or NOMES_ESTRATEGIAS)}
+        self._modelos = {}  # estrategia -> (modelo, versao, metadados, calibrador)
+        self.verificar_atualizacao()
+
+    @property
+    def ativo(self):
+        return bool(self._modelos)
+
+    def versoes(self):
+        return {est: item[1] for est, item in self._modelos.items()}
+
+    def modelo_para(self, estrategia):
+        """(modelo, versao, calibrador) da estratégia ou (None, None, None) → usar o modelo global."""
+        item = self._modelos.get(estrategia)
+        return (item[0], item[1], item[3]) if item is not None else (None, None, None)
+
+    def limiares_para(self, estrategia):
+        """Limiares gravados na versão da estratégia ({} = usar os globais)."""
+        item = self._modelos.get(estrategia)
+        return (item[2].get('limiares') or {}) if item is not None else {}
+
+    def verificar_atualizacao(self):
+        """Recarrega só as estratégias cujo CURRENT mudou. True se algum modelo trocou."""
+        novos = dict(self._modelos)
+        mudou = False
+        for est, registro in self.registros.items():
+            versao = registro.versao_atual()
+            atual = novos.get(est)
+            if versao == (atual[1] if atual else None):
+                continue
+            if not versao:
+                novos.pop(est, None)
+                mudou = True
+                continue
+            try:
+                modelo, versao, meta = registro.carregar(versao)
+            except Exception as e:
+                logger.error(f"❌ Falha ao carregar {registro.nome}/{versao}: {e} - mantendo versão atual")
+                continue
+            novos[est] = (modelo, versao, meta, Calibrador.de_dict(meta.get('calibracao')))
+            mudou = True
+            logger.info(f"🧭 Modelo da estratégia {est} → {versao}")
+        if mudou:
+            self._modelos = novos  # Ponto de corte do hot-swap
+        return mudou
+
+
+def treinar_por_estrategia(dados, colunas, registry_dir=None, n_jobs=None, min_amostras=None,
+                           estrategias=None):
+    """🏋️ Treina e publica um modelo por estratégia a partir da matriz do pipeline de treino.
+
+    `dados` é o retorno de montar_matriz_treino (X, y, symbol, ts, hash). Validação com os
+    30% mais recentes de cada estratégia; publica o modelo dos 70% (como o IAEngine.train),
+    o mesmo em que a calibração e os limiares foram ajustados.
+    Retorna {estrategia: versao} das estratégias publicadas.
+    """
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    from tools.metricas_ia import estatisticas_treino
+    from tools.model_registry import ModelRegistry
+    from tools.walk_forward import escolher_limiares, varrer_limiares
+
+    if min_amostras is None:
+        min_amostras = int(os.getenv('R7_MIN_AMOSTRAS_ESTRATEGIA', '300'))
+    simbolos = pd.Series(dados['symbol'], dtype=object).fillna('')
+    mapa = {s: estrategia_por_simbolo(s) for s in simbolos.unique()}
+    por_linha = simbolos.map(mapa).to_numpy()
+
+    publicadas = {}
+    for est in estrategias or NOMES_ESTRATEGIAS:
+        idx = np.flatnonzero(por_linha == est)
+        y = dados['y'][idx].astype(int)
+        if len(idx) < min_amostras or len(np.unique(y)) < 2:
+            logger.info(f"📄 {est}: {len(idx)} linhas rotuladas (< {min_amostras}) - usando o modelo global")
+            continue
+
+        ts = np.nan_to_num(np.asarray(dados['ts'], dtype='float64')[idx], nan=-np.inf)
+        ordem = np.argsort(ts, kind='stable')
+        idx, y = idx[ordem], y[ordem]
+        X = pd.DataFrame(dados['X'][idx], columns=colunas)
+        corte = int(len(idx) * 0.7)
+
+        params = dict(PARAMS_BASE, **PARAMS_POR_ESTRATEGIA.get(est, {}))
+        modelo = RandomForestClassifier(n_jobs=n_jobs, **params)
+        modelo.fit(X.iloc[:corte], y[:corte])
+        y_pred = modelo.predict(X.iloc[corte:])
+        probs = modelo.predict_proba(X.iloc[corte:])[:, list(modelo.classes_).index(1)]
+        calibrador, metricas_cal = ajustar_calibrador(probs, y[corte:])
+        calibracao = calibracao_para_metadados(calibrador, metricas_cal)
+
+        # 🎯 Limiar próprio, na escala que o predict vai usar (calibrada, se houver calibração)
+        limiares = escolher_limiares(pd.DataFrame(varrer_limiares(
+            calibrador.aplicar(probs) if calibrador is not None else probs, y[corte:],
+            calibrado=calibrador is not None)))
+        if limiares:
+            limiares['estrategia'] = est
+            logger.info(f"🎯 {est}: limiar de compra {limiares['limiar_compra']:.3f}")
+        metricas = {
+            'accuracy': accuracy_score(y[corte:], y_pred),
+            'precision': precision_score(y[corte:], y_pred, zero_division=0),
+            'recall': recall_score(y[corte:], y_pred, zero_division=0),
+            'f1_score': f1_score(y[corte:], y_pred, zero_division=0),
+        }
+        logger.info(f"📊 {est} ({len(idx)} linhas, validação temporal): {metricas}")
+
+        # Sem refit com 100%: outra floresta teria outra distribuição de votos e a
+        # calibração/limiares acima não valeriam para ela
+        modelo.set_params(n_jobs=None)  # Inferência de 1 linha não ganha nada com threads
+        publicadas[est] = ModelRegistry(nome_registro(est), base_dir=registry_dir).publicar(modelo, {
+            'features': list(colunas),
+            'estrategia': est,
+            'parametros': params,
+            'metricas': metricas,
+            'estatisticas_features': estatisticas_treino(dados['X'][idx], colunas),
+            'calibracao': calibracao,
+            'limiares': limiares,
+            'n_samples': int(len(idx)),
+            'simbolos': sorted(s for s, e in mapa.items() if e == est and s),
+            'data_hash': dados['hash'],
+            'treinado_em': datetime.now().isoformat(),
+            'origem': 'tools/roteador_modelos.py',
+        })
+    return publicadas
+
+
+if __name__ == "__main__":
+    from ia_engine import FEATURES_IA
+    from tools.pipeline_treino import montar_matriz_treino
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    alvo = [a for a in sys.argv[1:] if a in NOMES_ESTRATEGIAS] or None
+    versoes = treinar_por_estrategia(montar_matriz_treino('memoria_bot.db', FEATURES_IA), FEATURES_IA,
+                                     estrategias=alvo)
+    for est, versao in versoes.items():
+        print(f"🗂️ {est}: {versao}")
+    if not versoes:
+        print("❌ Nenhuma estratégia com dados suficientes")
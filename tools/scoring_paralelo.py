@@ -0,0 +1,226 @@
+"""
+🏭 SCORING PARALELO DE MODELOS
+Pontua matrizes grandes (backfills, re-scoring de meses de histórico) usando todos
+os núcleos. Cada worker do ProcessPool carrega o modelo UMA vez (no initializer),
+não a cada chunk. Cada worker tem a sua própria cópia das árvores: o Tree do sklearn
+copia nodes/values para memória própria no unpickle, então mmap_mode não compartilha
+nada aqui - conte com (tamanho do modelo × workers) de RAM.
+
+    - Matriz inteira: gravada uma vez em .npy; os workers abrem com mmap e pontuam
+      só a fatia [início, fim) do shard (nada de serializar a matriz).
+    - Streaming: chunks chegam de um iterável e os resultados saem na mesma ordem,
+      com um número limitado de chunks em voo (memória constante).
+    - Calibração: a tabela do Calibrador é aplicada no processo pai (np.interp).
+
+O CLI re-pontua como o IAEngine.predict: linhas roteadas para o modelo da estratégia
+do símbolo (quando R7_MODELOS_POR_ESTRATEGIA e a estratégia tem versão publicada),
+cada grupo com a calibração da própria versão.
+
+Uso:
+    python tools/scoring_paralelo.py [versao] [saida.parquet]   # re-pontua o histórico de treino
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger('scoring_paralelo')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+_MODELO = None  # Modelo do processo worker (carregado no initializer)
+
+
+def _inicializar_worker(model_path):
+    global _MODELO
+    import joblib
+
+    _MODELO = joblib.load(model_path)
+    if hasattr(_MODELO, 'get_params') and 'n_jobs' in _MODELO.get_params():
+        _MODELO.set_params(n_jobs=1)  # O paralelismo é entre processos
+
+
+def _aplicar(X, metodo, colunas):
+    if colunas is not None:
+        import pandas as pd
+        X = pd.DataFrame(X, columns=colunas)
+    saida = getattr(_MODELO, metodo)(X)
+    return saida[:, 1] if metodo == 'predict_proba' and saida.ndim == 2 and saida.shape[1] == 2 else saida
+
+
+def _pontuar_fatia(matriz_path, inicio, fim, metodo, colunas):
+    X = np.load(matriz_path, mmap_mode='r')[inicio:fim]
+    return _aplicar(np.asarray(X), metodo, colunas)
+
+
+def _pontuar_chunk(X, metodo, colunas):
+    return _aplicar(X, metodo, colunas)
+
+
+class PontuadorParalelo:
+    """Pool de workers com o modelo já carregado. Use como context manager."""
+
+    def __init__(self, modelo, workers=None, metodo='predict_proba', colunas=None, metricas=None,
+                 calibrador=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.metodo = metodo
+        self.colunas = list(colunas) if colunas is not None else None
+        self.metricas = metricas  # Opcional: MetricasInferencia (latência/tamanho de lote)
+        self.calibrador = calibrador  # Opcional: tools.calibracao.Calibrador da versão do modelo
+        self._tmp_dir = tempfile.mkdtemp(prefix='r7-scoring-')
+
+        if isinstance(modelo, str):
+            self.model_path = modelo
+        else:
+            import joblib
+            self.model_path = os.path.join(self._tmp_dir, 'model.joblib')
+            joblib.dump(modelo, self.model_path)
+
+        contexto = multiprocessing.get_context('spawn')
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto,
+                                         initializer=_inicializar_worker, initargs=(self.model_path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        self._pool.shutdown(wait=True)
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def _registrar(self, inicio, n):
+        if self.metricas is not None:
+            self.metricas.registrar_lote(time.perf_counter() - inicio, n)
+
+    def _calibrar(self, saida):
+        return self.calibrador.aplicar(saida) if self.calibrador is not None and self.metodo == 'predict_proba' \
+            else saida
+
+    def pontuar(self, X, tamanho_shard=None):
+        """Pontua a matriz inteira e devolve os resultados na ordem das linhas."""
+        X = np.asarray(X)
+        if len(X) == 0:
+            return np.empty(0)
+        tamanho_shard = tamanho_shard or max(1000, -(-len(X) // (self.workers * 4)))
+
+        matriz_path = os.path.join(self._tmp_dir, f"matriz-{time.time_ns()}.npy")
+        np.save(matriz_path, X)
+        try:
+            inicio = time.perf_counter()
+            futuros = [
+                self._pool.submit(_pontuar_fatia, matriz_path, i, min(i + tamanho_shard, len(X)),
+                                  self.metodo, self.colunas)
+                for i in range(0, len(X), tamanho_shard)
+            ]
+            resultado = self._calibrar(np.concatenate([f.result() for f in futuros]))
+            self._registrar(inicio, len(X))
+            return resultado
+        finally:
+            os.remove(matriz_path)
+
+    def pontuar_stream(self, chunks, max_em_voo=None):
+        """Gerador: pontua chunks de um iterável e os devolve na mesma ordem."""
+        max_em_voo = max_em_voo or self.workers * 2
+        em_voo = collections.deque()
+        for chunk in chunks:
+            chunk = np.asarray(chunk)
+            em_voo.append((time.perf_counter(), len(chunk),
+                           self._pool.submit(_pontuar_chunk, chunk, self.metodo, self.colunas)))
+            if len(em_voo) >= max_em_voo:
+                yield self._proximo(em_voo)
+        while em_voo:
+            yield self._proximo(em_voo)
+
+    def _proximo(self, em_voo):
+        inicio, n, futuro = em_voo.popleft()
+        resultado = self._calibrar(futuro.result())
+        self._registrar(inicio, n)
+        return resultado
+
+
+def pontuar_em_paralelo(modelo, X, workers=None, metodo='predict_proba', colunas=None, tamanho_shard=None,
+                        calibrador=None):
+    """Atalho de uso único: cria o pool, pontua e encerra."""
+    with PontuadorParalelo(modelo, workers=workers, metodo=metodo, colunas=colunas,
+                           calibrador=calibrador) as pontuador:
+        return pontuador.pontuar(X, tamanho_shard=tamanho_shard)
+
+
+def repontuar_historico(dados, colunas, versao=None, registry_dir=None, workers=None):
+    """Probabilidades da matriz do pipeline (montar_matriz_treino) iguais às do IAEngine.predict.
+
+    Roteia cada linha para o modelo da estratégia do símbolo (ou o global ia_sniper na
+    `versao` pedida) e aplica a calibração da versão que pontuou. Retorna (probs, versoes).
+    """
+    import pandas as pd
+
+    from tools.calibracao import Calibrador
+    from tools.model_registry import ModelRegistry
+    from tools.roteador_modelos import NOMES_ESTRATEGIAS, estrategia_por_simbolo, nome_registro, roteamento_ativo
+
+    def grupo(registro, versao, rotulo):
+        return registro.caminho(versao), rotulo, Calibrador.de_dict(registro.metadados(versao).get('calibracao'))
+
+    registry = ModelRegistry('ia_sniper', base_dir=registry_dir)
+    versao = versao or registry.versao_atual()
+    grupos = {'': grupo(registry, versao, versao)}  # '' = modelo global
+    X = np.asarray(dados['X'])
+    chave_linha = np.full(len(X), '', dtype=object)
+    if roteamento_ativo():
+        for est in NOMES_ESTRATEGIAS:
+            registro = ModelRegistry(nome_registro(est), base_dir=registry_dir)
+            versao_est = registro.versao_atual()
+            if versao_est:
+                grupos[est] = grupo(registro, versao_est, f"{est}/{versao_est}")
+        simbolos = pd.Series(dados['symbol'], dtype=object).fillna('')
+        mapa = {s: estrategia_por_simbolo(s) for s in simbolos.unique()}
+        chave_linha = simbolos.map(lambda s: mapa[s] if mapa[s] in grupos else '').to_numpy(dtype=object)
+
+    probs = np.empty(len(X))
+    versoes = np.empty(len(X), dtype=object)
+    for chave, (caminho, rotulo, calibrador) in grupos.items():
+        idx = np.flatnonzero(chave_linha == chave)
+        if len(idx) == 0:
+            continue
+        probs[idx] = pontuar_em_paralelo(caminho, X[idx], workers=workers, colunas=colunas, calibrador=calibrador)
+        versoes[idx] = rotulo
+        logger.info(f"🏭 {rotulo}: {len(idx)} linhas{' (calibradas)' if calibrador is not None else ''}")
+    return probs, versoes
+
+
+if __name__ == "__main__":
+    # Re-pontua todo o histórico de treino com uma versão do registro da IA Sniper
+    import pandas as pd
+
+    from ia_engine import FEATURES_IA
+    from tools.model_registry import ModelRegistry
+    from tools.pipeline_treino import montar_matriz_treino
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    registry = ModelRegistry('ia_sniper')
+    versao = sys.argv[1] if len(sys.argv) > 1 else registry.versao_atual()
+    saida = sys.argv[2] if len(sys.argv) > 2 else os.path.join('data', f"rescoring_{versao}.parquet")
+    if not versao:
+        print("❌ Nenhuma versão publicada no registro")
+        sys.exit(1)
+
+    dados = montar_matriz_treino('memoria_bot.db', FEATURES_IA)
+    inicio = time.time()
+    probs, versoes = repontuar_historico(dados, FEATURES_IA, versao=versao)
+    print(f"🏭 {len(probs)} linhas pontuadas com {versao} (+ estratégias) em {time.time() - inicio:.1f}s")
+
+    pd.DataFrame({'symbol': dados['symbol'], 'ts': dados['ts'], 'sucesso': dados['y'], 'prob': probs,
+                  'modelo': versoes}) \
+        .to_parquet(saida, index=False)
+    print(f"💾 Resultado salvo em: {saida}")
@@ -0,0 +1,192 @@
+"""
+👥 AVALIAÇÃO SHADOW DE MODELOS
+Modelos candidatos (versões do registro) pontuam os MESMOS vetores de features da
+produção, em lote e fora do caminho crítico. As decisões ficam num SQLite compacto e
+o relatório compara taxa de acerto e PnL atribuído contra as decisões ao vivo.
+
+O caminho de produção só faz um deque.append (O(1)); todo o resto roda em thread.
+
+Configuração via .env:
+    R7_SHADOW_VERSOES=v0004,v0005   # versões candidatas ('ultima' = última publicada fora de produção)
+"""
+import asyncio
+import collections
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('shadow_models')
+
+DB_SHADOW_PADRAO = os.path.join('data', 'shadow_decisoes.db')
+
+
+class AvaliadorShadow:
+    """Pontua candidatos em lote a partir de uma fila alimentada pela inferência de produção."""
+
+    def __init__(self, registry, versoes, colunas, db_path=DB_SHADOW_PADRAO, limiar=0.45,
+                 max_fila=5000, tamanho_lote=512):
+        from tools.calibracao import Calibrador
+
+        self.registry = registry
+        self.colunas = list(colunas)
+        self.db_path = db_path
+        self.limiar = limiar
+        self.tamanho_lote = tamanho_lote
+        self._fila = collections.deque(maxlen=max_fila)  # Cheia = descarta as mais antigas
+        self.candidatos = {}
+        self.calibradores = {}  # 📏 Cada candidato é comparado na própria escala calibrada
+
+        for versao in self._resolver_versoes(versoes):
+            try:
+                modelo, versao, meta = registry.carregar(versao)
+                if modelo is not None:
+                    self.candidatos[versao] = modelo
+                    self.calibradores[versao] = Calibrador.de_dict(meta.get('calibracao'))
+                    logger.info(f"👥 Shadow ativo: {registry.nome}/{versao}")
+            except Exception as e:
+                logger.error(f"❌ Não foi possível carregar candidato {versao}: {e}")
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._criar_tabela()
+
+    def _resolver_versoes(self, versoes):
+        atual = self.registry.versao_atual()
+        resolvidas = []
+        for versao in versoes:
+            if versao == 'ultima':
+                fora_de_producao = [v for v in self.registry.listar_versoes() if v != atual]
+                if fora_de_producao:
+                    resolvidas.append(fora_de_producao[-1])
+            elif versao and versao != atual:
+                resolvidas.append(versao)
+        return list(dict.fromkeys(resolvidas))
+
+    def _criar_tabela(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS shadow_decisoes (
+                ts REAL, symbol TEXT, preco REAL, modelo TEXT, prob REAL, decisao INTEGER
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_shadow_modelo ON shadow_decisoes (modelo, symbol, ts)')
+        conn.commit()
+        conn.close()
+
+    @property
+    def ativo(self):
+        return bool(self.candidatos)
+
+    def registrar(self, symbol, vetor, preco, decisao_producao, prob_producao, versao_producao):
+        """Chamado no caminho de produção: apenas enfileira (O(1), sem I/O)."""
+        self._fila.append((time.time(), symbol, float(preco or 0.0), vetor,
+                           int(decisao_producao), float(prob_producao), versao_producao or 'legado'))
+
+    def processar_lote(self):
+        """Drena a fila, pontua todos os candidatos em lote e persiste as decisões."""
+        itens = []
+        while self._fila and len(itens) < self.tamanho_lote:
+            itens.append(self._fila.popleft())
+        if not itens:
+            return 0
+
+        X = pd.DataFrame(np.vstack([item[3] for item in itens]), columns=self.colunas)
+        linhas = [
+            (ts, symbol, preco, f"producao:{versao}", prob, decisao)
+            for ts, symbol, preco, _, decisao, prob, versao in itens
+        ]
+        for versao, modelo in self.candidatos.items():
+            try:
+                probs = modelo.predict_proba(X)[:, 1]
+                if self.calibradores.get(versao) is not None:
+                    probs = self.calibradores[versao].aplicar(probs)
+            except Exception as e:
+                logger.error(f"❌ Shadow {versao} falhou no lote: {e}")
+                continue
+            linhas.extend(
+                (item[0], item[1], item[2], versao, float(p), int(p >= self.limiar))
+                for item, p in zip(itens, probs)
+            )
+
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('INSERT INTO shadow_decisoes VALUES (?, ?, ?, ?, ?, ?)', linhas)
+        conn.commit()
+        conn.close()
+        return len(itens)
+
+    async def loop(self, intervalo=5):
+        """Loop em background: processa a fila em thread para não tocar no event loop."""
+        logger.info(f"👥 Avaliação shadow iniciada com {len(self.candidatos)} candidato(s)")
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                while self._fila:
+                    await asyncio.to_thread(self.processar_lote)
+            except Exception as e:
+                logger.error(f"❌ Erro no processamento shadow: {e}")
+
+
+def relatorio_shadow(db_path=DB_SHADOW_PADRAO, horizonte_min=60, alvo_pct=1.5, taxa_pct=0.2):
+    """📊 Compara candidatos vs produção: taxa de acerto e PnL atribuído por modelo.
+
+    O retorno de cada decisão é medido pelo preço registrado `horizonte_min` depois
+    (mesmo símbolo), então o relatório usa apenas o que a inferência viu ao vivo.
+    """
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query('SELECT ts, symbol, preco, modelo, prob, decisao FROM shadow_decisoes', conn)
+    conn.close()
+    if df.empty:
+        return pd.DataFrame()
+
+    # Trilha de preços observados (uma por símbolo/timestamp)
+    precos = (df[df['modelo'].str.startswith('producao:')][['ts', 'symbol', 'preco']]
+              .drop_duplicates(['symbol', 'ts']).sort_values('ts'))
+    precos = precos.rename(columns={'preco': 'preco_futuro', 'ts': 'ts_futuro'})
+
+    df['ts_alvo'] = df['ts'] + horizonte_min * 60
+    df = pd.merge_asof(
+        df.sort_values('ts_alvo'), precos, left_on='ts_alvo', right_on='ts_futuro',
+        by='symbol', direction='forward'
+    ).dropna(subset=['preco_futuro'])
+    df = df[df['preco'] > 0]
+    df['retorno_pct'] = (df['preco_futuro'] / df['preco'] - 1) * 100 - taxa_pct
+    df['acerto'] = df['retorno_pct'] >= alvo_pct
+
+    # Agrupa todas as versões de produção como "producao" para a atribuição
+    df['grupo'] = np.where(df['modelo'].str.startswith('producao:'), 'producao', df['modelo'])
+    compras_producao = set(df.loc[(df['grupo'] == 'producao') & (df['decisao'] == 1), ['symbol', 'ts']]
+                           .itertuples(index=False, name=None))
+
+    resumo = []
+    for grupo, g in df.groupby('grupo'):
+        compras = g[g['decisao'] == 1]
+        chaves = list(zip(compras['symbol'], compras['ts']))
+        so_candidato = compras[[c not in compras_producao for c in chaves]]
+        resumo.append({
+            'modelo': grupo,
+            'decisoes': len(g),
+            'compras': len(compras),
+            'taxa_acerto': compras['acerto'].mean() if len(compras) else 0.0,
+            'pnl_medio_pct': compras['retorno_pct'].mean() if len(compras) else 0.0,
+            'pnl_total_pct': compras['retorno_pct'].sum(),
+            # Atribuição: PnL das compras que a produção NÃO fez
+            'pnl_exclusivo_pct': so_candidato['retorno_pct'].sum() if grupo != 'producao' else 0.0,
+        })
+    return pd.DataFrame(resumo).sort_values('pnl_total_pct', ascending=False)
+
+
+if __name__ == "__main__":
+    # Uso: python tools/shadow_models.py [horizonte_min] [alvo_pct]
+    import sys
+
+    horizonte = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    alvo = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+    tabela = relatorio_shadow(horizonte_min=horizonte, alvo_pct=alvo)
+    if tabela.empty:
+        print("📭 Sem decisões shadow com horizonte completo ainda.")
+    else:
+        print(f"📊 SHADOW vs PRODUÇÃO (horizonte {horizonte}min, alvo {alvo}%)")
+        print(tabela.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
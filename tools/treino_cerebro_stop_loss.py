@@ -0,0 +1,168 @@
+"""
+🧠 TREINO DO CÉREBRO STOP LOSS COM EVENTOS REAIS
+Minera do cache local de klines (data/klines/<tf>/) todos os toques de stop loss
+de todos os símbolos, calcula features normalizadas no momento do toque e rotula
+se o preço se recuperou dentro do horizonte. O modelo sai treinado e publicado no
+registro (models/registry/cerebro_stop_loss) em poucos segundos/minutos.
+
+Toque de stop: a mínima da vela cruza `stop_pct` abaixo da máxima de fechamento das
+últimas `janela_pico` velas (mesma geometria de um stop/trailing ativo).
+
+Rótulo (1 = RENOVAR valeria a pena): nas próximas `horizonte` velas o preço volta a
+`recuperacao_pct` acima do nível do stop ANTES de cair até o stop renovado
+(`stop_renovado_pct` abaixo do nível, igual ao SL de -3% da renovação no executor).
+
+Features (independentes da escala do preço, servem para PEPE e BTC):
+    rsi, ema_dist_pct, atr_pct, rel_vol
+
+Uso:
+    python tools/treino_cerebro_stop_loss.py [timeframe]
+"""
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('treino_cerebro_stop_loss')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+FEATURES_CEREBRO = ['rsi', 'ema_dist_pct', 'atr_pct', 'rel_vol']
+
+
+def _primeiro_indice(matriz_bool):
+    """Índice da primeira coluna True por linha (len da linha se não houver)."""
+    tem = matriz_bool.any(axis=1)
+    return np.where(tem, matriz_bool.argmax(axis=1), matriz_bool.shape[1])
+
+
+def minerar_eventos_stop(df, stop_pct=2.0, janela_pico=24, horizonte=12, recuperacao_pct=1.0,
+                         stop_renovado_pct=3.0):
+    """Extrai os toques de stop de uma série de velas com features e rótulo (vetorizado)."""
+    from tools.mineracao import calcular_indicadores
+
+    if len(df) < janela_pico + horizonte + 30:
+        return pd.DataFrame()
+    df = calcular_indicadores(df.reset_index(drop=True))
+
+    # Nível do stop em cada vela: stop_pct abaixo do maior fechamento recente (sem olhar a vela atual)
+    pico = df['close'].rolling(janela_pico).max().shift(1)
+    nivel = pico * (1 - stop_pct / 100)
+    toque = (df['low'] <= nivel).to_numpy()
+    inicio_toque = toque & ~np.r_[False, toque[:-1]]  # Só a primeira vela de cada sequência
+    n = len(df)
+    idx = np.where(inicio_toque & (np.arange(n) < n - horizonte))[0]
+    idx = idx[idx > 0]
+    if len(idx) == 0:
+        return pd.DataFrame()
+
+    # Features com as velas FECHADAS antes do toque, avaliadas no preço do stop
+    anterior = df.iloc[idx - 1]
+    preco = nivel.to_numpy()[idx]
+    eventos = pd.DataFrame({
+        'ts': df['ts'].to_numpy()[idx],
+        'rsi': anterior['rsi'].to_numpy(),
+        'ema_dist_pct': (preco / anterior['ema20'].to_numpy() - 1) * 100,
+        'atr_pct': anterior['atr_pct'].to_numpy() * anterior['close'].to_numpy() / preco,
+        'rel_vol': anterior['rel_vol'].to_numpy(),
+    })
+
+    # Caminho futuro: velas idx+1 .. idx+horizonte
+    altas = np.lib.stride_tricks.sliding_window_view(df['high'].to_numpy()[1:], horizonte)[idx]
+    baixas = np.lib.stride_tricks.sliding_window_view(df['low'].to_numpy()[1:], horizonte)[idx]
+    primeiro_alvo = _primeiro_indice(altas >= (preco * (1 + recuperacao_pct / 100))[:, None])
+    primeiro_stop = _primeiro_indice(baixas <= (preco * (1 - stop_renovado_pct / 100))[:, None])
+    # Mesma vela tocando os dois: conservador, conta como stop
+    eventos['recuperou'] = (primeiro_alvo < np.minimum(primeiro_stop, horizonte)).astype('int8')
+    return eventos.dropna()
+
+
+def _minerar_arquivo(path, params):
+    """Roda no processo filho: lê as velas de um símbolo e devolve os eventos."""
+    from tools.feature_store import _ler
+
+    df = _ler(path)
+    eventos = minerar_eventos_stop(df, **params)
+    if not eventos.empty:
+        eventos['symbol'] = os.path.basename(path).split('.', 1)[0]
+    return eventos
+
+
+def minerar_todos(timeframe='1h', klines_dir=None, workers=None, **params):
+    """Minera os toques de stop de todos os símbolos do cache em paralelo."""
+    from tools.mineracao import KLINES_DIR
+
+    arquivos = sorted(p for p in glob.glob(os.path.join(klines_dir or KLINES_DIR, timeframe, '*.*'))
+                      if not p.endswith('.tmp'))
+    if not arquivos:
+        return pd.DataFrame()
+    workers = workers or min(len(arquivos), os.cpu_count() or 1)
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+        partes = [p for p in pool.map(_minerar_arquivo, arquivos, [params] * len(arquivos),
+                                      chunksize=max(1, len(arquivos) // (workers * 4))) if not p.empty]
+    eventos = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    logger.info(f"⛏️ {len(eventos)} toques de stop em {len(arquivos)} símbolos ({timeframe})")
+    return eventos
+
+
+def treinar_cerebro(timeframe='1h', klines_dir=None, registry_dir=None, n_jobs=-1, workers=None,
+                    min_eventos=200, **params):
+    """🏋️ Minera, treina (validação = 30% mais recentes) e publica. Retorna a versão ou None."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    from tools.model_registry import ModelRegistry
+
+    eventos = minerar_todos(timeframe, klines_dir, workers, **params)
+    if len(eventos) < min_eventos or eventos['recuperou'].nunique() < 2:
+        logger.warning(f"📄 Eventos insuficientes para treinar o Cérebro ({len(eventos)} < {min_eventos}). "
+                       f"Rode o minerador para popular data/klines/{timeframe}/")
+        return None
+
+    eventos = eventos.sort_values('ts', kind='stable', ignore_index=True)
+    X = eventos[FEATURES_CEREBRO].astype('float32')
+    y = eventos['recuperou'].to_numpy()
+    corte = int(len(eventos) * 0.7)
+
+    modelo = RandomForestClassifier(n_estimators=200, max_depth=8, min_samples_leaf=20,
+                                    class_weight='balanced', random_state=42, n_jobs=n_jobs)
+    modelo.fit(X.iloc[:corte], y[:corte])
+    y_pred = modelo.predict(X.iloc[corte:])
+    metricas = {
+        'accuracy': accuracy_score(y[corte:], y_pred),
+        'precision': precision_score(y[corte:], y_pred, zero_division=0),
+        'recall': recall_score(y[corte:], y_pred, zero_division=0),
+        'f1_score': f1_score(y[corte:], y_pred, zero_division=0),
+        'taxa_recuperacao': float(y.mean()),
+    }
+    logger.info(f"📊 Cérebro (validação temporal): {metricas}")
+
+    # Modelo final com todos os eventos; inferência de 1 linha não precisa de threads
+    modelo.fit(X, y)
+    modelo.set_params(n_jobs=None)
+
+    return ModelRegistry('cerebro_stop_loss', base_dir=registry_dir).publicar(modelo, {
+        'features': FEATURES_CEREBRO,
+        'metricas': metricas,
+        'n_samples': int(len(eventos)),
+        'n_simbolos': int(eventos['symbol'].nunique()),
+        'timeframe': timeframe,
+        'parametros': params,
+        'treinado_em': datetime.now().isoformat(),
+        'origem': 'tools/treino_cerebro_stop_loss.py',
+    })
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    versao = treinar_cerebro(sys.argv[1] if len(sys.argv) > 1 else '1h')
+    print(f"🗂️ Versão publicada: {versao}" if versao else "❌ Cérebro não treinado")
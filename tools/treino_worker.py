@@ -0,0 +1,146 @@
+"""
+🏋️ WORKER DE TREINO FORA DO PROCESSO
+Roda o treino da IA em um processo separado (sem disputar o GIL com o event loop)
+com afinidade de CPU, n_jobs e limite de memória configuráveis.
+
+Configuração via .env:
+    R7_TRAIN_CPUS=2,3        # CPUs permitidas para o worker (vazio = todas)
+    R7_TRAIN_N_JOBS=2        # n_jobs do RandomForest no fit
+    R7_TRAIN_MEM_MB=2048     # Teto de memória virtual do worker (0 = sem limite)
+    R7_TRAIN_NICE=10         # Prioridade reduzida para não competir com o trading
+    R7_INCREMENTAL_INTERVAL_MIN=60   # Intervalo do aprendizado incremental (0 = desligado)
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger('treino_worker')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+
+def ler_config_treino():
+    """Lê os limites de recurso do worker a partir do .env."""
+    cpus_env = os.getenv('R7_TRAIN_CPUS', '').strip()
+    cpus = [int(c) for c in cpus_env.split(',') if c.strip().isdigit()] if cpus_env else None
+    try:
+        n_jobs = int(os.getenv('R7_TRAIN_N_JOBS', '1'))
+    except ValueError:
+        n_jobs = 1
+    try:
+        memoria_mb = int(os.getenv('R7_TRAIN_MEM_MB', '2048'))
+    except ValueError:
+        memoria_mb = 2048
+    try:
+        nice = int(os.getenv('R7_TRAIN_NICE', '10'))
+    except ValueError:
+        nice = 10
+    return {'cpus': cpus, 'n_jobs': n_jobs, 'memoria_mb': memoria_mb, 'nice': nice}
+
+
+def aplicar_limites(cpus=None, memoria_mb=0, nice=0):
+    """Aplica afinidade de CPU, teto de memória e prioridade ao processo atual.
+
+    Cada limite é best-effort: plataformas sem suporte (Windows, macOS) apenas ignoram.
+    """
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, set(cpus))
+        except OSError as e:
+            logger.warning(f"⚠️ Afinidade de CPU não aplicada ({cpus}): {e}")
+
+    if memoria_mb and memoria_mb > 0:
+        try:
+            import resource
+            limite = memoria_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"⚠️ Limite de memória não aplicado ({memoria_mb}MB): {e}")
+
+    if nice and hasattr(os, 'nice'):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def executar_treino(model_path, db_path, n_jobs=1, cpus=None, memoria_mb=0, nice=0, registry_dir=None,
+                    incremental=False):
+    """Ponto de entrada do processo filho: limita recursos, treina e publica a nova versão no registro."""
+    aplicar_limites(cpus=cpus, memoria_mb=memoria_mb, nice=nice)
+
+    from ia_engine import IAEngine
+
+    engine = IAEngine(model_path=model_path, db_path=db_path, carregar_nlp=False, registry_dir=registry_dir)
+    engine.n_jobs = n_jobs
+    return engine.train_incremental() if incremental else engine.train()
+
+
+async def treinar_em_processo(ia, incremental=False):
+    """🧠 Treina a IA em um processo separado e faz hot-swap do modelo ao final.
+
+    O event loop só aguarda o future do processo; nenhum ciclo de CPU do fit
+    acontece no processo de trading.
+    """
+    config = ler_config_treino()
+    loop = asyncio.get_running_loop()
+    contexto = multiprocessing.get_context('spawn')
+
+    logger.info(
+        f"🏋️ Treino {'incremental' if incremental else 'completo'} fora do processo | "
+        f"CPUs: {config['cpus'] or 'todas'} | n_jobs: {config['n_jobs']} | Memória: {config['memoria_mb']}MB"
+    )
+    # Sem 'with': o __exit__ chamaria shutdown(wait=True) e bloquearia o event loop
+    # até o filho sair (no cancelamento, até o fim do fit)
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=contexto)
+    try:
+        sucesso = await loop.run_in_executor(
+            pool, executar_treino,
+            ia.model_path, ia.db_path,
+            config['n_jobs'], config['cpus'], config['memoria_mb'], config['nice'],
+            ia.registry.base_dir, incremental
+        )
+    except Exception as e:
+        logger.error(f"❌ Worker de treino falhou: {e}")
+        return False
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if not sucesso:
+        logger.warning("⚠️ Worker de treino terminou sem novo modelo - mantendo versão atual")
+        return False
+
+    # 🔄 Notifica o processo vivo: o joblib.load do modelo novo roda em thread e só a
+    # troca das referências acontece no event loop, entre predições
+    carregado = await asyncio.to_thread(ia.carregar_versao_atual)
+    if carregado is None:
+        return False
+    return ia.recarregar_modelo(carregado)
+
+
+async def loop_treino_incremental(ia, intervalo_min=None):
+    """🌱 Mantém o modelo fresco: a cada intervalo, aprende só com os trades recém-rotulados."""
+    if intervalo_min is None:
+        try:
+            intervalo_min = float(os.getenv('R7_INCREMENTAL_INTERVAL_MIN', '60'))
+        except ValueError:
+            intervalo_min = 60
+    if intervalo_min <= 0:
+        logger.info("🌱 Aprendizado incremental desligado (R7_INCREMENTAL_INTERVAL_MIN=0)")
+        return
+    while True:
+        await asyncio.sleep(intervalo_min * 60)
+        await treinar_em_processo(ia, incremental=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    cfg = ler_config_treino()
+    ok = executar_treino('cerebro_ia.joblib', 'memoria_bot.db', cfg['n_jobs'], cfg['cpus'], cfg['memoria_mb'], cfg['nice'],
+                         incremental='--incremental' in sys.argv)
+    sys.exit(0 if ok else 1)
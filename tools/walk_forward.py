@@ -0,0 +1,254 @@
+"""
+🚶 AVALIAÇÃO WALK-FORWARD
+Folds temporais deslizantes (treina no passado, testa no bloco seguinte) sobre todos
+os símbolos, cada fold rodando em um processo do pool. Para cada fold reporta
+precision/recall/F1 e PnL simulado em uma grade de limiares, e escolhe os limiares
+de compra a partir desses números (data/limiares_ia.json), em vez de valores fixos.
+
+As matrizes de cada fold ficam em cache (.npy) e os workers as abrem com mmap:
+rodar de novo com os mesmos dados não remonta nada e não serializa arrays grandes.
+
+Uso:
+    python tools/walk_forward.py [n_folds] [--salvar] [--sem-calibracao]
+"""
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('walk_forward')
+
+diretorio_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if diretorio_raiz not in sys.path:
+    sys.path.append(diretorio_raiz)
+
+LIMIARES_PATH = os.path.join('data', 'limiares_ia.json')
+CACHE_FOLDS_DIR = os.path.join('data', 'cache_treino', 'walk_forward')
+GRADE_LIMIARES = np.round(np.arange(0.30, 0.801, 0.025), 3)
+
+
+def carregar_limiares(path=LIMIARES_PATH):
+    """Lê os limiares escolhidos pelo walk-forward ({} se ainda não foi rodado)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gerar_folds(ts, n_folds=5, blocos_treino=3, embargo_s=12 * 3600):
+    """Divide a linha do tempo em n_folds+1 blocos; o fold k treina nos `blocos_treino`
+    blocos anteriores e testa no bloco k. O embargo remove do treino as linhas cujo
+    rótulo (olhando para frente) invadiria o período de teste.
+    """
+    ts = np.nan_to_num(np.asarray(ts, dtype='float64'), nan=-np.inf)  # Sem data = mais antigo
+    validos = ts[np.isfinite(ts)]
+    if len(validos) == 0:
+        return []
+    cortes = np.quantile(validos, np.linspace(0, 1, n_folds + 2))
+    folds = []
+    for k in range(1, n_folds + 1):
+        inicio_teste, fim_teste = cortes[k], cortes[k + 1]
+        # Janela deslizante; quando encosta no início também leva as linhas sem data
+        inicio_treino = cortes[k - blocos_treino] if blocos_treino and k > blocos_treino else -np.inf
+        treino = np.where((ts >= inicio_treino) & (ts < inicio_teste - embargo_s))[0]
+        treino = treino[np.argsort(ts[treino], kind='stable')]  # Em ordem de tempo (fatia de calibração)
+        ultimo = k == n_folds
+        teste = np.where((ts >= inicio_teste) & ((ts <= fim_teste) if ultimo else (ts < fim_teste)))[0]
+        if len(treino) and len(teste):
+            folds.append({'fold': k, 'treino': treino, 'teste': teste,
+                          'inicio_teste': float(inicio_teste), 'fim_teste': float(fim_teste)})
+    return folds
+
+
+def _materializar_folds(dados, folds, cache_dir):
+    """Grava X/y de cada fold em .npy (chave = hash dos dados + fatias) e retorna os caminhos."""
+    diretorio = os.path.join(cache_dir, dados['hash'])
+    if not os.path.isdir(diretorio):
+        for antigo in glob.glob(os.path.join(cache_dir, '*')):
+            shutil.rmtree(antigo, ignore_errors=True)  # Dados mudaram: folds antigos não servem
+        os.makedirs(diretorio, exist_ok=True)
+
+    caminhos = []
+    for fold in folds:
+        chave = f"fold{fold['fold']}_{fold['treino'][0]}_{len(fold['treino'])}_{fold['teste'][0]}_{len(fold['teste'])}"
+        arquivos = {nome: os.path.join(diretorio, f"{chave}_{nome}.npy")
+                    for nome in ('X_treino', 'y_treino', 'X_teste', 'y_teste')}
+        if not all(os.path.exists(p) for p in arquivos.values()):
+            partes = {
+                'X_treino': dados['X'][fold['treino']], 'y_treino': dados['y'][fold['treino']],
+                'X_teste': dados['X'][fold['teste']], 'y_teste': dados['y'][fold['teste']],
+            }
+            for nome, path in arquivos.items():
+                tmp_path = path + '.tmp.npy'
+                np.save(tmp_path, partes[nome])
+                os.replace(tmp_path, path)
+        caminhos.append((fold['fold'], arquivos))
+    return caminhos
+
+
+def _avaliar_fold(fold, arquivos, params_modelo, limiares, alvo_pct, stop_pct, taxa_pct, calibrar=True):
+    """Roda no processo filho: treina o fold, pontua o teste e varre a grade de limiares.
+
+    Com `calibrar`, os 20% mais recentes do treino ficam fora do fit e ajustam a calibração,
+    igual ao treino de produção: os limiares escolhidos ficam na escala que o predict usa.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    from tools.calibracao import ajustar_calibrador
+
+    X_treino = np.load(arquivos['X_treino'], mmap_mode='r')
+    y_treino = np.load(arquivos['y_treino'], mmap_mode='r')
+    X_teste = np.load(arquivos['X_teste'], mmap_mode='r')
+    y_teste = np.asarray(np.load(arquivos['y_teste'], mmap_mode='r'), dtype=int)
+
+    if len(np.unique(y_treino)) < 2:
+        return []
+    corte = int(len(y_treino) * 0.8) if calibrar else len(y_treino)
+    if len(np.unique(y_treino[:corte])) < 2:
+        corte = len(y_treino)
+    modelo = RandomForestClassifier(**params_modelo)
+    modelo.fit(X_treino[:corte], y_treino[:corte])
+    coluna = list(modelo.classes_).index(1)
+    probs = modelo.predict_proba(X_teste)[:, coluna]
+    calibrador = None
+    if corte < len(y_treino):
+        calibrador, _ = ajustar_calibrador(modelo.predict_proba(X_treino[corte:])[:, coluna], y_treino[corte:])
+        if calibrador is not None:
+            probs = calibrador.aplicar(probs)
+
+    return varrer_limiares(probs, y_teste, limiares, alvo_pct, stop_pct, taxa_pct, fold=fold,
+                           calibrado=calibrador is not None)
+
+
+def varrer_limiares(probs, y, limiares=GRADE_LIMIARES, alvo_pct=1.5, stop_pct=2.0, taxa_pct=0.2, fold=0,
+                    calibrado=False):
+    """Precision/recall/F1 e PnL simulado de cada limiar da grade (uma linha por limiar)."""
+    probs = np.asarray(probs, dtype='float64')
+    y_teste = np.asarray(y, dtype=int)
+    limiares = list(limiares)
+
+    # Grade inteira de uma vez: (n_limiares, n_amostras)
+    compras = probs[None, :] >= np.asarray(limiares)[:, None]
+    positivos = y_teste[None, :] == 1
+    vp = (compras & positivos).sum(axis=1)
+    n_compras = compras.sum(axis=1)
+    n_positivos = max(int(positivos.sum()), 1)
+
+    precision = np.divide(vp, n_compras, out=np.zeros(len(limiares)), where=n_compras > 0)
+    recall = vp / n_positivos
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros(len(limiares)), where=(precision + recall) > 0)
+    # PnL simulado pelo rótulo: acerto = +alvo, erro = -stop, taxa em toda compra
+    pnl = vp * alvo_pct - (n_compras - vp) * stop_pct - n_compras * taxa_pct
+
+    return [{
+        'fold': fold, 'limiar': float(l), 'n_teste': int(len(y_teste)), 'compras': int(c),
+        'precision': float(p), 'recall': float(r), 'f1': float(f), 'pnl_pct': float(v),
+        'calibrado': bool(calibrado),
+    } for l, c, p, r, f, v in zip(limiares, n_compras, precision, recall, f1, pnl)]
+
+
+def avaliar_walk_forward(db_path='memoria_bot.db', n_folds=5, blocos_treino=3, limiares=GRADE_LIMIARES,
+                         workers=None, params_modelo=None, alvo_pct=1.5, stop_pct=2.0, taxa_pct=0.2,
+                         cache_dir=CACHE_FOLDS_DIR, dados=None, calibrar=True):
+    """🚶 Retorna um DataFrame com uma linha por (fold, limiar)."""
+    from ia_engine import FEATURES_IA
+    from tools.pipeline_treino import montar_matriz_treino
+
+    if dados is None:
+        dados = montar_matriz_treino(db_path, FEATURES_IA)
+    folds = gerar_folds(dados['ts'], n_folds=n_folds, blocos_treino=blocos_treino)
+    if not folds:
+        logger.warning("📄 Sem dados com timestamp suficientes para walk-forward.")
+        return pd.DataFrame()
+
+    caminhos = _materializar_folds(dados, folds, cache_dir)
+    params_modelo = params_modelo or {'n_estimators': 100, 'max_depth': 10, 'random_state': 42, 'n_jobs': 1}
+    workers = workers or min(len(caminhos), os.cpu_count() or 1)
+
+    resultados = []
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+        futuros = [pool.submit(_avaliar_fold, fold, arquivos, params_modelo, list(limiares),
+                               alvo_pct, stop_pct, taxa_pct, calibrar) for fold, arquivos in caminhos]
+        for futuro in futuros:
+            resultados.extend(futuro.result())
+
+    tabela = pd.DataFrame(resultados)
+    logger.info(f"🚶 Walk-forward: {len(caminhos)} folds | {len(dados['y'])} linhas | {len(limiares)} limiares")
+    return tabela
+
+
+def escolher_limiares(tabela, min_compras_fold=5):
+    """Escolhe os limiares pela média entre folds (só limiares com compras em todos os folds).
+
+    - limiar_compra: maior PnL médio por fold (volume x qualidade)
+    - limiar_conservador: maior PnL médio por compra (usado quando o dia já está no lucro)
+
+    'calibrado' = todos os folds pontuados com probabilidade calibrada (a escala do predict);
+    com --sem-calibracao, ou folds sem dados para calibrar, os limiares estão na escala bruta.
+    """
+    if tabela.empty:
+        return {}
+    n_folds = tabela['fold'].nunique()
+    resumo = tabela.groupby('limiar').agg(
+        pnl_medio=('pnl_pct', 'mean'), pnl_desvio=('pnl_pct', 'std'), compras=('compras', 'sum'),
+        compras_min=('compras', 'min'), precision=('precision', 'mean'), recall=('recall', 'mean'),
+        f1=('f1', 'mean'), folds=('fold', 'nunique'),
+    )
+    elegiveis = resumo[(resumo['folds'] == n_folds) & (resumo['compras_min'] >= min_compras_fold)]
+    if elegiveis.empty:
+        return {}
+    elegiveis = elegiveis.assign(pnl_por_compra=elegiveis['pnl_medio'] * n_folds / elegiveis['compras'])
+
+    limiar_compra = float(elegiveis['pnl_medio'].idxmax())
+    limiar_conservador = float(elegiveis['pnl_por_compra'].idxmax())
+    melhor = elegiveis.loc[limiar_compra]
+    return {
+        'limiar_compra': limiar_compra,
+        'limiar_conservador': max(limiar_conservador, limiar_compra),
+        'metricas': {
+            'pnl_medio_fold_pct': float(melhor['pnl_medio']),
+            'pnl_desvio_fold_pct': float(0.0 if pd.isna(melhor['pnl_desvio']) else melhor['pnl_desvio']),
+            'precision': float(melhor['precision']), 'recall': float(melhor['recall']), 'f1': float(melhor['f1']),
+        },
+        'folds': int(n_folds),
+        'calibrado': bool(tabela['calibrado'].all()) if 'calibrado' in tabela.columns else False,
+        'gerado_em': datetime.now().isoformat(),
+    }
+
+
+def salvar_limiares(limiares, path=LIMIARES_PATH):
+    from utils.arquivos import escrever_json_atomico
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    escrever_json_atomico(path, limiares)
+    logger.info(f"🎯 Limiares salvos: compra={limiares['limiar_compra']:.3f} | "
+                f"conservador={limiares['limiar_conservador']:.3f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    calibrar = '--sem-calibracao' not in sys.argv
+    tabela = avaliar_walk_forward(n_folds=int(args[0]) if args else 5, calibrar=calibrar)
+    if tabela.empty:
+        sys.exit(1)
+
+    padrao = tabela[np.isclose(tabela['limiar'], 0.45)]
+    print("📊 POR FOLD (limiar 0.45)")
+    print(padrao.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    limiares = escolher_limiares(tabela)
+    print(f"\n🎯 Limiares sugeridos: {json.dumps(limiares, indent=2)}")
+    if limiares and '--salvar' in sys.argv:
+        salvar_limiares(limiares)
@@ -0,0 +1,20 @@
+import json
+import os
+import tempfile
+
+
+def escrever_json_atomico(path, dados):
+    """
+    Grava JSON em arquivo temporário no mesmo diretório e troca com os.replace:
+    quem lê (dashboard, outro processo, restart) nunca vê o arquivo pela metade.
+    """
+    diretorio = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
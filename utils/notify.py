@@ -1,22 +1,60 @@
-import os
+"""Telegram notifications.
+
+`Notifier` is the async service used by the trading loop: callers enqueue in O(1)
+and never wait on Telegram. A background task drains a bounded queue through one
+pooled HTTP session, with per-chat rate limiting, retry with backoff (honouring
+Telegram's retry_after) and coalescing of bursts into digest messages.
+
+`send_telegram_message` keeps working for scripts: inside a running event loop it
+enqueues on the shared notifier, otherwise it posts synchronously.
+
+Settings (.env):
+    TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID
+    R7_NOTIFY_QUEUE=500          # max pending messages (oldest dropped when full)
+    R7_NOTIFY_PER_MIN=20         # messages per minute per chat
+    R7_NOTIFY_COALESCE_S=1.5     # burst window merged into a single digest
+    R7_NOTIFY_RETRIES=3
+"""
+import asyncio
+import collections
 import logging
+import os
+import time
+
 import requests
 
+try:
+    import aiohttp
+    AIOHTTP_DISPONIVEL = True
+except ImportError:
+    AIOHTTP_DISPONIVEL = False
+
 logger = logging.getLogger('notify')
 
+TELEGRAM_MAX_CHARS = 4096
+DIGEST_SEPARATOR = '\n\n'
+
+
+def _api_url(token):
+    return f'https://api.telegram.org/bot{token}/sendMessage'
+
+
 def send_telegram_message(text: str) -> bool:
     """Send a message to Telegram if credentials are present in .env.
     Uses TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID.
-    Returns True on success, False otherwise."""
+    Inside a running event loop the message is queued on the shared Notifier
+    (non-blocking); elsewhere it is posted synchronously.
+    Returns True on success (or when queued), False otherwise."""
     token = os.getenv('TELEGRAM_BOT_TOKEN')
     chat_id = os.getenv('TELEGRAM_CHAT_ID')
     if not token or not chat_id:
         logger.debug('[notify] Telegram not configured.')
         return False
+    if _notifier is not None and _notifier.running:
+        return _notifier.send(text, parse_mode=None)
     try:
-        url = f'https://api.telegram.org/bot{token}/sendMessage'
         payload = {'chat_id': chat_id, 'text': text}
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = requests.post(_api_url(token), json=payload, timeout=10)
         if resp.status_code == 200:
             logger.info('[notify] Telegram message sent.')
             return True
@@ -26,3 +64,204 @@ def send_telegram_message(text: str) -> bool:
     except Exception as e:
         logger.exception('[notify] Exception sending telegram: %s', e)
         return False
+
+
+class _ChatLimiter:
+    """Async token bucket for one chat."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, per_min):
+        self.rate = per_min / 60.0
+        self.capacity = max(1.0, per_min / 6.0)  # Short bursts up to 10 s worth of budget
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Notifier:
+    """Bounded-queue Telegram sender. Call `send` from anywhere, run `loop()` as a task."""
+
+    def __init__(self, token=None, chat_id=None, max_queue=None, per_min=None, coalesce_s=None,
+                 retries=None):
+        self.token = token or os.getenv('TELEGRAM_BOT_TOKEN')
+        self.chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+        self.per_min = float(per_min or os.getenv('R7_NOTIFY_PER_MIN', '20'))
+        self.coalesce_s = float(coalesce_s if coalesce_s is not None else os.getenv('R7_NOTIFY_COALESCE_S', '1.5'))
+        self.retries = int(retries or os.getenv('R7_NOTIFY_RETRIES', '3'))
+        self._queue = collections.deque(maxlen=int(max_queue or os.getenv('R7_NOTIFY_QUEUE', '500')))
+        self._limiters = {}
+        self._event = None
+        self._loop = None
+        self._task_running = False
+        self.stats = {'queued': 0, 'sent': 0, 'digests': 0, 'failed': 0, 'dropped': 0}
+
+    @property
+    def configured(self):
+        return bool(self.token and self.chat_id)
+
+    @property
+    def running(self):
+        return self._task_running
+
+    # ------------------------------------------------------------------ producers
+
+    def send(self, text, chat_id=None, parse_mode='HTML'):
+        """Enqueue a message (O(1), never blocks). Thread-safe."""
+        chat_id = chat_id or self.chat_id
+        if not self.token or not chat_id or not text:
+            return False
+        if len(self._queue) == self._queue.maxlen:
+            self.stats['dropped'] += 1
+        self._queue.append((chat_id, parse_mode, str(text)))
+        self.stats['queued'] += 1
+        self._wake()
+        return True
+
+    def _wake(self):
+        if self._event is None:
+            return
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._event.set()
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    # ------------------------------------------------------------------ consumer
+
+    def _drain(self):
+        """Group pending messages by (chat, parse_mode), preserving order."""
+        groups = collections.OrderedDict()
+        while self._queue:
+            chat_id, parse_mode, text = self._queue.popleft()
+            groups.setdefault((chat_id, parse_mode), []).append(text)
+        return groups
+
+    @staticmethod
+    def _coalesce(texts):
+        """Merge a burst into as few messages as Telegram's size limit allows."""
+        if len(texts) == 1:
+            return [texts[0][:TELEGRAM_MAX_CHARS]]
+        messages, current = [], []
+        size = 0
+        for text in texts:
+            text = text[:TELEGRAM_MAX_CHARS]
+            extra = len(text) + (len(DIGEST_SEPARATOR) if current else 0)
+            if current and size + extra > TELEGRAM_MAX_CHARS:
+                messages.append(DIGEST_SEPARATOR.join(current))
+                current, size = [], 0
+                extra = len(text)
+            current.append(text)
+            size += extra
+        if current:
+            messages.append(DIGEST_SEPARATOR.join(current))
+        return messages
+
+    async def _post(self, session, chat_id, parse_mode, text):
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        for attempt in range(self.retries):
+            try:
+                if session is not None:
+                    async with session.post(_api_url(self.token), json=payload) as resp:
+                        status = resp.status
+                        body = await resp.json(content_type=None) if status != 200 else None
+                else:
+                    resp = await asyncio.to_thread(requests.post, _api_url(self.token), json=payload, timeout=10)
+                    status = resp.status_code
+                    body = resp.json() if status != 200 else None
+            except Exception as e:
+                status, body = None, None
+                logger.debug('[notify] Network error (attempt %s): %s', attempt + 1, e)
+
+            if status == 200:
+                self.stats['sent'] += 1
+                return True
+            if status == 429:
+                wait = float(((body or {}).get('parameters') or {}).get('retry_after', 2 ** attempt))
+                logger.warning('[notify] Telegram rate limit: retrying in %.0fs', wait)
+                await asyncio.sleep(wait)
+                continue
+            if status is not None and 400 <= status < 500:
+                logger.warning('[notify] Telegram rejected message (%s): %s', status, body)
+                break  # Client error: retrying will not help
+            await asyncio.sleep(2 ** attempt)
+        self.stats['failed'] += 1
+        return False
+
+    async def _flush(self, session):
+        for (chat_id, parse_mode), texts in self._drain().items():
+            messages = self._coalesce(texts)
+            if len(messages) < len(texts):
+                self.stats['digests'] += 1
+            limiter = self._limiters.get(chat_id)
+            if limiter is None:
+                limiter = self._limiters[chat_id] = _ChatLimiter(self.per_min)
+            for text in messages:
+                await limiter.acquire()
+                await self._post(session, chat_id, parse_mode, text)
+
+    async def loop(self):
+        """Background task: wait for messages, let a burst accumulate, send."""
+        if not self.configured:
+            logger.info('[notify] Telegram not configured - notifications disabled.')
+            return
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._task_running = True
+        session = None
+        if AIOHTTP_DISPONIVEL:
+            session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10),
+                                            connector=aiohttp.TCPConnector(limit=4))
+        try:
+            while True:
+                if not self._queue:
+                    self._event.clear()
+                    await self._event.wait()
+                if self.coalesce_s > 0:
+                    await asyncio.sleep(self.coalesce_s)
+                try:
+                    await self._flush(session)
+                except Exception as e:
+                    logger.error('[notify] Error sending notifications: %s', e)
+        finally:
+            self._task_running = False
+            if session is not None:
+                await session.close()
+
+    async def close(self, timeout=10):
+        """Send whatever is still queued (used on shutdown)."""
+        if not self._queue or not self.configured:
+            return
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) if AIOHTTP_DISPONIVEL else None
+        try:
+            await asyncio.wait_for(self._flush(session), timeout)
+        except asyncio.TimeoutError:
+            logger.warning('[notify] %s message(s) not sent before shutdown', len(self._queue))
+        finally:
+            if session is not None:
+                await session.close()
+
+
+_notifier = None
+
+
+def get_notifier():
+    """Shared Notifier (one queue / session / rate limit per process)."""
+    global _notifier
+    if _notifier is None:
+        _notifier = Notifier()
+    return _notifier